@@ -21,6 +21,7 @@ Please see his book "Python in Hydrology"   http://greenteapress.com/pythonhydro
 import os
 import sys
 import shutil
+import traceback
 import hydroStats
 import array
 import random
@@ -108,6 +109,21 @@ if firstrun:
 	para_first = ast.literal_eval(parser.get("Option", "para_first"))
 bestrun = parser.getboolean('Option', 'bestrun')
 
+# forcing of the calibration period is read once and shared in memory with all runs
+try:
+	shared_meteo = parser.getboolean('Option', 'shared_meteo')
+except:
+	shared_meteo = False
+sharedinfo = None
+if shared_meteo:
+	# path to the folder with run_cwatm.py, if cwatm is not installed
+	try:
+		sys.path.insert(0, os.path.join(root, parser.get('Path', 'CWatM')))
+	except:
+		pass
+	from cwatm.run_cwatm import main as cwatm_main, mainwarm
+	from cwatm.management_modules.data_handling import sharemeteo, attachmeteo
+
 ########################################################################
 #   Preparation for calibration
 ########################################################################
@@ -223,14 +239,27 @@ def RunModel(Individual):
 		currentdir = os.getcwd()
 		os.chdir(directory_run)
 
-		p = Popen(runfile, shell=True, stdout=PIPE, stderr=PIPE, bufsize=16*1024*1024)
-		output, errors = p.communicate()
-		f = open("log"+run_rand_id+".txt",'w')
-		content = "OUTPUT:\n"+str(output)+"\nERRORS:\n"+str(errors)
-		f.write(content)
-		f.close()
-
-		os.chdir(currentdir)
+		try:
+			if shared_meteo:
+				# model runs in this process with the forcing from shared memory -> no reading of meteo maps
+				errors = ""
+				try:
+					mainwarm(ModelSettings_template[:-4]+'-Run'+run_rand_id+'.ini', ['-v'], attachmeteo(sharedinfo))
+				except BaseException:
+					# a model error (CWATMError) ends with SystemExit, which would stop the pool worker
+					errors = traceback.format_exc()
+				f = open("log"+run_rand_id+".txt",'w')
+				f.write("ERRORS:\n"+errors)
+				f.close()
+			else:
+				p = Popen(runfile, shell=True, stdout=PIPE, stderr=PIPE, bufsize=16*1024*1024)
+				output, errors = p.communicate()
+				f = open("log"+run_rand_id+".txt",'w')
+				content = "OUTPUT:\n"+str(output)+"\nERRORS:\n"+str(errors)
+				f.write(content)
+				f.close()
+		finally:
+			os.chdir(currentdir)
 
 
 	Qsim_tss = os.path.join(directory_run,dischargetss)
@@ -283,6 +312,44 @@ def RunModel(Individual):
 	return NSE,  # If using just one objective function, put a comma at the end!!!
 	"""
 
+########################################################################
+#   Shared forcing for all runs
+########################################################################
+
+def LoadSharedMeteo():
+
+	# One run with the -k flag reads the forcing of the calibration period (parameters in the middle of the ranges)
+	# The forcing is put into shared memory, each run attaches to it read only
+	directory_run = os.path.join(path_subcatch, "meteo")
+	if not os.path.isdir(directory_run):
+		os.mkdir(directory_run)
+
+	template_xml_new = template_xml
+	template_xml_new = template_xml_new.replace("%root", root)
+	for ii in range(0,len(ParamRanges)-1):
+		template_xml_new = template_xml_new.replace("%"+ParamRanges.index[ii],str(0.5*(float(ParamRanges.iloc[ii,1])+float(ParamRanges.iloc[ii,0]))))
+	template_xml_new = template_xml_new.replace('%run_rand_id', directory_run)
+	settings = os.path.join(directory_run, ModelSettings_template[:-4] + '-meteo.ini')
+	f = open(settings, "w")
+	f.write(template_xml_new)
+	f.close()
+
+	currentdir = os.getcwd()
+	os.chdir(directory_run)
+	meteo, success, last_dis = cwatm_main(settings, ['-k', '-v'])
+	os.chdir(currentdir)
+
+	shm, info = sharemeteo(meteo)
+	print(">> Forcing in shared memory: "+"{0:.1f}".format(meteo.nbytes / 1e6)+" MB")
+	return shm, info
+
+
+def InitSharedMeteo(info):
+	# pool workers started with spawn do not know the shared memory block of the main process
+	global sharedinfo
+	sharedinfo = info
+
+
 ########################################################################
 #   Perform calibration using the DEAP module
 ########################################################################
@@ -325,11 +392,17 @@ if __name__ == "__main__":
 
 	t = time.time()
 
+	if shared_meteo:
+		shm, sharedinfo = LoadSharedMeteo()
+
 	if use_multiprocessing==True:
 		pool_size = multiprocessing.cpu_count() * 1
 		print(pool_size, pool_limit)
 		if pool_size > pool_limit: pool_size = pool_limit
-		pool = multiprocessing.Pool(processes=pool_size)
+		if shared_meteo:
+			pool = multiprocessing.Pool(processes=pool_size, initializer=InitSharedMeteo, initargs=(sharedinfo,))
+		else:
+			pool = multiprocessing.Pool(processes=pool_size)
 		toolbox.register("map", pool.map)
 		print(pool_size)
 	
@@ -461,6 +534,9 @@ if __name__ == "__main__":
 	# Finito
 	if use_multiprocessing == True:
 		pool.close()
+	if shared_meteo:
+		shm.close()
+		shm.unlink()
 	elapsed = time.time() - t
 	print(">> Time elapsed: "+"{0:.2f}".format(elapsed)+" s")
 
@@ -0,0 +1,58 @@
+# -------------------------------------------------------------------------
+# Name:        Benchmark compressArray / decompress
+# Purpose:     compare the flat index gather/scatter with the masked array
+#              version on a global 5 arcmin mask
+#
+# Usage:       python Toolkit/benchmark/bench_compress.py [repeats]
+# -------------------------------------------------------------------------
+
+import os, sys, timeit
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from cwatm.management_modules.data_handling import setmaskinfo, compressArray, decompress
+from cwatm.management_modules.globals import maskinfo
+
+
+def compress_masked(map, name="None", zeros=0.):
+    # masked array version of compressArray
+    mapC = np.ma.compressed(np.ma.masked_array(map, maskinfo['mask']))
+    if name != "None":
+        if np.max(np.isnan(mapC)):
+            raise ValueError(name + " has less valid pixels than area or ldd")
+    mapC[mapC > 1.E20] = zeros
+    mapC[mapC < -1.E20] = zeros
+    return mapC
+
+
+def decompress_masked(map):
+    # masked array version of decompress
+    dmap = maskinfo['maskall'].copy()
+    dmap[~maskinfo['maskflat']] = map[:]
+    dmap = dmap.reshape(maskinfo['shape'])
+    dmap[dmap.mask] = -9999
+    return dmap
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    # global 5 arcmin grid: 2160 x 4320, more valid cells around the equator
+    rng = np.random.default_rng(1)
+    lat = np.linspace(90, -90, 2160)[:, None]
+    mask = rng.random((2160, 4320)) > 0.3 + 0.2 * np.cos(np.radians(lat))
+    mapC = setmaskinfo(mask)
+    print("Mask: %i x %i  valid cells: %i" % (mask.shape[0], mask.shape[1], mapC.shape[0]))
+
+    map2D = rng.random(mask.shape)
+    map1D = compressArray(map2D, name="bench")
+    assert np.array_equal(compress_masked(map2D, name="bench"), map1D)
+    assert np.array_equal(decompress_masked(map1D).data, decompress(map1D).data)
+
+    print("%-22s %12s %12s %8s" % ("", "masked[ms]", "gather[ms]", "speedup"))
+    tests = [("compressArray", lambda: compress_masked(map2D, name="bench"), lambda: compressArray(map2D, name="bench")),
+             ("decompress", lambda: decompress_masked(map1D), lambda: decompress(map1D))]
+    for name, old, new in tests:
+        t1 = min(timeit.repeat(old, number=1, repeat=repeats)) * 1000.
+        t2 = min(timeit.repeat(new, number=1, repeat=repeats)) * 1000.
+        print("%-22s %12.2f %12.2f %8.1f" % (name, t1, t2, t1 / t2))
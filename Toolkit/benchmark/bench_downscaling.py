@@ -0,0 +1,78 @@
+# -------------------------------------------------------------------------
+# Name:        Benchmark bilinear meteo downscaling
+# Purpose:     compare the sparse bilinear operator of readmeteo with the
+#              RegularGridInterpolator version for a 30 arcsec mask under
+#              5 arcmin forcing
+#
+# Usage:       python Toolkit/benchmark/bench_downscaling.py [rows cols]
+#              rows, cols: size of the mask in 5 arcmin cells (default 60 90)
+# -------------------------------------------------------------------------
+
+import os, sys, timeit
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from cwatm.management_modules.data_handling import setmaskinfo, compressArray, divideValues
+from cwatm.management_modules.globals import cutmapVfine
+from cwatm.hydrological_modules.readmeteo import readmeteo
+
+
+def downscaling_interpolator(input, wc2, smooth, resoint, downscale):
+    # RegularGridInterpolator version of the bilinear downscaling (buffer = 1)
+    x = np.arange(0.5, np.shape(input)[0] + 0.5)
+    y = np.arange(0.5, np.shape(input)[1] + 0.5)
+    xfine = np.arange(0.5 + 1 / (resoint * 2), np.shape(input)[0] - 0.5, 1 / resoint)
+    yfine = np.arange(0.5 + 1 / (resoint * 2), np.shape(input)[1] - 0.5, 1 / resoint)
+    xmesh, ymesh = np.meshgrid(xfine, yfine)
+    meshlist = list(zip(xmesh.flatten(), ymesh.flatten()))
+
+    down3 = np.kron(input[1:-1, 1:-1], np.ones((resoint, resoint)))
+    smooth = RegularGridInterpolator((x, y), smooth)(meshlist)
+    smooth = smooth.reshape(len(xfine), len(yfine), order='F')
+    crop = int(resoint / 2)
+    smooth = smooth[crop:-crop, crop:-crop]
+    if downscale == 1:
+        down1 = wc2[resoint:-resoint, resoint:-resoint] - smooth
+        down1 = np.where(np.isnan(down1), down3, down1)
+    else:
+        down1 = wc2[resoint:-resoint, resoint:-resoint] * smooth
+        down1 = np.where(np.isnan(down1), down3, down1)
+        down1 = np.where(np.isinf(down1), down3, down1)
+    down2 = down1[cutmapVfine[2]:cutmapVfine[3], cutmapVfine[0]:cutmapVfine[1]]
+    return compressArray(down2)
+
+
+if __name__ == "__main__":
+    rows, cols = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (60, 90)
+    resoint = 10  # 5 arcmin / 30 arcsec
+
+    # coarse forcing with buffer of one cell around the mask
+    rng = np.random.default_rng(1)
+    tavg = 10 + 5 * rng.random((rows + 2, cols + 2))
+    prec = rng.random((rows + 2, cols + 2))
+    wc2 = 10 + 5 * rng.random(((rows + 2) * resoint, (cols + 2) * resoint))
+    wc4 = np.nanmean(wc2.reshape(rows + 2, resoint, cols + 2, resoint), axis=(1, 3))
+
+    mask = rng.random((rows * resoint, cols * resoint)) > 0.7
+    mapC = setmaskinfo(mask)
+    for i, v in enumerate([0, cols * resoint, 0, rows * resoint]):
+        cutmapVfine[i] = v
+    print("Fine mask: %i x %i  valid cells: %i" % (mask.shape[0], mask.shape[1], mapC.shape[0]))
+
+    meteo = readmeteo.__new__(readmeteo)
+    shape = tavg.shape
+    xfine = np.arange(0.5 + 1 / (resoint * 2), shape[0] - 0.5, 1 / resoint)
+    yfine = np.arange(0.5 + 1 / (resoint * 2), shape[1] - 0.5, 1 / resoint)
+    t0 = timeit.default_timer()
+    op = meteo.bilinearoperator(shape, xfine, yfine, resoint)
+    print("Build operator (once): %.3f s" % (timeit.default_timer() - t0))
+
+    tests = [("Temperature", tavg, wc4 - tavg, 1), ("Precipitation", prec, divideValues(prec, wc4), 2)]
+    print("%-16s %14s %12s %8s %10s" % ("", "interpol.[ms]", "sparse[ms]", "speedup", "max diff"))
+    for name, input, smooth, downscale in tests:
+        old = downscaling_interpolator(input, wc2, smooth, resoint, downscale)
+        new = meteo.bilineardownscale(input, wc2, smooth, op, resoint, downscale)
+        t1 = min(timeit.repeat(lambda: downscaling_interpolator(input, wc2, smooth, resoint, downscale), number=1, repeat=3)) * 1000.
+        t2 = min(timeit.repeat(lambda: meteo.bilineardownscale(input, wc2, smooth, op, resoint, downscale), number=1, repeat=10)) * 1000.
+        print("%-16s %14.1f %12.1f %8.1f %10.2e" % (name, t1, t2, t1 / t2, np.max(np.abs(old - new))))
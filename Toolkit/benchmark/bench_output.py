@@ -0,0 +1,78 @@
+# -------------------------------------------------------------------------
+# Name:        Benchmark netcdf output presets
+# Purpose:     write time, file size and time to read the time series of
+#              single cells for each outputPreset of writenetcdf
+#
+# Usage:       python Toolkit/benchmark/bench_output.py [days] [points]
+# -------------------------------------------------------------------------
+
+import os, sys, time, tempfile, datetime
+import numpy as np
+from netCDF4 import Dataset
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from cwatm.management_modules.data_handling import setmaskinfo, writenetcdf, closeoutputhandles, outputpresets
+from cwatm.management_modules.globals import binding, cutmap, maskmapAttr, metadataNCDF, dateVar, settingsfile, \
+    versioning, coverresult
+
+
+def setup(mask):
+    # minimal global settings for writenetcdf: lat/lon grid of 5 arcmin
+    setmaskinfo(mask)
+    row, col = mask.shape
+    maskmapAttr.update(x=0.0, y=60.0, cell=1. / 12.)
+    cutmap[:] = [0, col, 0, row]
+    metadataNCDF.update(lat={'units': 'degrees_north'}, lon={'units': 'degrees_east'})
+    dateVar.update(dateStart=datetime.datetime(2000, 1, 1), calendar='standard')
+    settingsfile.append(os.path.abspath(__file__))
+    versioning.update(exe='bench', platform='', version='', lastfile='', lastdate='')
+    binding.update(institution='', title='')
+    coverresult[0] = False
+
+
+def write(netfile, maps, days):
+    flag = False
+    for day in range(days):
+        dateVar['laststep'] = day == days - 1
+        date = datetime.datetime(2000, 1, 1) + datetime.timedelta(days=day)
+        flag = writenetcdf(netfile, 'discharge', '', 'm3/s', maps[day % len(maps)], date, day + 1, flag, True, days)
+    closeoutputhandles()
+
+
+def readpoints(netfile, points):
+    with Dataset(netfile) as nf:
+        var = nf.variables['discharge']
+        for y, x in points:
+            var[:, y, x]
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    npoints = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    # elliptic basin of about 176000 cells in a 600 x 720 box
+    rng = np.random.default_rng(1)
+    yy, xx = np.mgrid[0:600, 0:720]
+    mask = ((yy - 300) / 280.) ** 2 + ((xx - 360) / 200.) ** 2 > 1
+    setup(mask)
+    valid = np.argwhere(~mask)
+    points = valid[rng.choice(len(valid), npoints, replace=False)]
+    # smooth fields, similar to discharge, 30 different days
+    ncell = len(valid)
+    base = np.exp(rng.normal(2., 1.5, ncell)).astype(np.float32)
+    maps = [base * (1. + 0.3 * np.sin(d / 5.)) for d in range(30)]
+
+    print("Mask: %i x %i  valid cells: %i  days: %i  points: %i" % (mask.shape[0], mask.shape[1], ncell, days, npoints))
+    print("%-12s %10s %10s %12s" % ("preset", "write[s]", "size[MB]", "points[s]"))
+    tmp = tempfile.mkdtemp()
+    for preset in outputpresets:
+        binding['outputPreset'] = preset
+        netfile = os.path.join(tmp, preset + ".nc")
+        t0 = time.perf_counter()
+        write(netfile, maps, days)
+        t1 = time.perf_counter()
+        readpoints(netfile, points)
+        t2 = time.perf_counter()
+        print("%-12s %10.2f %10.1f %12.3f" % (preset, t1 - t0, os.path.getsize(netfile) / 1e6, t2 - t1))
+        os.remove(netfile)
+    os.rmdir(tmp)
@@ -0,0 +1,80 @@
+# -------------------------------------------------------------------------
+# Name:        Benchmark routing kernel backends
+# Purpose:     time of the routing kernels (river network, upstream area,
+#              kinematic wave, runoff concentration) for each backend of lib2
+#              on the same domain and the largest difference to the first one
+#
+# Usage:       python Toolkit/benchmark/bench_routing.py [rows] [cols] [steps]
+# -------------------------------------------------------------------------
+
+import os, sys, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from cwatm.management_modules.data_handling import setmaskinfo
+from cwatm.management_modules.globals import lib2
+from cwatm.hydrological_modules.routing_reservoirs.routing_sub import defLdd2, upstreamArea, routingLevels
+
+
+def network(rows, cols, rng):
+    # river network flowing mostly south with some pits, loops are repaired by defLdd2
+    mask = np.zeros((rows, cols), dtype=bool)
+    ldd = rng.choice([1, 2, 3, 4, 6, 7, 8, 9], size=(rows, cols), p=[.15, .5, .15, .06, .06, .02, .04, .02])
+    ldd[rng.random((rows, cols)) < 0.002] = 5
+    setmaskinfo(mask)
+    return ldd[~mask].astype(np.float64)
+
+
+def run(ldd, steps, rng):
+    times = {}
+    t0 = time.perf_counter()
+    lddCompress, dirshort, dirUp, dirupLen, dirupID, downstruct, catchment, dirDown, lendirDown = defLdd2(ldd.copy())
+    times['network'] = time.perf_counter() - t0
+    n = len(lddCompress)
+
+    t0 = time.perf_counter()
+    ups = upstreamArea(dirDown, dirshort, np.ones(n))
+    times['ups'] = time.perf_counter() - t0
+
+    Qold = rng.random(n) * 100.
+    q = rng.random(n) * 0.01
+    alpha = rng.random(n) + 0.5
+    length = rng.random(n) * 1000. + 5000.
+    Qnew = np.zeros(n)
+    t0 = time.perf_counter()
+    for step in range(steps):
+        lib2.kinematic(Qold, q, dirDown, dirupLen, dirupID, Qnew, alpha, 0.6, 3600., length, lendirDown)
+        Qold = Qnew.copy()
+    times['kinematic'] = (time.perf_counter() - t0) / steps
+
+    dirDownLevel, levelStart = routingLevels(dirDown, dirupLen, dirupID)
+    Qlevel = np.zeros(n)
+    t0 = time.perf_counter()
+    lib2.kinematicLevel(Qold, q, dirDownLevel, dirupLen, dirupID, Qlevel, alpha, 0.6, 3600., length, levelStart, len(levelStart) - 1, os.cpu_count())
+    times['kinematicLevel'] = time.perf_counter() - t0
+
+    conc = np.zeros((10, n))
+    t0 = time.perf_counter()
+    lib2.runoffConc(conc, rng.random(n) * 3. + 0.5, np.full(n, 0.7), rng.random(n), 10, n)
+    times['runoffConc'] = time.perf_counter() - t0
+    return times, {'network': dirDown, 'ups': ups, 'kinematic': Qnew, 'kinematicLevel': Qlevel, 'runoffConc': conc}
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    steps = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    ldd = network(rows, cols, np.random.default_rng(1))
+    print("Cells: %i  kinematic steps: %i  backends: %s" % (len(ldd), steps, ", ".join(lib2.backends)))
+    print("%-10s %-16s %10s %12s" % ("backend", "kernel", "time[s]", "max rel diff"))
+    first = None
+    for name in lib2.backends:
+        lib2.select(name)
+        times, results = run(ldd, steps, np.random.default_rng(2))
+        if first is None:
+            first = results
+        for kernel in times:
+            diff = np.abs(results[kernel] - first[kernel]) / np.maximum(np.abs(first[kernel]), 1e-12)
+            print("%-10s %-16s %10.3f %12.2e" % (name, kernel, times[kernel], diff.max()))
+    lib2.select('auto')
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3.8
+
+"""
+::
+
+ -------------------------------------------------
+ ######## ##          ##  ####  ######  ##    ##
+ ##       ##          ## ##  ##   ##   ####  ####
+ ##        ##        ##  ##  ##   ##   ## #### ##
+ ##        ##   ##   ## ########  ##  ##   ##   ##
+ ##         ## #### ##  ##    ##  ##  ##        ##
+ ##         ####  #### ##      ## ## ##          ##
+ ##########  ##    ##  ##      ## ## ##          ##
+
+ Community WATer Model
+
+Converts the meteo forcing of a settings file into a compressed forcing store.
+For each meteo map stack only the cells of the mask map are stored as chunks of days (time x cells).
+A run with the same mask map and a period inside the stored period reads the store instead of the
+netcdf files if the option meteoStore in the settings file points to the store folder.
+
+    cwatm-forcing settings.ini [-o storefolder] [--chunk 365] [--compress] [-q]
+
+# --------------------------------------------------
+"""
+
+import os
+import sys
+import json
+import getopt
+import numpy as np
+
+from cwatm.management_modules.configuration import globalFlags, settingsfile, parse_configuration, dateVar
+from cwatm.management_modules.data_handling import *
+from cwatm.management_modules.timestep import checkifDate
+from cwatm.cwatm_initial import Variables
+from cwatm.hydrological_modules.miscInitial import miscInitial
+from cwatm.hydrological_modules.readmeteo import readmeteo
+
+
+class forcingModel(object):
+    """
+    Minimal model with mask map and meteo definition, only used to find the meteo files of a run
+    """
+
+    def __init__(self):
+        self.var = Variables()
+        self.MaskMap = loadsetclone(self, 'MaskMap')
+        miscInitial(self).initial()
+        self.readmeteo_module = readmeteo(self)
+        self.readmeteo_module.initial()
+
+
+def usage():
+    """
+    Prints how to use the converter
+    """
+
+    print("""
+    Converts the meteo forcing of a settings file into a compressed forcing store
+
+    cwatm-forcing settings.ini [options]
+
+    -o --out         folder of the store, default: meteoStore in the settings file
+    --chunk          number of days in one chunk file, default: 365
+    --compress       chunks are stored zipped (.npz) instead of memory mapped (.npy)
+    -q --quiet       less output
+    """)
+
+
+def convertmeteo(name, storedir, steps, chunk, compress):
+    """
+    Converts one meteo map stack. The files are read in the same order as in the model run
+
+    :param name: name of the meteo binding e.g. PrecipitationMaps
+    :param storedir: folder of the store
+    :param steps: number of timesteps of the run
+    :param chunk: number of days in one chunk file
+    :param compress: if chunks are stored zipped
+    :return: dtype of the stored data
+    """
+
+    outdir = os.path.join(storedir, name)
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+
+    data = None
+    chunkno = 0
+    pos = 0
+    done = 0
+    for i in sorted(meteofiles[name].keys()):
+        filename, indstart, indend = meteofiles[name][i][:3]
+        # the handle key includes the number of the file in the stack
+        flagmeteo[name] = i
+        handle = meteohandle(name, os.path.normpath(filename))
+        if data is None:
+            dtype = np.float32 if handle['var'].dtype == np.float32 else np.float64
+            data = np.empty((chunk, maskinfo['mapC'][0]), dtype=dtype)
+
+        idx = indstart if i == 0 else 0
+        while (idx <= indend) and (done < steps):
+            end = min(idx + chunk - pos, indend + 1, idx + steps - done)
+            mapnp = readmeteohyperslab(handle, idx, end)
+            if maskinfo['shapeflat'][0] != mapnp[0].size:
+                msg = "Error 109: " + name + " has less or more valid pixels than the mask map \n"
+                raise CWATMError(msg)
+            n = end - idx
+            data[pos:pos + n] = np.take(mapnp.reshape(n, -1), maskinfo['maskindex'], axis=1)
+            pos += n
+            done += n
+            idx = end
+            if (pos == chunk) or (done == steps):
+                outfile = os.path.join(outdir, name + "_%05i" % chunkno)
+                if compress:
+                    np.savez_compressed(outfile + ".npz", data=data[:pos])
+                else:
+                    np.save(outfile + ".npy", data[:pos])
+                chunkno += 1
+                pos = 0
+        closemeteohandles(name)
+        if done == steps:
+            break
+
+    if done < steps:
+        msg = "Error 225: Netcdf map stacks of " + name + " -> " + cbinding(name) + " do not cover the period of the run\n"
+        raise CWATMError(msg)
+    flagmeteo[name] = 0
+    return np.dtype(dtype).name
+
+
+def convertforcing(settings, args):
+    """
+    Converts all meteo map stacks used in a run of the settings file and writes the manifest of the store
+
+    :param settings: settings file
+    :param args: arguments from the command line
+    :return: folder of the store
+    """
+
+    try:
+        opts, args = getopt.getopt(args, 'o:qv', ['out=', 'chunk=', 'compress', 'quiet', 'veryquiet'])
+    except getopt.GetoptError:
+        usage()
+        sys.exit(0)
+
+    storedir = None
+    chunk = 365
+    compress = False
+    flags = []
+    for o, a in opts:
+        if o in ('-o', '--out'):
+            storedir = a
+        if o == '--chunk':
+            chunk = max(1, int(a))
+        if o == '--compress':
+            compress = True
+        if o in ('-q', '--quiet', '-v', '--veryquiet'):
+            flags.append(o)
+
+    globalFlags(settings, flags, settingsfile, Flags)
+    parse_configuration(settingsfile[0])
+    checkifDate('StepStart', 'StepEnd', 'SpinUp', cbinding('PrecipitationMaps'))
+    if storedir is None:
+        storedir = cbinding('meteoStore')
+
+    # the store has to be written from the netcdf files
+    binding['meteoStore'] = "None"
+    model = forcingModel()
+    if not model.var.meteomapsscale:
+        msg = "Error 226: Forcing store only for meteo maps with the same resolution as the mask map\n"
+        raise CWATMError(msg)
+
+    steps = dateVar['intEnd'] - dateVar['intStart'] + 1
+    variables = {}
+    for name in meteofiles.keys():
+        # glacier maps starting later than the run use the day of the year of the first year
+        if meteofiles[name][0][1] < 0:
+            continue
+        with Dataset(meteofiles[name][0][0]) as nf:
+            calendar = nf.variables['time'].calendar
+        dtype = convertmeteo(name, storedir, steps, chunk, compress)
+        variables[name] = {'source': cbinding(name), 'calendar': calendar, 'dtype': dtype,
+                           'files': forcingsources(name)}
+        if not(Flags['quiet']) and not(Flags['veryquiet']):
+            print("%-20s %6i days -> %s" % (name, steps, os.path.join(storedir, name)))
+
+    # manifest is written last, a store without manifest is not used
+    manifest = {'version': 2, 'maskhash': maskinfo['maskhash'], 'shape': [int(i) for i in maskinfo['shape']],
+                'x': float(maskmapAttr['x']), 'y': float(maskmapAttr['y']), 'cell': float(maskmapAttr['cell']),
+                'start': dateVar['dateBegin'].strftime("%Y-%m-%d"), 'steps': steps,
+                'chunk': chunk, 'compress': compress, 'variables': variables}
+    with open(os.path.join(storedir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return storedir
+
+
+def run_from_command_line():
+    if len(sys.argv) < 2:
+        usage()
+        sys.exit(0)
+    convertforcing(sys.argv[1], sys.argv[2:])
+
+
+if __name__ == "__main__":
+    run_from_command_line()
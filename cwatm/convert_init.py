@@ -0,0 +1,104 @@
+#!/usr/bin/env python3.8
+
+"""
+::
+
+ -------------------------------------------------
+ ######## ##          ##  ####  ######  ##    ##
+ ##       ##          ## ##  ##   ##   ####  ####
+ ##        ##        ##  ##  ##   ##   ## #### ##
+ ##        ##   ##   ## ########  ##  ##   ##   ##
+ ##         ## #### ##  ##    ##  ##  ##        ##
+ ##         ####  #### ##      ## ## ##          ##
+ ##########  ##    ##  ##      ## ## ##          ##
+
+ Community WATer Model
+
+Converts initial condition files between netcdf and the binary init format (option initBinary).
+The mask map of the settings file is used to compress or decompress the maps.
+
+    cwatm-init settings.ini infile [outfile]
+
+A netcdf file is converted to binary (.cwi), a binary file to netcdf (.nc)
+
+# --------------------------------------------------
+"""
+
+import os
+import sys
+from netCDF4 import Dataset
+
+from cwatm.management_modules.configuration import globalFlags, settingsfile, parse_configuration
+from cwatm.management_modules.data_handling import *
+from cwatm.cwatm_initial import Variables
+
+
+class initModel(object):
+    """
+    Minimal model with mask map and netcdf metadata, only used to convert init files
+    """
+
+    def __init__(self):
+        self.var = Variables()
+        self.MaskMap = loadsetclone(self, 'MaskMap')
+        metaNetCDF()
+
+
+def usage():
+    """
+    Prints how to use the converter
+    """
+
+    print("""
+    Converts initial condition files between netcdf and the binary init format
+
+    cwatm-init settings.ini infile [outfile]
+
+    infile netcdf -> outfile binary, default: infile with extension .cwi
+    infile binary -> outfile netcdf, default: infile with extension .nc
+    """)
+
+
+def convertinit(settings, infile, outfile=None):
+    """
+    Converts one init file, the direction is given by the format of the input file
+
+    :param settings: settings file
+    :param infile: init file to convert
+    :param outfile: (optional) name of the converted file
+    :return: name of the converted file
+    """
+
+    globalFlags(settings, [], settingsfile, Flags)
+    parse_configuration(settingsfile[0])
+    initModel()
+
+    binary = isIniBinary(infile)
+    if outfile is None:
+        outfile = os.path.splitext(infile)[0] + (".nc" if binary else ".cwi")
+
+    if binary:
+        state = openIniBinary(infile)
+        names = [v['name'] for v in state['header']['variables']]
+        for name in names:
+            if state['variables'][name]['shape'] != [maskinfo['mapC'][0]]:
+                msg = "Error 126: " + name + " in " + infile + " is not a map and cannot be stored as netcdf\n"
+                raise CWATMError(msg)
+        writeIniNetcdf(outfile, names, [readIniBinary(infile, name) for name in names])
+    else:
+        with Dataset(infile) as nf1:
+            names = [name for name in nf1.variables if nf1.variables[name].ndim == 2]
+        writeIniBinary(outfile, names, [readnetcdfInitial(infile, name) for name in names])
+    return outfile
+
+
+def run_from_command_line():
+    if len(sys.argv) < 3:
+        usage()
+        sys.exit(0)
+    outfile = sys.argv[3] if len(sys.argv) > 3 else None
+    convertinit(sys.argv[1], sys.argv[2], outfile)
+
+
+if __name__ == "__main__":
+    run_from_command_line()
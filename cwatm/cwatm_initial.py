@@ -46,7 +46,7 @@ class Variables:
         First it is checked if the initial value is given in the settings file
 
         * if it is <> None it is used directly
-        * if None it is loaded from the init netcdf file
+        * if None it is loaded from the init netcdf file or binary init file
 
         :param name: Name of the init value
         :param default: default value -> default is 0.0
@@ -58,7 +58,7 @@ class Variables:
             name = name + str(number)
 
         if self.loadInit:
-            map = readnetcdfInitial(self.initLoadFile, name)
+            map = readInitial(self.initLoadFile, name)
             if Flags['calib']:
                 self.initmap[name] = map
             return map
@@ -133,6 +133,8 @@ class CWATModel_ini(DynamicModel):
             
         # reading of the metainformation of variables to put into output netcdfs
         metaNetCDF()
+        # compiled or numpy version of the routing kernels
+        setroutingbackend()
 
         # test if ModFlow coupling is used as defined in settings file
         self.var.modflow = False
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3.8
+
+"""
+::
+
+ -------------------------------------------------
+ ######## ##          ##  ####  ######  ##    ##
+ ##       ##          ## ##  ##   ##   ####  ####
+ ##        ##        ##  ##  ##   ##   ## #### ##
+ ##        ##   ##   ## ########  ##  ##   ##   ##
+ ##         ## #### ##  ##    ##  ##  ##        ##
+ ##         ####  #### ##      ## ## ##          ##
+ ##########  ##    ##  ##      ## ## ##          ##
+
+ Community WATer Model
+
+Expands a netcdf output file written with outputGathered = True (CF compression by gathering,
+only the cells of the mask map are stored) back to the full (time, y, x) maps.
+
+    cwatm-expand gathered.nc [expanded.nc]
+
+# --------------------------------------------------
+"""
+
+import sys
+import numpy as np
+from netCDF4 import Dataset
+
+
+def usage():
+    """
+    Prints how to use the expander
+    """
+
+    print("""
+    Expands a gathered CWATM output netcdf file to full maps
+
+    cwatm-expand gathered.nc [expanded.nc]
+
+    default name of the expanded file: gathered_expanded.nc
+    """)
+
+
+def expandmap(data, cells, shape, fill=1e20):
+    """
+    Puts the values of the mask cells back into 2D maps
+
+    :param data: values of the mask cells, last dimension are the cells
+    :param cells: index of the mask cells in the flattened map (list variable cell)
+    :param shape: shape of the 2D map
+    :param fill: value for the cells outside the mask
+    :return: masked array with shape data.shape[:-1] + shape
+    """
+
+    data = np.ma.filled(data, np.nan)
+    mapnp = np.full(data.shape[:-1] + (shape[0] * shape[1],), np.nan, dtype=data.dtype)
+    mapnp[..., cells] = data
+    mapnp = mapnp.reshape(data.shape[:-1] + tuple(shape))
+    return np.ma.masked_invalid(mapnp)
+
+
+def expandgathered(infile, outfile, steps=100):
+    """
+    Writes a copy of a gathered netcdf file with the gathered variables as full maps
+
+    :param infile: gathered netcdf file
+    :param outfile: expanded netcdf file
+    :param steps: number of time slices expanded at once
+    :return: -
+    """
+
+    with Dataset(infile) as src, Dataset(outfile, 'w', format='NETCDF4') as dst:
+        if not('cell' in src.variables) or not(hasattr(src.variables['cell'], 'compress')):
+            raise ValueError(infile + " is not a gathered CWATM output file")
+
+        cells = src.variables['cell'][:]
+        ydim, xdim = src.variables['cell'].compress.split()
+        shape = (len(src.dimensions[ydim]), len(src.dimensions[xdim]))
+
+        dst.setncatts({k: src.getncattr(k) for k in src.ncattrs()})
+        for name, dim in src.dimensions.items():
+            if name != 'cell':
+                dst.createDimension(name, None if dim.isunlimited() else len(dim))
+
+        for name, var in src.variables.items():
+            if name == 'cell':
+                continue
+            attrs = {k: var.getncattr(k) for k in var.ncattrs() if k != '_FillValue'}
+            if var.dimensions and var.dimensions[-1] == 'cell':
+                dims = var.dimensions[:-1] + (ydim, xdim)
+                chunks = (1,) * (len(dims) - 2) + shape
+                value = dst.createVariable(name, var.dtype, dims, zlib=True, fill_value=1e20, chunksizes=chunks)
+                value.setncatts(attrs)
+                if len(var.dimensions) == 1:
+                    value[:] = expandmap(var[:], cells, shape)
+                else:
+                    for i in range(0, var.shape[0], steps):
+                        value[i:i + steps] = expandmap(var[i:i + steps], cells, shape)
+            else:
+                fill = var.getncattr('_FillValue') if '_FillValue' in var.ncattrs() else None
+                value = dst.createVariable(name, var.dtype, var.dimensions, fill_value=fill)
+                value.setncatts(attrs)
+                if var.dimensions:
+                    value[:] = var[:]
+                else:
+                    value.assignValue(var.getValue())
+
+
+def run_from_command_line():
+    if len(sys.argv) < 2:
+        usage()
+        sys.exit(0)
+    infile = sys.argv[1]
+    if len(sys.argv) > 2:
+        outfile = sys.argv[2]
+    else:
+        outfile = infile[:-3] + "_expanded.nc" if infile.endswith(".nc") else infile + "_expanded.nc"
+    expandgathered(infile, outfile)
+
+
+if __name__ == "__main__":
+    run_from_command_line()
@@ -39,6 +39,7 @@ class initcondition(object):
     initLoadFile                           load file name of the initial condition data                            --   
     saveInit                               Flag: if true initial conditions are saved                              --   
     saveInitFile                           save file name of the initial condition data                            --   
+    initBinary                             Flag: if true initial conditions are saved as binary init file          --   
     coverTypes                             land cover types - forest - grassland - irrPaddy - irrNonPaddy - water  --   
     =====================================  ======================================================================  =====
 
@@ -337,6 +338,11 @@ class initcondition(object):
         self.var.saveInit = returnBool('save_initial')
         self.var.initmap = {}
 
+        # binary init file: compressed arrays as in the model, fast to save and load
+        self.var.initBinary = False
+        if 'initBinary' in binding:
+            self.var.initBinary = returnBool('initBinary')
+
         if self.var.saveInit:
             self.var.saveInitFile = cbinding('initSave')
             initdates = cbinding('StepInit').split()
@@ -349,7 +355,7 @@ class initcondition(object):
     def dynamic(self):
         """
         Dynamic part of the initcondition module
-        write initital conditions into a single netcdf file
+        write initital conditions into a single netcdf file, or a binary init file with option initBinary
 
         Note:
             Several dates can be stored in different netcdf files
@@ -357,7 +363,8 @@ class initcondition(object):
 
         if self.var.saveInit:
             if  dateVar['curr'] in dateVar['intInit']:
-                saveFile = self.var.saveInitFile + "_" + "%02d%02d%02d.nc" % (dateVar['currDate'].year, dateVar['currDate'].month, dateVar['currDate'].day)
+                ext = ".cwi" if self.var.initBinary else ".nc"
+                saveFile = self.var.saveInitFile + "_" + "%02d%02d%02d" % (dateVar['currDate'].year, dateVar['currDate'].month, dateVar['currDate'].day) + ext
                 initVar=[]
                 i = 0
                 for var in initCondVar:
@@ -365,5 +372,8 @@ class initcondition(object):
                     #print variabel
                     initVar.append(eval(variabel))
                     i += 1
-                writeIniNetcdf(saveFile, initCondVar,initVar)
+                if self.var.initBinary:
+                    writeIniBinary(saveFile, initCondVar, initVar)
+                else:
+                    writeIniNetcdf(saveFile, initCondVar,initVar)
 
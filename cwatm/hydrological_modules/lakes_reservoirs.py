@@ -305,6 +305,8 @@ class lakes_reservoirs(object):
             self.var.lddCompress_LR, dirshort_LR, self.var.dirUp_LR, self.var.dirupLen_LR, self.var.dirupID_LR, \
             self.var.downstruct_LR, self.var.catchment_LR, self.var.dirDown_LR, self.var.lendirDown_LR = defLdd2(
                 self.var.ldd_LR)
+            if self.var.routingThreads > 1:
+                self.var.dirDownLevel_LR, self.var.levelStart_LR = routingLevels(self.var.dirDown_LR, self.var.dirupLen_LR, self.var.dirupID_LR)
 
             # boolean map as mask map for compressing and decompressing
             self.var.compress_LR = self.var.waterBodyOut > 0
@@ -9,8 +9,8 @@
 # -------------------------------------------------------------------------
 
 from cwatm.management_modules.data_handling import *
-import scipy.ndimage
-from scipy.interpolate import RegularGridInterpolator
+import scipy.sparse
+import threading
 
 class readmeteo(object):
     """
@@ -61,12 +61,12 @@ class readmeteo(object):
     ycoarse_prec                                                                                                   --   
     xfine_prec                                                                                                     --   
     yfine_prec                                                                                                     --   
-    meshlist_prec                                                                                                  --   
+    meshlist_prec                          sparse bilinear interpolation from coarse meteo to fine mask cells      --   
     xcoarse_tavg                                                                                                   --   
     ycoarse_tavg                                                                                                   --   
     xfine_tavg                                                                                                     --   
     yfine_tavg                                                                                                     --   
-    meshlist_tavg                                                                                                  --   
+    meshlist_tavg                          sparse bilinear interpolation from coarse meteo to fine mask cells      --   
     meteo                                                                                                          --   
     prec                                   precipitation in m                                                      m    
     temp                                   average temperature in Celsius deg                                      °C   
@@ -75,6 +75,7 @@ class readmeteo(object):
     includeOnlyGlaciersMelt                                                                                        --   
     GlacierMelt                                                                                                    --   
     GlacierRain                                                                                                    --   
+    meteoprefetch                          if meteo maps of the next day are read in a background thread           --   
     =====================================  ======================================================================  =====
 
     **Functions**
@@ -84,6 +85,15 @@ class readmeteo(object):
         self.model = model
         self.var = model.var
 
+        # background reading of the meteo maps of the next timestep
+        self.meteocalls = []
+        self.prefetched = {}
+        self.prefetchThread = None
+        self.prefetchError = None
+
+        # mapping of the fine mask cells to the coarse meteo map for downscaling
+        self.fineop = {}
+
     def initial(self):
         """
         Initial part of meteo
@@ -219,6 +229,9 @@ class readmeteo(object):
                     meteomaps.append(self.var.glacierrainMaps)
 
         multinetdf(meteomaps)
+        # meteo maps converted to a compressed store (convert_forcing.py) are read from there
+        if self.var.meteomapsscale:
+            openforcingstore(meteomaps)
 
         # downscaling to wordclim, set parameter to 0 in case they are only used as dummy
         self.var.wc2_tavg = 0
@@ -243,6 +256,15 @@ class readmeteo(object):
             self.var.yfine_tavg = 0
             self.var.meshlist_tavg = 0
 
+        # meteo maps of the next day can be read in a background thread while the current day is calculated
+        self.var.meteoprefetch = False
+        if 'meteoPrefetch' in binding:
+            self.var.meteoprefetch = returnBool('meteoPrefetch')
+        if Flags['check']:
+            self.var.meteoprefetch = False
+        timeMesPrefetch[0] = 0.
+        timeMesPrefetch[1] = 0.
+
 
         # read dem for making a anomolydem between high resolution dem and low resoultion dem
 
@@ -418,8 +440,8 @@ class readmeteo(object):
                 y = np.arange(0.5, np.shape(input)[1] + 0.5)
                 xfine = np.arange(0.5 + 1 / (resoint * 2), np.shape(input)[0] - 0.5, 1 / resoint)
                 yfine = np.arange(0.5 + 1 / (resoint * 2), np.shape(input)[1] - 0.5, 1 / resoint)
-                xmesh, ymesh = np.meshgrid(xfine, yfine)
-                meshlist = list(zip(xmesh.flatten(), ymesh.flatten()))
+                # the interpolation weights do not change during the run -> built once as sparse matrix
+                meshlist = self.bilinearoperator(np.shape(input), xfine, yfine, resoint)
         else:
             buffer = 0
 
@@ -430,16 +452,18 @@ class readmeteo(object):
                 return input, wc2, wc4
 
         if buffer == 0:
-          # this is creating an array resoint times bigger than input, by copying each item resoint times in x and y direction
-            down3 = np.kron(input, np.ones((resoint, resoint)))
+            # coarse cell of each compressed fine cell (instead of a kron map resoint times bigger than input)
+            op = self.fineoperator(np.shape(input), resoint, self.var.InterpolationMethod == 'spline')
+            down3 = input.ravel()[op['parent']].astype(np.float64)
         else:
-            down3 = np.kron(input[buffer:-buffer, buffer:-buffer], np.ones((resoint, resoint)))
+            # bilinear: the fine map is not needed, the coarse value of each fine cell is taken from the operator
+            down3 = None
 
 
         if downscale == 0:
-            down2 = down3[cutmapVfine[2]:cutmapVfine[3], cutmapVfine[0]:cutmapVfine[1]].astype(np.float64)
-            input = compressArray(down2)
-            return input
+            # same as in compressArray
+            down3[np.abs(down3) > 1.E20] = 0.
+            return down3
         else:
             if dateVar['newStart'] or dateVar['newMonth']:  # loading every month a new map
                 wc1 = readnetcdf2(downscaleName, dateVar['currDate'], useDaily='month', compress = False, cut = False)
@@ -484,74 +508,230 @@ class readmeteo(object):
 
                 if self.var.InterpolationMethod == 'kron':
                     if downscale == 2:  # precipitation
-                        # wc3 looks a like wc3
-                        wc3 = wc2.reshape(wc2.shape[0] // resoint, resoint, wc2.shape[1] // resoint, resoint)
-                        # wc3mean looks like w4
-                        wc3mean = np.nanmean(wc3, axis=(1, 3))
-                        # Average of wordclim on the bigger input raster scale
-                        wc3kron = np.kron(wc3mean, np.ones((resoint, resoint)))
-                        # the average values are spread out to the fine scale
-                        # looks like quot_wc, but wc2 = input, wc3kron = wc4
-                        wc4 = divideValues(wc2, wc3kron)
+                        # Average of wordclim on the bigger input raster scale (wc4) is spread out to the fine scale
+                        # wc4 holds the correction multiplicator on fine scale
+                        wc4 = divideValues(wc2, np.kron(wc4, np.ones((resoint, resoint))))
+                        wc4 = wc4.ravel()[op['rows'] * wc2.shape[1] + op['cols']]
+
+                if self.var.InterpolationMethod != 'bilinear':
+                    # the fine WorldClim map is only needed for the mask cells -> stored compressed until next month
+                    wc2 = wc2.ravel()[op['rows'] * wc2.shape[1] + op['cols']]
 
         if downscale == 1: # Temperature
             diff_wc = wc4 - input
 
             if self.var.InterpolationMethod == 'spline':
-                diffSmooth = scipy.ndimage.zoom(diff_wc, resoint, order=1)
+                # scipy.ndimage.zoom(diff_wc, resoint, order=1) for the compressed fine cells
+                diffSmooth = op['zoom'].dot(diff_wc.ravel())
                 down1 = wc2 - diffSmooth
 
             elif self.var.InterpolationMethod == 'bilinear':
-                bilinear_interpolation = RegularGridInterpolator((x, y), diff_wc)
-                diffSmooth = bilinear_interpolation(meshlist)
-                diffSmooth = diffSmooth.reshape(len(xfine), len(yfine), order='F')
-                #no buffer for real downscaled values
-                crop = int(resoint / 2)
-                diffSmooth = diffSmooth[crop:-crop, crop:-crop]
-                down1 = wc2[buffer * resoint:-buffer * resoint, buffer * resoint:-buffer * resoint] - diffSmooth
+                input = self.bilineardownscale(input, wc2, diff_wc, meshlist, resoint, downscale)
+                return input, wc2, wc4, x, y, xfine, yfine, meshlist
 
             elif self.var.InterpolationMethod == 'kron':
-                diff_wc = wc2 - down3
                 # on fine scale: wordclim fine scale - spreaded input data (same value for each big cell)
-                wc3 = diff_wc.reshape(wc2.shape[0] // resoint, resoint, wc2.shape[1] // resoint, resoint)
-                wc4 = np.nanmean(wc3, axis=(1, 3))
-                wc4kron = np.kron(wc4, np.ones((resoint, resoint)))
-                # wordclim is averaged on big cell scale and the average is spread out to fine raster
-                down1 = diff_wc - wc4kron + down3
+                # the average of this difference on the big cell is the average of wordclim (wc4) - input
                 # result is the fine scale input data + the difference of wordclim - input data - the average difference of wordclim - input
-                #down1 = np.where(np.isnan(down1), down3, down1)
+                down1 = wc2 - wc4.ravel()[op['parent']] + down3
             
             down1 = np.where(np.isnan(down1),down3,down1)
 
         if downscale == 2:  # precipitation
             if self.var.InterpolationMethod == 'spline':
                 quot_wc = divideValues(input, wc4)
-                quotSmooth = scipy.ndimage.zoom(quot_wc, resoint, order=1)
+                quotSmooth = op['zoom'].dot(quot_wc.ravel())
                 down1 = wc2 * quotSmooth
             elif self.var.InterpolationMethod == 'bilinear':
                 quot_wc = divideValues(input, wc4)
-                bilinear_interpolation = RegularGridInterpolator((x, y), quot_wc)
-                quotSmooth = bilinear_interpolation(meshlist)
-                quotSmooth = quotSmooth.reshape(len(xfine), len(yfine), order='F')
-                crop = int(resoint/2)
-                quotSmooth = quotSmooth[crop:-crop, crop:-crop]
-                down1 = wc2[buffer * resoint:-buffer * resoint, buffer * resoint:-buffer * resoint] * quotSmooth
+                input = self.bilineardownscale(input, wc2, quot_wc, meshlist, resoint, downscale)
+                return input, wc2, wc4, x, y, xfine, yfine, meshlist
             elif self.var.InterpolationMethod == 'kron':
                 down1 = down3 * wc4
 
             down1 = np.where(np.isnan(down1),down3,down1)
             down1 = np.where(np.isinf(down1), down3, down1)
 
-        down2 = down1[cutmapVfine[2]:cutmapVfine[3], cutmapVfine[0]:cutmapVfine[1]].astype(np.float64)
-        input = compressArray(down2)
-        if self.var.InterpolationMethod == 'bilinear' and (downscale == 1 or downscale == 2):
-            return input, wc2, wc4, x, y, xfine, yfine, meshlist
-        return input, wc2, wc4
+        # same as in compressArray
+        down1[np.abs(down1) > 1.E20] = 0.
+        return down1, wc2, wc4
+
+
+    def fineoperator(self, shape, resoint, zoom = False):
+        """
+        Mapping of the compressed fine mask cells to the coarse meteo map (without buffer)
+        Built once for each shape of the meteo map
+
+        :param shape: shape of the coarse meteo map
+        :param resoint: ratio of the resolution of meteo map and mask map
+        :param zoom: if True the linear interpolation of scipy.ndimage.zoom(order=1) is included as sparse matrix
+        :return: dictionary with row and column of the fine cells, coarse parent cell and the zoom matrix
+        """
+
+        if shape in self.fineop and (not(zoom) or 'zoom' in self.fineop[shape]):
+            return self.fineop[shape]
+
+        rows, cols = np.unravel_index(maskinfo['maskindex'], maskinfo['shape'])
+        rows = rows + cutmapVfine[2]
+        cols = cols + cutmapVfine[0]
+        op = {'rows': rows, 'cols': cols, 'parent': (rows // resoint) * shape[1] + cols // resoint}
+
+        if zoom:
+            # zoom with order 1: fine cell i is at i * (n-1)/(n*resoint-1) in coarse cells
+            def zoomweights(n, fine):
+                pos = fine * ((n - 1) / (n * resoint - 1))
+                i0 = np.minimum(np.floor(pos).astype(np.int64), n - 2)
+                return i0, pos - i0
+
+            r0, t = zoomweights(shape[0], rows)
+            c0, u = zoomweights(shape[1], cols)
+            ncells = rows.shape[0]
+            cell = np.tile(np.arange(ncells), 4)
+            index = np.concatenate((r0 * shape[1] + c0, r0 * shape[1] + c0 + 1, (r0 + 1) * shape[1] + c0, (r0 + 1) * shape[1] + c0 + 1))
+            weight = np.concatenate(((1 - t) * (1 - u), (1 - t) * u, t * (1 - u), t * u))
+            # zero weights are kept, so missing values spread like in zoom
+            op['zoom'] = scipy.sparse.csr_matrix((weight, (cell, index)), shape=(ncells, shape[0] * shape[1]))
+
+        self.fineop[shape] = op
+        return op
+
+
+    def bilinearoperator(self, shape, xfine, yfine, resoint):
+        """
+        Bilinear interpolation from the coarse meteo map (including the buffer) to the compressed fine mask cells
+        Same as RegularGridInterpolator on xfine, yfine after cropping the buffer and cutting to the mask
+
+        :param shape: shape of the coarse meteo map including the buffer
+        :param xfine: row coordinates of the fine cells in coarse cell units
+        :param yfine: column coordinates of the fine cells in coarse cell units
+        :param resoint: ratio of the resolution of meteo map and mask map
+        :return: dictionary with the sparse weight matrix, row and column of the fine cells (without buffer) and coarse parent cell
+        """
+
+        rows, cols = np.unravel_index(maskinfo['maskindex'], maskinfo['shape'])
+        rows = rows + cutmapVfine[2]
+        cols = cols + cutmapVfine[0]
+        crop = int(resoint / 2)
+
+        # position between the centres of the coarse cells (centre of cell i is at i + 0.5)
+        xx = xfine[rows + crop] - 0.5
+        yy = yfine[cols + crop] - 0.5
+        r0 = np.clip(np.floor(xx).astype(np.int64), 0, shape[0] - 2)
+        c0 = np.clip(np.floor(yy).astype(np.int64), 0, shape[1] - 2)
+        t = xx - r0
+        u = yy - c0
+
+        ncells = rows.shape[0]
+        cell = np.tile(np.arange(ncells), 4)
+        index = np.concatenate((r0 * shape[1] + c0, r0 * shape[1] + c0 + 1, (r0 + 1) * shape[1] + c0, (r0 + 1) * shape[1] + c0 + 1))
+        weight = np.concatenate(((1 - t) * (1 - u), (1 - t) * u, t * (1 - u), t * u))
+        weights = scipy.sparse.csr_matrix((weight, (cell, index)), shape=(ncells, shape[0] * shape[1]))
+
+        # coarse cell of each fine cell (+1 because of the buffer)
+        parent = (rows // resoint + 1) * shape[1] + cols // resoint + 1
+        return {'weights': weights, 'rows': rows, 'cols': cols, 'parent': parent}
+
+
+    def bilineardownscale(self, input, wc2, smooth, op, resoint, downscale):
+        """
+        Delta downscaling with bilinear interpolation directly on the compressed fine cells
+
+        :param input: coarse meteo map including the buffer
+        :param wc2: High resolution WorldClim map including the buffer
+        :param smooth: coarse difference (temperature) or quotient (precipitation) of input and WorldClim
+        :param op: interpolation operator from :meth:`hydrological_modules.readmeteo.bilinearoperator`
+        :param resoint: ratio of the resolution of meteo map and mask map
+        :param downscale: 1: for temperature , 2 for precipitation
+        :return: compressed 1D array of the downscaled meteo data
+        """
+
+        smoothC = op['weights'].dot(smooth.ravel())
+        wc2C = wc2.ravel()[(op['rows'] + resoint) * wc2.shape[1] + op['cols'] + resoint]
+        down3C = input.ravel()[op['parent']].astype(np.float64)
+
+        if downscale == 1:  # Temperature
+            down1 = wc2C - smoothC
+            down1 = np.where(np.isnan(down1), down3C, down1)
+        else:  # precipitation
+            down1 = wc2C * smoothC
+            down1 = np.where(np.isnan(down1), down3C, down1)
+            down1 = np.where(np.isinf(down1), down3C, down1)
+
+        # same as in compressArray
+        down1[np.abs(down1) > 1.E20] = 0.
+        return down1
 
      # --- end downscaling ----------------------------
 
+    def readmeteomap(self, name, **kwargs):
+        """
+        Reads a meteo map of the current day
+        If meteoPrefetch is used the map is taken from the background read, if it is there
+
+        :param name: name of the meteo map stack in the settings file e.g. PrecipitationMaps
+        :param kwargs: arguments for :meth:`management_modules.data_handling.readmeteodata`
+        :return: Compressed 1D array of meteo data and buffer information
+        """
+
+        # remember the read to repeat it for the next day
+        self.meteocalls.append((name, kwargs))
+        if name in self.prefetched:
+            return self.prefetched.pop(name)
+        return readmeteodata(name, dateVar['currDate'], **kwargs)
 
 
+    def prefetchstart(self):
+        """
+        Starts reading the meteo maps of the next day in a background thread
+        The same maps in the same order as today are read, so inputcounter and flagmeteo
+        roll over to the next file as they would do without prefetch
+        """
+
+        calls = self.meteocalls
+        self.meteocalls = []
+        if not(self.var.meteoprefetch) or dateVar['laststep']:
+            return
+
+        # maps which extend back into the past use the day of the year -> read on the day itself
+        calls = [call for call in calls if not call[1].get('extendback', False)]
+        nextdate = dateVar['currDate'] + datetime.timedelta(days=1)
+        self.prefetchThread = threading.Thread(target=self.prefetchworker, args=(calls, nextdate), daemon=True)
+        self.prefetchThread.start()
+
+
+    def prefetchworker(self, calls, date):
+        """
+        Background thread: reads and compresses the meteo maps of the next day
+
+        :param calls: list of meteo map names and arguments for readmeteodata
+        :param date: date of the next day
+        """
+
+        start = xtime.perf_counter()
+        try:
+            for name, kwargs in calls:
+                self.prefetched[name] = readmeteodata(name, date, **kwargs)
+        except BaseException as error:
+            # CWATMError exits with sys.exit -> give it back to the main thread
+            self.prefetchError = error
+        timeMesPrefetch[0] += xtime.perf_counter() - start
+
+
+    def prefetchwait(self):
+        """
+        Waits until the background read of the meteo maps is finished
+        """
+
+        if self.prefetchThread is None:
+            return
+        start = xtime.perf_counter()
+        self.prefetchThread.join()
+        timeMesPrefetch[1] += xtime.perf_counter() - start
+        self.prefetchThread = None
+        if self.prefetchError is not None:
+            error = self.prefetchError
+            self.prefetchError = None
+            raise error
 
 
     def dynamic(self):
@@ -592,19 +772,22 @@ class readmeteo(object):
             # TODO in initial there could be a check if temperature > 200 -> automatic change to Kelvin
             ZeroKelvin = 273.15
 
-        self.var.Precipitation, MaskMapBoundary = readmeteodata(self.var.preMaps, dateVar['currDate'], addZeros=True, mapsscale = self.var.meteomapsscale, buffering= self.var.buffer)
+        # meteo maps of this day which are read in the background
+        self.prefetchwait()
+
+        self.var.Precipitation, MaskMapBoundary = self.readmeteomap(self.var.preMaps, addZeros=True, mapsscale = self.var.meteomapsscale, buffering= self.var.buffer)
         self.var.Precipitation = self.var.Precipitation * self.var.DtDay * self.var.con_precipitation
 
         self.var.Precipitation = np.maximum(0., self.var.Precipitation)
         
         if self.var.includeGlaciers:
-            self.var.GlacierMelt, MaskMapBoundary = readmeteodata(self.var.glaciermeltMaps, dateVar['currDate'], addZeros=True, mapsscale = True, extendback = True)
+            self.var.GlacierMelt, MaskMapBoundary = self.readmeteomap(self.var.glaciermeltMaps, addZeros=True, mapsscale = True, extendback = True)
             # Glaciermelt and Glacierrain is preprocessed after OGGM to have a factor of 1.0 
             # -> here glacier melt is again multiplied by the CwatM snow factor to have the same values
             self.var.GlacierMelt = self.var.GlacierMelt * self.var.SnowFactor
             # extendback -> if simulation starts earlier than first glacier map -> day of the year of first year is used
             if not self.var.includeOnlyGlaciersMelt:
-                self.var.GlacierRain, MaskMapBoundary = readmeteodata(self.var.glacierrainMaps, dateVar['currDate'], addZeros=True, mapsscale = True, extendback = True)
+                self.var.GlacierRain, MaskMapBoundary = self.readmeteomap(self.var.glacierrainMaps, addZeros=True, mapsscale = True, extendback = True)
 
         if self.var.meteodown:
             if self.var.InterpolationMethod == 'bilinear':
@@ -630,7 +813,7 @@ class readmeteo(object):
         tzero = 0
         if checkOption('TemperatureInKelvin'):
             tzero = ZeroKelvin
-        self.var.Tavg, MaskMapBoundary = readmeteodata(self.var.tempMaps,dateVar['currDate'], addZeros=True, zeros = tzero, mapsscale = self.var.meteomapsscale, buffering= self.var.buffer)
+        self.var.Tavg, MaskMapBoundary = self.readmeteomap(self.var.tempMaps, addZeros=True, zeros = tzero, mapsscale = self.var.meteomapsscale, buffering= self.var.buffer)
 
         if self.var.meteodown:
             if self.var.InterpolationMethod == 'bilinear':
@@ -656,20 +839,20 @@ class readmeteo(object):
             if self.var.only_radiation:
                 # read daily calculated radiation [in KJ/m2/day]
                 # named here Rsds instead of rds, because use in evaproationPot in the same way as rsds
-                self.var.Rsds, MaskMapBoundary = readmeteodata('RGDMaps', dateVar['currDate'], addZeros=True, mapsscale=self.var.meteomapsscale)
+                self.var.Rsds, MaskMapBoundary = self.readmeteomap('RGDMaps', addZeros=True, mapsscale=self.var.meteomapsscale)
                 #self.var.Rsds = self.downscaling2(self.var.Rsds) * 0.001  # convert from KJ to MJ/m2/day
                 self.var.Rsds = self.downscaling2(self.var.Rsds) * 0.000001  # convert from KJ to MJ/m2/day
                 # but for EMO it is 1e6 instead 1000 it seems it is J instead of KJ
 
                 # read daily vapor pressure [in hPa]
-                self.var.EAct, MaskMapBoundary = readmeteodata('EActMaps', dateVar['currDate'], addZeros=True, mapsscale=self.var.meteomapsscale)
+                self.var.EAct, MaskMapBoundary = self.readmeteomap('EActMaps', addZeros=True, mapsscale=self.var.meteomapsscale)
                 self.var.EAct = self.downscaling2(self.var.EAct) * 0.1  # convert from hP to kP
             else:
-                self.var.Rsds, MaskMapBoundary = readmeteodata('RSDSMaps', dateVar['currDate'], addZeros=True, mapsscale = self.var.meteomapsscale)
+                self.var.Rsds, MaskMapBoundary = self.readmeteomap('RSDSMaps', addZeros=True, mapsscale = self.var.meteomapsscale)
                 self.var.Rsds = self.downscaling2(self.var.Rsds)
                     # radiation surface downwelling shortwave maps [W/m2]
                 #self.var.Rsdl = readnetcdf2('RSDLMaps', dateVar['currDate'], addZeros = True, meteo = True)
-                self.var.Rsdl, MaskMapBoundary = readmeteodata('RSDLMaps', dateVar['currDate'], addZeros=True, mapsscale = self.var.meteomapsscale)
+                self.var.Rsdl, MaskMapBoundary = self.readmeteomap('RSDLMaps', addZeros=True, mapsscale = self.var.meteomapsscale)
                 self.var.Rsdl = self.downscaling2(self.var.Rsdl)
                     # radiation surface downwelling longwave maps [W/m2]
 
@@ -688,7 +871,7 @@ class readmeteo(object):
         if checkOption('calc_evaporation'):
 
             #self.var.TMin = readnetcdf2('TminMaps', dateVar['currDate'], addZeros = True, zeros = ZeroKelvin, meteo = True)
-            self.var.TMin, MaskMapBoundary = readmeteodata('TminMaps',dateVar['currDate'], addZeros=True, zeros=ZeroKelvin, mapsscale = self.var.meteomapsscale, buffering= self.var.buffer)
+            self.var.TMin, MaskMapBoundary = self.readmeteomap('TminMaps', addZeros=True, zeros=ZeroKelvin, mapsscale = self.var.meteomapsscale, buffering= self.var.buffer)
             if self.var.meteodown:
                 if self.var.InterpolationMethod == 'bilinear':
                     self.var.TMin, self.var.wc2_tmin, self.var.wc4_tmin, _, _, _, _, _ = self.downscaling2(self.var.TMin,
@@ -710,7 +893,7 @@ class readmeteo(object):
                 checkmap('TminMaps', "", self.var.TMin, True, True, self.var.TMin)
 
             #self.var.TMax = readnetcdf2('TmaxMaps', dateVar['currDate'], addZeros = True, zeros = ZeroKelvin, meteo = True)
-            self.var.TMax, MaskMapBoundary = readmeteodata('TmaxMaps', dateVar['currDate'], addZeros=True, zeros=ZeroKelvin, mapsscale = self.var.meteomapsscale, buffering= self.var.buffer)
+            self.var.TMax, MaskMapBoundary = self.readmeteomap('TmaxMaps', addZeros=True, zeros=ZeroKelvin, mapsscale = self.var.meteomapsscale, buffering= self.var.buffer)
             if self.var.meteodown:
                 if self.var.InterpolationMethod == 'bilinear':
                     self.var.TMax, self.var.wc2_tmax, self.var.wc4_tmax, _, _, _, _, _ = self.downscaling2(self.var.TMax,
@@ -735,7 +918,7 @@ class readmeteo(object):
                 self.var.TMax -= ZeroKelvin
 
             #self.var.Wind = readnetcdf2('WindMaps', dateVar['currDate'], addZeros = True, meteo = True)
-            self.var.Wind, MaskMapBoundary = readmeteodata('WindMaps', dateVar['currDate'], addZeros=True, mapsscale = self.var.meteomapsscale)
+            self.var.Wind, MaskMapBoundary = self.readmeteomap('WindMaps', addZeros=True, mapsscale = self.var.meteomapsscale)
             self.var.Wind = self.downscaling2(self.var.Wind)
                 # wind speed maps at 10m [m/s]
 
@@ -747,17 +930,17 @@ class readmeteo(object):
             if not self.var.only_radiation:
 
                 #self.var.Psurf = readnetcdf2('PSurfMaps', dateVar['currDate'], addZeros = True, meteo = True)
-                self.var.Psurf, MaskMapBoundary = readmeteodata('PSurfMaps', dateVar['currDate'], addZeros=True, mapsscale = self.var.meteomapsscale)
+                self.var.Psurf, MaskMapBoundary = self.readmeteomap('PSurfMaps', addZeros=True, mapsscale = self.var.meteomapsscale)
                 self.var.Psurf = self.downscaling2(self.var.Psurf)
                     # Instantaneous surface pressure[Pa]
 
                 if returnBool('useHuss'):
                     #self.var.Qair = readnetcdf2('QAirMaps', dateVar['currDate'], addZeros = True, meteo = True)
-                    self.var.Qair, MaskMapBoundary = readmeteodata('QAirMaps', dateVar['currDate'], addZeros=True, mapsscale =self.var.meteomapsscale)
+                    self.var.Qair, MaskMapBoundary = self.readmeteomap('QAirMaps', addZeros=True, mapsscale =self.var.meteomapsscale)
                     # 2 m istantaneous specific humidity[kg / kg]
                 else:
                     #self.var.Qair = readnetcdf2('RhsMaps', dateVar['currDate'], addZeros = True, meteo = True)
-                    self.var.Qair, MaskMapBoundary = readmeteodata('RhsMaps', dateVar['currDate'], addZeros=True, mapsscale =self.var.meteomapsscale)
+                    self.var.Qair, MaskMapBoundary = self.readmeteomap('RhsMaps', addZeros=True, mapsscale =self.var.meteomapsscale)
                 self.var.Qair = self.downscaling2(self.var.Qair)
 
                 #--------------------------------------------------------
@@ -777,17 +960,17 @@ class readmeteo(object):
                     ETsamePr = True
 
             if ETsamePr:
-                self.var.ETRef, MaskMapBoundary = readmeteodata(self.var.evaTMaps, dateVar['currDate'], addZeros=True,  mapsscale=self.var.meteomapsscale)
+                self.var.ETRef, MaskMapBoundary = self.readmeteomap(self.var.evaTMaps, addZeros=True,  mapsscale=self.var.meteomapsscale)
                 self.var.ETRef = self.var.ETRef *self.var.DtDay * self.var.con_e
                 self.var.ETRef = self.downscaling2(self.var.ETRef, "downscale_wordclim_prec", self.var.wc2_prec, self.var.wc4_prec, downscale=0)
 
-                self.var.EWRef, MaskMapBoundary = readmeteodata(self.var.eva0Maps, dateVar['currDate'], addZeros=True,  mapsscale=self.var.meteomapsscale)
+                self.var.EWRef, MaskMapBoundary = self.readmeteomap(self.var.eva0Maps, addZeros=True,  mapsscale=self.var.meteomapsscale)
                 self.var.EWRef = self.var.EWRef * self.var.DtDay * self.var.con_e
                 self.var.EWRef = self.downscaling2(self.var.EWRef, "downscale_wordclim_prec", self.var.wc2_prec, self.var.wc4_prec, downscale=0)
             else:
-                self.var.ETRef, MaskMapBoundary = readmeteodata(self.var.evaTMaps, dateVar['currDate'], addZeros=True, mapsscale = True)
+                self.var.ETRef, MaskMapBoundary = self.readmeteomap(self.var.evaTMaps, addZeros=True, mapsscale = True)
                 self.var.ETRef = self.var.ETRef *self.var.DtDay * self.var.con_e
-                self.var.EWRef, MaskMapBoundary = readmeteodata(self.var.eva0Maps, dateVar['currDate'], addZeros=True, mapsscale = True)
+                self.var.EWRef, MaskMapBoundary = self.readmeteomap(self.var.eva0Maps, addZeros=True, mapsscale = True)
                 self.var.EWRef = self.var.EWRef * self.var.DtDay * self.var.con_e
                 # potential evaporation rate from water surface (conversion to [m] per time step)
                 # potential evaporation rate from a bare soil surface (conversion # to [m] per time step)
@@ -821,3 +1004,6 @@ class readmeteo(object):
                     self.var.meteo[j+2, no] = self.var.GlacierRain
             ii =1
 
+        # read the meteo maps of the next day while this day is calculated
+        self.prefetchstart()
+
@@ -73,6 +73,10 @@ class routing_kinematic(object):
     catchment                                                                                                      --   
     dirDown                                                                                                        --   
     lendirDown                                                                                                     --   
+    routingThreads                         Number of threads for the kinematic wave (1: serial)                    --   
+    dirDownLevel                           dirDown sorted by levels of the river network, for routingThreads > 1   --   
+    levelStart                             Start of each level in dirDownLevel                                     --   
+    massDown                               sparse matrix: water quality mass of each cell to its downstream cell   --   
     UpArea                                                                                                         --   
     beta                                                                                                           --   
     chanMan                                Input, Channel Manning's roughness coefficient                          --   
@@ -184,11 +188,8 @@ class routing_kinematic(object):
 
         import numpy as np
         
-    def routeMassDown(self, x, a, outletid, lakesCond, down):
-                        outlet = np.tile(globals.inZero.copy(), (self.var.n_fluxes, 1))
-                        tmp_x = np.tile(globals.inZero.copy(), (self.var.n_fluxes, 1))
-                        resLakeInflowTmp = np.tile(globals.inZero.copy(), (self.var.n_fluxes, 1))
-                        
+    def routeMassDown(self, x, a, outletid, lakesCond, outlet, resLakeInflowTmp, moved):
+                        # all fluxes [n_fluxes, cells] at once, outlet, resLakeInflowTmp and moved are work arrays
                         
                         # outlet to sea/endorheic lake
                         outlet[:, outletid] = x[:, outletid]
@@ -196,11 +197,11 @@ class routing_kinematic(object):
                         
                         if checkOption('includeWaterBodies'):
                            
-                            resLakeInflowTmp = x * lakesCond
+                            np.multiply(x, lakesCond, out=resLakeInflowTmp)
                             x -= resLakeInflowTmp
-                        for i in range(self.var.n_fluxes):
-                            tmp_x[i, down] = npareatotal(a * x[i, :], down)
-                        tmp_x -= a * x
+                        np.multiply(a, x, out=moved)
+                        tmp_x = self.var.massDown.dot(moved.T).T
+                        tmp_x -= moved
 
                         return tmp_x, resLakeInflowTmp, outlet
     
@@ -230,6 +231,19 @@ class routing_kinematic(object):
         self.var.lddCompress, dirshort, self.var.dirUp, self.var.dirupLen, self.var.dirupID, self.var.downstruct, self.var.catchment, self.var.dirDown, self.var.lendirDown = defLdd2(ldd)
         
         
+        # kinematic wave in parallel for cells at the same level of the river network
+        self.var.routingThreads = 1
+        if 'routingThreads' in binding:
+            self.var.routingThreads = int(loadmap('routingThreads'))
+            if self.var.routingThreads < 1:
+                self.var.routingThreads = os.cpu_count()
+        if (self.var.routingThreads > 1) and not(hasattr(lib2, 'kinematicLevel')):
+            msg = "routingThreads: the routing library has no kinematicLevel, please compile t5.cpp again. The kinematic wave runs serial"
+            print(CWATMWarning(msg))
+            self.var.routingThreads = 1
+        if self.var.routingThreads > 1:
+            self.var.dirDownLevel, self.var.levelStart = routingLevels(self.var.dirDown, self.var.dirupLen, self.var.dirupID)
+
         #self.var.ups = upstreamArea(dirDown, dirshort, self.var.cellArea)
         self.var.UpArea1 = upstreamArea(self.var.dirDown, dirshort, globals.inZero + 1.0)
         self.var.UpArea = upstreamArea(self.var.dirDown, dirshort, self.var.cellArea)
@@ -356,7 +370,8 @@ class routing_kinematic(object):
         if self.var.includeWaterQuality:
             if checkOption('includeWaterBodies'):
                 self.var.resLakeInflowTmp = np.tile(globals.inZero.copy(), (self.var.n_fluxes, 1))
-            
+            # mass of all fluxes from each cell to its downstream cell
+            self.var.massDown = upstreamoperator(self.var.downstruct)
 
 
     # --------------------------------------------------------------------------
@@ -492,16 +507,13 @@ class routing_kinematic(object):
 
         
         if self.var.includeWaterQuality:
-            # downstream and outlet IDs are required for mass flux routing
+            # outlet IDs are required for mass flux routing, the downstream cells are in self.var.massDown
             if checkOption('includeWaterBodies'):   
-                downdirID = self.var.downstruct.copy()
                 # type 4 reservoirs are disconnected from the stream network and do not recieve channel nutrients/sediments
                 resLakeInflowCondition = np.where(self.var.waterBodyTypTemp > 0, np.where(self.var.waterBodyTypTemp != 4, 1, 0), 0)
             else:
-                downdirID = self.var.downstruct.copy()
                 resLakeInflowCondition = globals.inZero.copy()
-            outletID = np.where(downdirID == downdirID.shape[0])[0]
-            downdirID[outletID] = outletID
+            outletID = np.where(self.var.downstruct == self.var.downstruct.shape[0])[0]
             
             # build flux arrays [erosed, TDP, PP, inactiveP]
             massFluxArray = np.tile(globals.inZero.copy(), (self.var.n_fluxes,1))
@@ -720,8 +732,7 @@ class routing_kinematic(object):
                     # move outflows to channel
                     lakeResOut_Dt = outlake
                     lakeResOut_Dt = np.where(self.var.waterBodyTypTemp > 0, lakeResOut_Dt, 0)
-                    for i in range(self.var.n_fluxes):
-                        lakeResOut_Dt[i, :] = upstream1(self.var.downstruct, lakeResOut_Dt[i, :])
+                    lakeResOut_Dt = self.var.massDown.dot(lakeResOut_Dt.T).T
                     
                     if self.var.includeErosed:
                         lakeResOut_sed_Dt = lakeResOut_Dt[0, :].copy()
@@ -739,7 +750,13 @@ class routing_kinematic(object):
             
             substepStorage_pre = self.var.channelAlpha * self.var.chanLength * self.var.discharge ** self.var.beta
             
-            if checkOption('includeWaterBodies'):
+            if self.var.routingThreads > 1:
+               if checkOption('includeWaterBodies'):
+                  lib2.kinematicLevel(self.var.discharge, sideflowChan, self.var.dirDownLevel_LR, self.var.dirupLen_LR, self.var.dirupID_LR, Qnew, self.var.channelAlpha, self.var.beta, self.var.dtRouting, self.var.chanLength, self.var.levelStart_LR, len(self.var.levelStart_LR) - 1, self.var.routingThreads)
+               else:
+                  lib2.kinematicLevel(self.var.discharge, sideflowChan, self.var.dirDownLevel, self.var.dirupLen, self.var.dirupID, Qnew, self.var.channelAlpha, self.var.beta, self.var.dtRouting, self.var.chanLength, self.var.levelStart, len(self.var.levelStart) - 1, self.var.routingThreads)
+
+            elif checkOption('includeWaterBodies'):
                lib2.kinematic(self.var.discharge, sideflowChan, self.var.dirDown_LR, self.var.dirupLen_LR, self.var.dirupID_LR, Qnew, self.var.channelAlpha, self.var.beta, self.var.dtRouting, self.var.chanLength, self.var.lendirDown_LR)
 
             else:
@@ -778,13 +795,17 @@ class routing_kinematic(object):
                 self.var.gridCellTraveled = gridCellTraveled.copy()
                 tmp_massStock = massFluxArray.copy()
                 tmp_massOutlet = np.tile(globals.inZero.copy(), (self.var.n_fluxes, 1))
-                outlet = np.tile(globals.inZero.copy(), (self.var.n_fluxes, 1))
+                # work arrays of routeMassDown, used again in each iteration
+                outlet = np.zeros_like(tmp_massStock)
+                resLakeInflowTmp = np.zeros_like(tmp_massStock)
+                moved = np.zeros_like(tmp_massStock)
                 
                 j = 1
                 while (gridCellTraveled > 0).any(): # routing of wq mass fluxes as long as water is routed
                     fracDown = np.maximum(np.where(gridCellTraveled - 1 < 0, gridCellTraveled, 1.), 0.)
                     channel, resLakeInflowTmp, outlet = self.routeMassDown(x = tmp_massStock, a = fracDown, outletid = outletID, \
-                                                                           lakesCond = resLakeInflowCondition, down = downdirID)
+                                                                           lakesCond = resLakeInflowCondition, outlet = outlet, \
+                                                                           resLakeInflowTmp = resLakeInflowTmp, moved = moved)
                     if checkOption('includeWaterBodies'):
                         self.var.resLakeInflowTmp += resLakeInflowTmp
                     tmp_massStock += channel
@@ -0,0 +1,268 @@
+#-------------------------------------------------------------------------------
+# Name:        routing_numpy
+# Purpose:     vectorized numpy version of the C++ routing kernels in t5.cpp
+#
+# Author:      agent
+#
+# Created:     17/10/2026
+# Copyright:   (c) agent 2026
+#-------------------------------------------------------------------------------
+
+import numpy as np
+
+"""
+ROUTING kernels without the compiled library
+Same functions and arguments as in t5.cpp, results are written into the output arrays.
+The river network is calculated level by level: all cells of a level are calculated at once
+"""
+
+# direction of the ldd values 1..9
+dirX = np.array([0, -1, 0, 1, -1, 0, 1, -1, 0, 1])
+dirY = np.array([0, 1, 1, 1, 0, 0, 0, -1, -1, -1])
+
+# plans of the networks already used, the array is kept so the id cannot be used again
+plans = {}
+
+
+def levels(down):
+    """
+    level of each cell in a river network: 0 for source cells, one more than the highest upstream cell for each other cell
+
+    :param down: downstream cell of each cell, -1 for pits
+    :return: level of each cell, -1 for cells in a loop or flowing into a loop
+    """
+
+    ncell = len(down)
+    remaining = np.bincount(down[down > -1], minlength=ncell)
+    level = np.full(ncell, -1, dtype=np.int64)
+    cells = np.nonzero(remaining == 0)[0]
+    l = 0
+    while cells.size:
+        level[cells] = l
+        d = down[cells]
+        d = d[d > -1]
+        np.subtract.at(remaining, d, 1)
+        cells = d[remaining[d] == 0]
+        # a cell with several upstream cells in this level is there more than once
+        if cells.size > 1:
+            cells = np.unique(cells)
+        l += 1
+    return level
+
+
+def routingLevels(dirDown, dirupLen, dirupID):
+    """
+    sorts the river network by levels: level 0 are the source cells, each other cell is one level
+    below its highest upstream cell. The cells of one level do not depend on each other
+
+    :param dirDown: cells from source to outlet
+    :param dirupLen: start of the upstream cells of each cell in dirupID
+    :param dirupID: upstream cells
+    :return: dirDown sorted by level, start of each level in the sorted dirDown (length levels + 1)
+    """
+
+    ncell = len(dirupLen) - 1
+    # each upstream cell gets the id of the downstream cell
+    down = np.full(ncell, -1, dtype=np.int64)
+    down[dirupID] = np.repeat(np.arange(ncell, dtype=np.int64), np.diff(dirupLen))
+    level = levels(down)
+
+    # stable sort keeps the order of dirDown inside one level
+    order = np.argsort(level[dirDown], kind='stable')
+    dirDownLevel = np.ascontiguousarray(dirDown[order], dtype=np.int64)
+    levelStart = np.searchsorted(level[dirDownLevel], np.arange(level[dirDown].max() + 2)).astype(np.int64)
+    return dirDownLevel, levelStart
+
+
+def getplan(key, array, make):
+    """
+    plan of a river network, made once for each network
+
+    :param key: kind of plan
+    :param array: array which defines the network
+    :param make: function to make the plan
+    :return: plan
+    """
+
+    if not((key, id(array)) in plans):
+        if len(plans) > 16:
+            plans.clear()
+        plans[(key, id(array))] = (array, make())
+    return plans[(key, id(array))][1]
+
+
+def levelplan(dirDownLevel, levelStart, dirUpLen, dirUpID):
+    """
+    for each level the cells, their upstream cells and to which cell of the level each upstream cell belongs
+
+    :return: list of (cells, upstream cells, number of the cell in the level)
+    """
+
+    plan = []
+    for l in range(len(levelStart) - 1):
+        cells = dirDownLevel[levelStart[l]:levelStart[l + 1]]
+        start = dirUpLen[cells]
+        count = dirUpLen[cells + 1] - start
+        seg = np.repeat(np.arange(len(cells)), count)
+        # positions in dirUpID: start of the cell + position inside the cell
+        pos = np.repeat(start - np.cumsum(count) + count, count) + np.arange(count.sum())
+        plan.append((cells, dirUpID[pos], seg))
+    return plan
+
+
+def iterateToQnew(Qin, Qold, q, alpha, beta, deltaT, deltaX):
+    """
+    Newton iteration of the kinematic wave for many cells at once, as IterateToQnew in t5.cpp
+    """
+
+    MAX_ITERS = 10
+    epsilon = 0.0001
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ab_pQ = alpha * beta * ((Qold + Qin) / 2) ** (beta - 1)
+        deltaTX = deltaT / deltaX
+        C = deltaTX * Qin + alpha * Qold ** beta + deltaT * q
+
+        Qkx = (deltaTX * Qin + Qold * ab_pQ + deltaT * q) / (deltaTX + ab_pQ)
+        fQkx = deltaTX * Qkx + alpha * Qkx ** beta - C
+        dfQkx = deltaTX + alpha * beta * Qkx ** (beta - 1)
+        Qkx = Qkx - fQkx / dfQkx
+        # as mmax in t5.cpp: nan gives the lower limit
+        Qkx = np.where(Qkx > 1e-30, Qkx, 1e-30)
+
+        done = np.zeros(Qkx.shape, dtype=bool)
+        for count in range(MAX_ITERS):
+            fQkx = deltaTX * Qkx + alpha * Qkx ** beta - C
+            dfQkx = deltaTX + alpha * beta * Qkx ** (beta - 1)
+            Qkx = np.where(done, Qkx, Qkx - fQkx / dfQkx)
+            done |= ~(np.abs(fQkx) > epsilon)
+            if done.all():
+                break
+
+    # if no input then output = 0
+    return np.where(((Qin + Qold + q) == 0) | ~(Qkx > 0.), 0., Qkx)
+
+
+def kinematicLevel(Qold, q, dirDown, dirUpLen, dirUpID, Qnew, alpha, beta, deltaT, deltaX, levelStart, levels, threads):
+    """
+    kinematic wave level by level, dirDown sorted by levels (see routingLevels). threads is not used
+    """
+
+    plan = getplan('level', dirDown, lambda: levelplan(dirDown, levelStart, dirUpLen, dirUpID))
+    for cells, up, seg in plan[:levels]:
+        Qin = np.bincount(seg, weights=Qnew[up], minlength=len(cells))
+        Qnew[cells] = iterateToQnew(Qin, Qold[cells], q[cells], alpha[cells], beta, deltaT, deltaX[cells])
+
+
+def kinematic(Qold, q, dirDown, dirUpLen, dirUpID, Qnew, alpha, beta, deltaT, deltaX, size):
+    """
+    kinematic wave, the levels of the river network are calculated the first time
+    """
+
+    def make():
+        dirDownLevel, levelStart = routingLevels(dirDown[:size], dirUpLen, dirUpID)
+        return levelplan(dirDownLevel, levelStart, dirUpLen, dirUpID)
+
+    plan = getplan('kinematic', dirDown, make)
+    for cells, up, seg in plan:
+        Qin = np.bincount(seg, weights=Qnew[up], minlength=len(cells))
+        Qnew[cells] = iterateToQnew(Qin, Qold[cells], q[cells], alpha[cells], beta, deltaT, deltaX[cells])
+
+
+def ups(in_array, dirshort, out_array, size):
+    """
+    upstream area: the value of each cell is added to all downstream cells
+    """
+
+    def make():
+        level = levels(dirshort)
+        order = np.argsort(level, kind='stable')
+        start = np.searchsorted(level[order], np.arange(level.max() + 2))
+        plan = []
+        for l in range(len(start) - 1):
+            cells = order[start[l]:start[l + 1]]
+            cells = cells[dirshort[cells] > -1]
+            plan.append((cells, dirshort[cells]))
+        return plan
+
+    for cells, down in getplan('ups', dirshort, make):
+        np.add.at(out_array, down, out_array[cells])
+
+
+def dirID(lddorder, ldd, out_array, sizei, sizej):
+    """
+    for each cell the number of the downstream cell
+    """
+
+    ldd = np.asarray(ldd)
+    lddvalue = np.where(ldd > 9, 0, ldd)
+    y, x = np.nonzero((lddvalue != 0) & (lddvalue != 5))
+    v = lddvalue[y, x]
+    yy = y + dirY[v]
+    xx = x + dirX[v]
+    inside = (yy >= 0) & (yy < sizei) & (xx >= 0) & (xx < sizej)
+    np.asarray(out_array)[y[inside], x[inside]] = np.asarray(lddorder)[yy[inside], xx[inside]]
+
+
+def repairLdd1(ldd, sizei, sizej):
+    """
+    cells which flow out of the map or into a cell without value become pits
+    """
+
+    ldd = np.asarray(ldd)
+    lddvalue = np.where(ldd > 9, 0, ldd)
+    y, x = np.nonzero((lddvalue != 0) & (lddvalue != 5))
+    v = lddvalue[y, x]
+    yy = y + dirY[v]
+    xx = x + dirX[v]
+    pit = (yy < 0) | (yy >= sizei) | (xx < 0) | (xx >= sizej)
+    pit[~pit] = ldd[yy[~pit], xx[~pit]] == 0
+    ldd[y[pit], x[pit]] = 5
+
+
+def repairLdd2(ldd, dir, check, sizei):
+    """
+    loops in the river network get a pit
+    """
+
+    down = np.where(ldd[:sizei] == 5, -1, dir[:sizei])
+    if (levels(down) > -1).all():
+        # no loops: every cell reaches a pit
+        check[:sizei][ldd[:sizei] != 5] = 1
+        return
+
+    # same order as in t5.cpp, because it decides which cell of a loop becomes a pit
+    for i in range(sizei):
+        path = []
+        inpath = set()
+        j = i
+        while True:
+            if j in inpath:
+                id = path[-1]
+                ldd[id] = 5
+                dir[id] = -1
+                break
+            if (ldd[j] == 5) or (check[j] == 1):
+                break
+            path.append(j)
+            inpath.add(j)
+            j = dir[j]
+        check[path] = 1
+
+
+def runoffConc(conc, peak, fraction, flow, maxlag, size):
+    """
+    runoff concentration with a triangular weighting function
+    """
+
+    div = 2 * peak ** 2
+    areaFractionOld = 0.
+    for lag in range(maxlag):
+        lag1 = lag + 1.
+        lag1alt = 2 * peak - lag1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            area = lag1 ** 2 / div
+            areaAlt = 1 - lag1alt ** 2 / div
+        areaFractionSum = np.where(lag1 > peak, areaAlt, area)
+        areaFractionSum = np.where(lag1alt < 1, 1.0, areaFractionSum)
+        conc[lag, :size] = conc[lag, :size] + fraction * flow * (areaFractionSum - areaFractionOld)
+        areaFractionOld = areaFractionSum
@@ -11,7 +11,10 @@
 
 import numpy as np
 import math
+import itertools
+import scipy.sparse
 from cwatm.management_modules.data_handling import *
+from cwatm.hydrological_modules.routing_reservoirs.routing_numpy import routingLevels
 
 """
 ROUTING subroutines
@@ -50,6 +53,7 @@ def decompress1(map):
 def postorder(dirUp,catchment,node,catch,dirDown):
     """
     Routine to run a postorder tree traversal
+    Iterative with a stack, so deep rivers do not reach the recursion limit of python
 
     :param dirUp:
     :param catchment:
@@ -59,38 +63,59 @@ def postorder(dirUp,catchment,node,catch,dirDown):
     :return: dirDown and catchment
     """
 
-    if dirUp[node] != []:
-        postorder(dirUp,catchment,dirUp[node][0],catch,dirDown)
-        catchment[dirUp[node][0]]=catch
-        dirDown.append(dirUp[node][0])
-        if len(dirUp[node])>1:
-            postorder(dirUp,catchment,dirUp[node][1],catch,dirDown)
-            catchment[dirUp[node][1]]=catch
-            dirDown.append(dirUp[node][1])
-            if len(dirUp[node])>2:
-               postorder(dirUp,catchment,dirUp[node][2],catch,dirDown)
-               catchment[dirUp[node][2]]=catch
-               dirDown.append(dirUp[node][2])
-               if len(dirUp[node])>3:
-                postorder(dirUp,catchment,dirUp[node][3],catch,dirDown)
-                catchment[dirUp[node][3]]=catch
-                dirDown.append(dirUp[node][3])
-                if len(dirUp[node])>4:
-                 postorder(dirUp,catchment,dirUp[node][4],catch,dirDown)
-                 catchment[dirUp[node][4]]=catch
-                 dirDown.append(dirUp[node][4])
-                 if len(dirUp[node])>5:
-                  postorder(dirUp,catchment,dirUp[node][5],catch,dirDown)
-                  catchment[dirUp[node][5]]=catch
-                  dirDown.append(dirUp[node][5])
-                  if len(dirUp[node])>6:
-                   postorder(dirUp,catchment,dirUp[node][6],catch,dirDown)
-                   catchment[dirUp[node][6]]=catch
-                   dirDown.append(dirUp[node][6])
-                   if len(dirUp[node])>7:
-                    postorder(dirUp,catchment,dirUp[node][7],catch,dirDown)
-                    catchment[dirUp[node][7]]=catch
-                    dirDown.append(dirUp[node][7])
+    stack = [(node, 0)]
+    while stack:
+        cell, i = stack.pop()
+        if i < len(dirUp[cell]):
+            stack.append((cell, i + 1))
+            stack.append((dirUp[cell][i], 0))
+        elif cell != node:
+            catchment[cell] = catch
+            dirDown.append(cell)
+
+
+def downCell(dirUp):
+    """
+    downstream cell of each cell from the upstream cells
+
+    :param dirUp: upstream cells of each cell
+    :return: downstream cell of each cell, -1 for pits; number of upstream cells of each cell; all upstream cells in the order of dirUp
+    """
+
+    ncell = len(dirUp)
+    count = np.fromiter(map(len, dirUp), dtype=np.int64, count=ncell)
+    up = np.fromiter(itertools.chain.from_iterable(dirUp), dtype=np.int64, count=count.sum())
+    down = np.full(ncell, -1, dtype=np.int64)
+    down[up] = np.repeat(np.arange(ncell, dtype=np.int64), count)
+    return down, count, up
+
+
+def pathJump(down, value, func):
+    """
+    combines the value of each cell with the values of all cells downstream of it
+    by pointer jumping: each step doubles the part of the path already combined
+    so the number of steps is log2 of the longest river
+
+    :param down: downstream cell of each cell, -1 for pits
+    :param value: value of each cell
+    :param func: np.add, np.minimum or np.maximum
+    :return: combined value of each cell, outlet of each cell (-1 for cells in a loop)
+    """
+
+    acc = value.copy()
+    top = np.arange(len(down), dtype=np.int64)
+    ptr = down.copy()
+    has = np.nonzero(ptr > -1)[0]
+    for step in range(len(down).bit_length() + 1):
+        if not(has.size):
+            break
+        p = ptr[has]
+        acc[has] = func(acc[has], acc[p])
+        top[has] = top[p]
+        ptr[has] = ptr[p]
+        has = has[ptr[has] > -1]
+    top[has] = -1
+    return acc, top
 
 
 def dirUpstream(dirshort):
@@ -101,28 +126,24 @@ def dirUpstream(dirshort):
     :return: direction upstream
     """
 
-    # -- up direction
-    dirUp = list([] for i in range(maskinfo['mapC'][0]))
-    for i in range(dirshort.shape[0]):
-        value=dirshort[i]
-        if value > -1:
-           dirUp[value].append(i)
+    # -- up direction: upstream cells sorted by downstream cell, in each group in the order of the cells
+    cells = np.nonzero(dirshort > -1)[0]
+    dirupID = cells[np.argsort(dirshort[cells], kind='stable')].astype(np.int64)
+    count = np.bincount(dirshort[cells], minlength=maskinfo['mapC'][0])
+    dirupLen = np.concatenate(([0], np.cumsum(count))).astype(np.int64)
 
-    dirupLen=[0]
-    dirupID=[]
-    j = 0
-    for i in range(dirshort.shape[0]):
-        j += len(dirUp[i])
-        dirupLen.append(j)
-        for k in range(len(dirUp[i])):
-            dirupID.append(dirUp[i][k])
+    ids = dirupID.tolist()
+    pos = dirupLen.tolist()
+    dirUp = [ids[pos[i]:pos[i + 1]] for i in range(maskinfo['mapC'][0])]
 
-    return dirUp,np.array(dirupLen).astype(np.int64),np.array(dirupID).astype(np.int64)
+    return dirUp,dirupLen,dirupID
 
 
 def dirDownstream(dirUp,lddcomp,dirDown):
     """
     runs the river network tree downstream - from source to outlet
+    same order as a postorder traversal from each pit, without recursion:
+    each cell gets the position after all its upstream cells
 
     :param dirUp:
     :param lddcomp:
@@ -130,15 +151,34 @@ def dirDownstream(dirUp,lddcomp,dirDown):
     :return: direction downstream
     """
 
-    catchment = np.array(np.zeros(maskinfo['mapC'][0]), dtype=np.int64)
-    j=0
-    for pit in range(maskinfo['mapC'][0]):
-        if lddcomp[pit]==5:
-            j+=1
-            postorder(dirUp,catchment,pit,j,dirDown)
-            dirDown.append(pit)
-            catchment[pit]=j
-    return np.array(dirDown).astype(np.int64),np.array(catchment).astype(np.int64)
+    ncell = maskinfo['mapC'][0]
+    down, count, up = downCell(dirUp)
+    pits = np.nonzero(lddcomp[:ncell] == 5)[0]
+    down[pits] = -1
+
+    # number of cells upstream including the cell itself, calculated from the sources (deepest cells first)
+    depth = pathJump(down, np.ones(ncell, dtype=np.int64), np.add)[0]
+    order = np.argsort(-depth, kind='stable').astype(np.int64)
+    size = upstreamArea(order, down, np.ones(ncell)).astype(np.int64)
+
+    # upstream cells of a cell follow each other: offset is the size of the cells before in dirUp
+    cumsize = np.concatenate(([0], np.cumsum(size[up])))
+    offset = np.zeros(ncell, dtype=np.int64)
+    offset[up] = cumsize[:-1] - cumsize[np.repeat(np.cumsum(count) - count, count)]
+    # the pits one after the other
+    offset[pits] = np.cumsum(size[pits]) - size[pits]
+    first, top = pathJump(down, offset, np.add)
+
+    # only cells which flow into a pit
+    catch = np.zeros(ncell, dtype=np.int64)
+    catch[pits] = np.arange(1, len(pits) + 1)
+    catchment = np.where(top > -1, catch[top], 0)
+    inside = np.nonzero(catchment > 0)[0]
+
+    # each cell comes after all its upstream cells
+    dirDownnew = np.empty(len(inside), dtype=np.int64)
+    dirDownnew[first[inside] + size[inside] - 1] = inside
+    return np.concatenate((np.array(dirDown, dtype=np.int64), dirDownnew)),catchment
 
 
 
@@ -167,6 +207,21 @@ def upstream1(downstruct, weight):
     return np.bincount(downstruct, weights=weight)[:-1]
 
 
+def upstreamoperator(downstruct):
+    """
+    Sparse matrix version of upstream1 for several maps at once:
+    operator.dot(block.T).T is upstream1 for each row of block (e.g. all fluxes of the water quality)
+
+    :param downstruct: downstream cell of each cell, number of cells for pits
+    :return: sparse matrix cells x cells, 1 at (downstream cell, cell)
+    """
+
+    ncell = len(downstruct)
+    cols = np.nonzero(downstruct < ncell)[0]
+    # columns of each row in ascending order: the values are summed in the same order as in bincount
+    return scipy.sparse.csr_matrix((np.ones(len(cols)), (downstruct[cols], cols)), shape=(ncell, ncell))
+
+
 def downstream1(dirUp,weight):
     """
     calculated 1 cell downstream
@@ -176,12 +231,9 @@ def downstream1(dirUp,weight):
     :return: dowmnstream 1 cell
     """
 
+    down = downCell(dirUp)[0]
     downstream = weight.copy()
-    k = 0
-    for i in dirUp:
-        for j in i:
-           downstream[j]=weight[k]
-        k += 1
+    downstream[down > -1] = weight[down[down > -1]]
     return downstream
 
 
@@ -194,21 +246,52 @@ def catchment1(dirUp, points):
     :return: subcatchment
     """
 
-    subcatch = np.array(np.zeros(maskinfo['mapC'][0]), dtype=np.int64)
+    ncell = maskinfo['mapC'][0]
+    subcatch = np.array(np.zeros(ncell), dtype=np.int64)
     # if subcatchment = true ->  calculation of subcatchment: every point is calculated
     # if false : calculation of catchment: only point calculated which are not inside a bigger catchment from another point
 
+    # points are taken in the order of the cells: a point is used if no point before it is downstream
+    # the catchment of a point includes the points upstream, a point later in order overwrites the ones before
+    down = downCell(dirUp)[0]
+    cell = np.arange(ncell, dtype=np.int64)
+    firstpoint = pathJump(down, np.where(points > 0, cell, ncell), np.minimum)[0]
+    firstdown = np.where(down > -1, firstpoint[down], ncell)
+    used = (points > 0) & (firstdown > cell)
+    lastused = pathJump(down, np.where(used, cell, -1), np.maximum)[0]
 
-    for cell in range(maskinfo['mapC'][0]):
-        j = points[cell]
-        if (j > 0) and (subcatch[cell] < 1):
-            dirDown =[]
-            postorder(dirUp, subcatch, cell, j,dirDown)
-            subcatch[cell] = j
+    subcatch[lastused > -1] = points[lastused[lastused > -1]]
     return subcatch
 
 
 
+def catchmentoperator(dirUp, cells, weights):
+    """
+    sparse operator of the catchments of several points, catchments can be nested
+    the operator times a map gives the weighted catchment total of each point
+
+    :param dirUp: upstream cells of each cell
+    :param cells: cell number of each point
+    :param weights: weight of each cell e.g. cell area
+    :return: sparse matrix points x cells
+    """
+
+    rows = []
+    cols = []
+    for i in range(len(cells)):
+        # all cells upstream of the point including the point
+        catch = [cells[i]]
+        j = 0
+        while j < len(catch):
+            catch.extend(dirUp[catch[j]])
+            j += 1
+        rows.append(np.full(len(catch), i, dtype=np.int64))
+        cols.append(np.array(catch, dtype=np.int64))
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+    return scipy.sparse.csr_matrix((weights[cols], (rows, cols)), shape=(len(cells), maskinfo['mapC'][0]))
+
+
 def subcatchment1(dirUp, points,ups):
     """
     calculates subcatchments of points
@@ -225,19 +308,17 @@ def subcatchment1(dirUp, points,ups):
 
     subs = {}
     #sort waterbodies of reverse upstream area
-    for cell in range(maskinfo['mapC'][0]):
-        if points[cell] > 0:
-            subs[points[cell]] = [cell, ups[cell]]
+    for cell in np.nonzero(points > 0)[0]:
+        subs[points[cell]] = [cell, ups[cell]]
     subsort = sorted(list(subs.items()), key=lambda x: x[1][1], reverse=True)
 
-
-    #for cell in xrange(maskinfo['mapC'][0]):
-    for sub in subsort:
-        j = sub[0]
-        cell = sub[1][0]
-        dirDown=[]
-        postorder(dirUp, subcatch, cell, j,dirDown)
-        subcatch[cell] = j
+    # each subcatchment overwrites the ones before: the last one downstream of a cell (or the cell itself) counts
+    rank = np.full(maskinfo['mapC'][0], -1, dtype=np.int64)
+    for i, sub in enumerate(subsort):
+        rank[sub[1][0]] = i
+    last = pathJump(downCell(dirUp)[0], rank, np.maximum)[0]
+    value = np.array([sub[0] for sub in subsort], dtype=np.int64)
+    subcatch[last > -1] = value[last[last > -1]]
 
     return subcatch
 
@@ -274,7 +355,7 @@ def defLdd2(ldd):
     # for upstream calculation
     inAr = np.arange(maskinfo['mapC'][0], dtype=np.int64)
     # each upstream pixel gets the id of the downstream pixel
-    downstruct = downstream1(dirUp, inAr).astype(np.int64)
+    downstruct = np.where(dirshort > -1, dirshort, inAr).astype(np.int64)
     # all pits gets a high number
     downstruct[lddCompress == 5] = maskinfo['mapC'][0]
 
@@ -3,6 +3,9 @@
 #include <stdio.h>
 #include <vector>
 #include <algorithm>
+#ifdef _OPENMP
+   #include <omp.h>
+#endif
 #define mmax(x, y) ((x > y) ? (x) : (y))
 
 #ifdef __unix__
@@ -23,6 +26,7 @@ DLLEXPORT void dirID(long long* lddorder, long long* ldd, long long* out_array,
 DLLEXPORT void repairLdd1(long long * ldd, int sizei, int sizej);
 DLLEXPORT void repairLdd2(long long* ldd, long long* dir,long long* check, int sizei);
 DLLEXPORT void kinematic(double * Qold, double * q,long long* dirDown,long long* dirUpLen, long long* dirUpID, double * Qnew,double * alpha, double beta, double deltaT, double * deltaX, int size);
+DLLEXPORT void kinematicLevel(double * Qold, double * q,long long* dirDown,long long* dirUpLen, long long* dirUpID, double * Qnew,double * alpha, double beta, double deltaT, double * deltaX, long long* levelStart, int levels, int threads);
 
 DLLEXPORT void runoffConc(double * conc, double * peak, double * fraction, double * flow, int maxlag, int size);
 
@@ -101,7 +105,8 @@ void repairLdd2(long long* ldd, long long* dir,long long* check, int sizei){
         k = 0;
         j = i;
         while( 1 ) {
-           if(std::find(path.begin(), path.end(), j) != path.end()) {
+           /* check = 2: cell is already in the path -> loop */
+           if(check[j] == 2) {
               id = path[k-1];
               ldd[id] = 5;
               dir[id] = -1;
@@ -110,6 +115,7 @@ void repairLdd2(long long* ldd, long long* dir,long long* check, int sizei){
            if ((ldd[j] == 5) || (check[j] == 1))
               break;
            path.push_back (j);
+           check[j] = 2;
            k++;
            j = dir[j];
         }
@@ -259,6 +265,30 @@ void kinematic(double * Qold,double * q,long long* dirDown,long long* dirUpLen,l
 }
   
 
+/*  Same as kinematic, but dirDown is sorted by levels: all cells of a level have their upstream cells
+    in the levels before, so the cells of one level are calculated in parallel.
+    levelStart[l] .. levelStart[l+1]-1 are the positions in dirDown of level l.
+    Each cell is calculated exactly as in kinematic, so the discharge is the same */
+void kinematicLevel(double * Qold,double * q,long long* dirDown,long long* dirUpLen,long long* dirUpID,double * Qnew, double * alpha, double beta, double deltaT, double * deltaX, long long* levelStart, int levels, int threads){
+
+    int l;
+    long long i,j;
+    long long down;
+    double Qin;
+
+    for(l=0;l<levels;l++){
+        #pragma omp parallel for num_threads(threads) private(j,down,Qin) schedule(static) if(levelStart[l+1] - levelStart[l] > 256)
+        for(i=levelStart[l];i<levelStart[l+1];i++){
+            Qin = 0.0;
+            down = dirDown[i];
+            for(j=dirUpLen[down];j<dirUpLen[down+1];j++)
+                Qin += Qnew[dirUpID[j]];
+            Qnew[down] = IterateToQnew(Qin,Qold[down],q[down],alpha[down],beta,deltaT,deltaX[down]);
+        }
+    }
+}
+
+
 void runoffConc(double * conc, double * peak, double * fraction, double * flow, int maxlag, int size){
 	
 	int i,k,lag;
@@ -22,6 +22,7 @@ import difflib  # to check the closest word in settingsfile, if an error occurs
 import math
 from cwatm.management_modules.dynamicModel import *
 
+import netCDF4
 from netCDF4 import Dataset,num2date,date2num,date2index
 #from netcdftime import utime
 
@@ -29,6 +30,34 @@ from osgeo import gdal
 from osgeo import osr
 from osgeo import gdalconst
 import warnings
+import threading
+import queue
+import multiprocessing
+import traceback
+import functools
+import hashlib
+import json
+import struct
+import time as xtime
+
+
+# the netcdf/hdf5 library is not thread safe -> if meteo maps are read in a background thread (meteoPrefetch)
+# all access to netcdf files is serialised with this lock
+netcdfLock = threading.RLock()
+
+def netcdflocked(func):
+    """
+    Decorator to serialise the netcdf access of a function with the meteo prefetch thread
+
+    :param func: function which reads or writes netcdf files
+    :return: function which holds the netcdf lock while running
+    """
+
+    @functools.wraps(func)
+    def locked(*args, **kwargs):
+        with netcdfLock:
+            return func(*args, **kwargs)
+    return locked
 
 def valuecell( coordx, coordstr, returnmap = True):
     """
@@ -226,18 +255,7 @@ def loadsetclone(self,name):
 
 #    mask=np.isnan(mapnp)
 #    mask[mapnp==0] = True # all 0 become mask out
-    mapC = np.ma.compressed(np.ma.masked_array(mask,mask))
-
-    # Definition of compressed array and info how to blow it up again
-    maskinfo['mask']=mask
-    maskinfo['shape']=mask.shape
-    maskinfo['maskflat']=mask.ravel()    # map to 1D not compresses
-    maskinfo['shapeflat']=maskinfo['maskflat'].shape   #length of the 1D array
-    maskinfo['mapC']=mapC.shape                        # length of the compressed 1D array
-    maskinfo['maskall'] =np.ma.masked_all(maskinfo['shapeflat'])  # empty map 1D but with mask
-    maskinfo['maskall'].mask = maskinfo['maskflat']
-
-    globals.inZero=np.zeros(maskinfo['mapC'])
+    mapC = setmaskinfo(mask)
 
     if Flags['check']:
         checkmap("Mask+Ldd", "", np.ma.masked_array(mask,mask), flagmap, True, mapC)
@@ -288,9 +306,20 @@ def maskfrompoint(mask2D, xleft, yup):
     maskmapAttr['row'] = mask2D.shape[0]
 
     mask = np.invert(np.bool8(mask2D))
+    mapC = setmaskinfo(mask)
+    return mapC
+
+
+def setmaskinfo(mask):
+    """
+    Definition of compressed array and info how to blow it up again
+
+    :param mask: 2D boolean array, True for cells outside the modelled area
+    :return: compressed mask map
+    """
+
     mapC = np.ma.compressed(np.ma.masked_array(mask, mask))
 
-    # Definition of compressed array and info how to blow it up again
     maskinfo['mask'] = mask
     maskinfo['shape'] = mask.shape
     maskinfo['maskflat'] = mask.ravel()  # map to 1D not compresses
@@ -298,11 +327,18 @@ def maskfrompoint(mask2D, xleft, yup):
     maskinfo['mapC'] = mapC.shape  # length of the compressed 1D array
     maskinfo['maskall'] = np.ma.masked_all(maskinfo['shapeflat'])  # empty map 1D but with mask
     maskinfo['maskall'].mask = maskinfo['maskflat']
+    # hash of the mask -> key for the static map cache
+    maskinfo['maskhash'] = hashlib.sha1(np.packbits(mask).tobytes() + str(mask.shape).encode()).hexdigest()
+    # flat index of the valid cells -> compressArray and decompress are a simple gather/scatter
+    maskinfo['maskindex'] = np.flatnonzero(~maskinfo['maskflat'])
+    # empty map 1D with missing values for decompress
+    maskinfo['maskfill'] = np.full(maskinfo['shapeflat'], -9999.)
 
     globals.inZero = np.zeros(maskinfo['mapC'])
     return mapC
 
 
+@netcdflocked
 def loadmap(name, lddflag=False,compress = True, local = False, cut = True):
     """
     load a static map either value or pc raster map or netcdf
@@ -329,6 +365,16 @@ def loadmap(name, lddflag=False,compress = True, local = False, cut = True):
         load = False
 
 
+    cachefile = None
+    if not load and compress:
+        # if the map is already in the static map cache it is taken from there
+        cachefile = staticcachefile(value, local, cut)
+        if cachefile is not None:
+            mapC = staticcacheread(cachefile)
+            if mapC is not None:
+                return mapC
+            loadstart = xtime.perf_counter()
+
     if not load:   # read a netcdf  (single one not a stack)
         filename = os.path.splitext(value)[0] + '.nc'
          # get mapextend of netcdf map and calculate the cutting
@@ -409,10 +455,95 @@ def loadmap(name, lddflag=False,compress = True, local = False, cut = True):
             if Flags['check']:
                 checkmap(name, filename, mapnp, True, False, 0)
 
+        if cachefile is not None:
+            staticcachewrite(cachefile, mapC, xtime.perf_counter() - loadstart)
+
+
+    return mapC
+
+
+def staticcachefile(value, local, cut):
+    """
+    File name of a static map in the binary map cache (option staticMapCache)
+    The name is a hash of the source file name, its modification time and size, the mask and the cut window
+
+    :param value: file name of the map from the settings file
+    :param local: if True the map is local and will be not cut
+    :param cut: if True the map will be cut
+    :return: file name in the cache, None if no cache is used
+    """
+
+    if not('staticMapCache' in binding) or Flags['check'] or not('maskhash' in maskinfo):
+        return None
+    cachedir = cbinding('staticMapCache')
+    if cachedir.lower() in ["", "none", "false"]:
+        return None
+
+    # the same order as in loadmap: netcdf first then any other file
+    source = os.path.splitext(value)[0] + '.nc'
+    if not(os.path.isfile(source)):
+        source = value
+    try:
+        stat = os.stat(source)
+    except:
+        # file does not exist -> the error message comes from loadmap
+        return None
+
+    key = [os.path.abspath(source), stat.st_mtime, stat.st_size, maskinfo['maskhash'], local, cut, str(timestepInit),
+           maskmapAttr['x'], maskmapAttr['y'], maskmapAttr['col'], maskmapAttr['row'], maskmapAttr['cell']]
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(cachedir, name + "_" + hashlib.sha1(str(key).encode()).hexdigest() + ".npy")
 
+
+def staticcacheread(cachefile):
+    """
+    Read a static map from the binary map cache as memory map (copy on write)
+
+    :param cachefile: file name in the cache
+    :return: 1D numpy array of map, None if the map is not in the cache
+    """
+
+    start = xtime.perf_counter()
+    try:
+        mapC = np.asarray(np.load(cachefile, mmap_mode='c'))
+        with open(cachefile + ".time", "r") as f:
+            loadtime = float(f.read())
+    except:
+        staticcache['misses'] += 1
+        return None
+
+    staticcache['hits'] += 1
+    staticcache['saved'] += loadtime - (xtime.perf_counter() - start)
     return mapC
 
 
+def staticcachewrite(cachefile, mapC, loadtime):
+    """
+    Store a static map in the binary map cache
+    Written to a temporary file first, so parallel runs (e.g. calibration) do not read a half written map
+
+    :param cachefile: file name in the cache
+    :param mapC: 1D numpy array of map
+    :param loadtime: time needed to load the map from the source file
+    :return: -
+    """
+
+    try:
+        if not(os.path.isdir(os.path.dirname(cachefile))):
+            os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+        tmp = cachefile + "." + str(os.getpid()) + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(mapC))
+        with open(tmp + ".time", "w") as f:
+            f.write(str(loadtime))
+        os.replace(tmp + ".time", cachefile + ".time")
+        os.replace(tmp, cachefile)
+    except:
+        # the model does not stop if the cache cannot be written
+        if Flags['loud']:
+            print(CWATMWarning("Static map cache: could not write " + cachefile))
+
+
 # -----------------------------------------------------------------------
 # Compressing to 1-dimensional numpy array
 # -----------------------------------------------------------------------
@@ -430,18 +561,24 @@ def compressArray(map, name="None", zeros = 0.):
     if map.shape != maskinfo['mask'].shape:
         msg = "Error 105: " + name + " has a different shape than area or ldd \n"
         raise CWATMError(msg)
-    
-    mapnp1 = np.ma.masked_array(map, maskinfo['mask'])
-    mapC = np.ma.compressed(mapnp1)
-    # if fill: mapC[np.isnan(mapC)]=0
-    if name != "None":
-        if np.max(np.isnan(mapC)):
-            msg = "Error 106:" + name + " has less valid pixels than area or ldd \n"
-            raise CWATMError(msg)
-            # test if map has less valid pixel than area.map (or ldd)
-    # if a value is bigger or smaller than 1e20, -1e20 than the standard value is taken
-    mapC[mapC > 1.E20] = zeros
-    mapC[mapC < -1.E20] = zeros
+
+    if np.ma.is_masked(map) and np.ma.getmaskarray(map).ravel().take(maskinfo['maskindex']).any():
+        # masked cells inside the mask -> these cells are dropped as before
+        mapnp1 = np.ma.masked_array(map, maskinfo['mask'])
+        mapC = np.ma.compressed(mapnp1)
+    else:
+        mapC = np.take(np.ma.getdata(map), maskinfo['maskindex'])
+
+    # integer maps cannot have missing values or values bigger than 1e20
+    if mapC.dtype.kind == 'f':
+        # if fill: mapC[np.isnan(mapC)]=0
+        if name != "None":
+            if np.isnan(mapC).any():
+                msg = "Error 106:" + name + " has less valid pixels than area or ldd \n"
+                raise CWATMError(msg)
+                # test if map has less valid pixel than area.map (or ldd)
+        # if a value is bigger or smaller than 1e20, -1e20 than the standard value is taken
+        mapC[np.abs(mapC) > 1.E20] = zeros
 
     return mapC
 
@@ -453,22 +590,24 @@ def decompress(map):
     :return: 2D array for displaying
     """
 
-    # dmap=np.ma.masked_all(maskinfo['shapeflat'], dtype=map.dtype)
-    dmap = maskinfo['maskall'].copy()
-    dmap[~maskinfo['maskflat']] = map[:]
-    dmap = dmap.reshape(maskinfo['shape'])
-
     # check if integer map (like outlets, lakes etc
     try:
         checkint = str(map.dtype)
     except:
         checkint = "x"
-    if checkint == "int16" or checkint == "int32":
-        dmap[dmap.mask] = -9999
-    elif checkint == "int8":
+
+    if checkint == "int8":
+        # dmap=np.ma.masked_all(maskinfo['shapeflat'], dtype=map.dtype)
+        dmap = maskinfo['maskall'].copy()
+        dmap[~maskinfo['maskflat']] = map[:]
+        dmap = dmap.reshape(maskinfo['shape'])
         dmap[dmap < 0] = 0
-    else:
-        dmap[dmap.mask] = -9999
+        return dmap
+
+    # all missing values are -9999 -> scatter the values into a copy of the filled map
+    dmap = maskinfo['maskfill'].copy()
+    np.put(dmap, maskinfo['maskindex'], map)
+    dmap = np.ma.masked_array(dmap.reshape(maskinfo['shape']), mask=np.zeros(maskinfo['shape'], dtype=bool))
 
     return dmap
 
@@ -513,6 +652,26 @@ def metaNetCDF():
         raise CWATMFileError(cbinding('PrecipitationMaps'),msg)
 
 
+def setroutingbackend():
+    """
+    select the backend of the routing kernels (option routingBackend): auto, native or numpy
+    auto uses the compiled library if there is one for this platform, otherwise numpy
+    """
+
+    name = 'auto'
+    if 'routingBackend' in binding:
+        name = cbinding('routingBackend').strip().lower()
+    if not(name == 'auto') and not(name in lib2.backends):
+        msg = "Error 306: routingBackend = " + name + " is not available. Available: auto, " + ", ".join(lib2.backends) + "\n"
+        if name == 'native':
+            msg += "No compiled routing library for this platform in: " + path_routing + " " + str(dll_routing) + "\n"
+        raise CWATMError(msg)
+    lib2.select(name)
+    if (name == 'auto') and (lib2.name != 'native') and not(Flags['quiet']) and not(Flags['veryquiet']):
+        msg = "No compiled routing library for this platform (" + ", ".join(dll_routing) + "), the slower numpy version is used"
+        print(CWATMWarning(msg))
+
+
 def readCoord(name):
     """
     get the meta data information for the netcdf output from the global
@@ -826,6 +985,33 @@ def mapattrTiff(nf2):
     return cut0, cut1, cut2, cut3
 
 
+def allocationzone(inner):
+    """
+    allocation zones: regular grid on the river network map, each zone has inner x inner cells
+
+    :param inner: number of cells of a zone in each direction
+    :return: compressed map with the number of the zone of each cell
+    """
+
+    latldd, lonldd, cell, invcellldd, rows, cols = readCoord(cbinding('Ldd'))
+    filename = os.path.splitext(cbinding('Ldd'))[0] + '.nc'
+    if os.path.isfile(filename):
+        cut0, cut1, cut2, cut3 = mapattrNetCDF(filename, check=False)
+    else:
+        filename = os.path.splitext(cbinding('Ldd'))[0] + '.tif'
+
+        if not(os.path.isfile(filename)):
+            filename = os.path.splitext(cbinding('Ldd'))[0] + '.map'
+
+        nf2 = gdal.Open(filename, gdalconst.GA_ReadOnly)
+        cut0, cut1, cut2, cut3 = mapattrTiff(nf2)
+
+    arr = np.kron(np.arange(rows // inner * cols // inner).reshape((rows // inner, cols // inner)),
+                  np.ones((inner, inner)))
+    arr = arr[cut2:cut3, cut0:cut1].astype(int)
+    return compressArray(arr)
+
+
 def multinetdf(meteomaps, startcheck = 'dateBegin'):
     """
 
@@ -922,40 +1108,32 @@ def multinetdf(meteomaps, startcheck = 'dateBegin'):
 
 
 
-def readmeteodata(name, date, value='None', addZeros = False, zeros = 0.0,mapsscale = True, buffering=False, extendback = False):
+def meteohandle(name, filename, value='None', buffering=False):
     """
-    load stack of maps 1 at each timestamp in netcdf format
+    Pool of open netcdf handles for the meteo map stacks
+    Each file of a stack is opened only once. The variable name, the latitude order and the cut window
+    are resolved at opening and stored together with the handle until the stack moves on to the next file
 
-    :param name: file name
-    :param date:
+    :param name: name of the meteo binding e.g. PrecipitationMaps
+    :param filename: file name of the stack which is used at the moment
     :param value: if set the name of the parameter is defined
-    :param addZeros:
-    :param zeros: default value
-    :param mapsscale: if meteo maps have the same extend as the other spatial static m
     :param buffering: if buffer should be applied before cutting the map to the mask extent
-    :return: Compressed 1D array of meteo data
+    :return: dictionary with netcdf handle, variable, latitude flag, cut window and buffer
 
-    :raises if data is wrong: :meth:`management_modules.messages.CWATMError`
     :raises if meteo netcdf file cannot be opened: :meth:`management_modules.messages.CWATMFileError`
     """
 
-    try:
-        meteoInfo = meteofiles[name][flagmeteo[name]]
-        idx = inputcounter[name]
-        filename =  os.path.normpath(meteoInfo[0])
-    except:
-        date1 = "%02d/%02d/%02d" % (date.day, date.month, date.year)
-        msg = "Error 210: Netcdf map error for: " + name + " -> " + cbinding(name) + " on: " + date1 + ": \n"
-        raise CWATMError(msg)
+    key = (name, flagmeteo[name], value, buffering)
+    if key in meteohandles:
+        return meteohandles[key]
 
-    # for glaciermaps extend back into past if glaciermaps start later -> use day of the year of first year
-    if idx < 0:
-        if extendback:
-            idx = dateVar['doy'] - 1
-        else:
-            date1 = "%02d/%02d/%02d" % (date.day, date.month, date.year)
-            msg = "Error 211: Netcdf map: " + name + " -> " + cbinding(name) + " starts later than first date of simulation on: " + date1 + ": \n"
-            raise CWATMError(msg)
+    # maximum number of files kept open at the same time, if reached the oldest handle is closed
+    maxopen = 32
+    if 'meteoMaxOpenFiles' in binding:
+        maxopen = max(1, int(loadmap('meteoMaxOpenFiles')))
+    while len(meteohandles) >= maxopen:
+        oldest = list(meteohandles.keys())[0]
+        meteohandles.pop(oldest)['nf'].close()
 
     try:
        nf1 = Dataset(filename, 'r')
@@ -963,17 +1141,17 @@ def readmeteodata(name, date, value='None', addZeros = False, zeros = 0.0,mapssc
         msg = "Error 211: Netcdf map stacks: \n"
         raise CWATMFileError(filename,msg, sname = name)
 
-    warnings.filterwarnings("ignore")
     if value == "None":
         value = list(nf1.variables.items())[-1][0]  # get the last variable name
         if value in ["X","Y","x","y","lon","lat","time"]:
             for i in range(2,5):
                value = list(nf1.variables.items())[-i][0]
                if not(value in ["X","Y","x","y","lon","lat","time"]) : break
+    var = nf1.variables[value]
 
     # check if mask = map size -> if yes do not cut the map
     cutcheckmask = maskinfo['shape'][0] * maskinfo['shape'][1]
-    cutcheckmap = nf1.variables[value].shape[1] * nf1.variables[value].shape[2]
+    cutcheckmap = var.shape[1] * var.shape[2]
     cutcheck = True
     if cutcheckmask == cutcheckmap: cutcheck = False
 
@@ -987,80 +1165,403 @@ def readmeteodata(name, date, value='None', addZeros = False, zeros = 0.0,mapssc
     turn_latitude = False
     if (nf1.variables[yy][0] - nf1.variables[yy][-1]) < 0:
         turn_latitude = True
-        mapnp = nf1.variables[value][idx].astype(np.float64)
-        mapnp = np.flipud(mapnp)
 
+    # cut window: rows and cols of the map which are read each day
+    rows = slice(None)
+    cols = slice(None)
+    buffer = None
     if cutcheck:
-        if turn_latitude:
-            mapnp = mapnp[cutmapFine[2]:cutmapFine[3], cutmapFine[0]:cutmapFine[1]]
-            #TODO: make buffering work if lattitude is turned
-        else:
-            if buffering:
-                buffer = 1
-                #          buffer1
-                #         ---------
-                # buffer3¦        ¦ buffer4
-                #        ¦        ¦
-                #         ---------
-                #          buffer2
-                buffer4, buffer2 = [1,1]
-                #if the input map should be used until the last column there is no buffer
-                if nf1.variables[value].shape[2] == cutmapFine[1]:
-                    buffer4 = 0
-                # if the input map should be used at the last row there is no buffer
-                if nf1.variables[value].shape[1] == cutmapFine[3]:
-                    buffer2 = 0
-                # if the input map should be used at the first row or column there is no buffer
-                if (cutmapFine[2] == 0) and (cutmapFine[0] == 0):
-                    mapnp = nf1.variables[value][idx, cutmapFine[2]:cutmapFine[3] + buffer2,
-                            cutmapFine[0]:cutmapFine[1] + buffer4].astype(np.float64)
-                    buffer1, buffer3 = [0,0]
-                # if the input map should be used at the first row there is no buffer
-                elif cutmapFine[2] == 0:
-                    mapnp = nf1.variables[value][idx, cutmapFine[2]:cutmapFine[3] + buffer2,
-                            cutmapFine[0] - buffer:cutmapFine[1] + buffer4].astype(np.float64)
-                    buffer1, buffer3 = [0, 1]
-                # if the input map should be used at the first column there is no buffer
-                elif cutmapFine[0] == 0:
-                    mapnp = nf1.variables[value][idx, cutmapFine[2] - buffer:cutmapFine[3] + buffer2,
-                            cutmapFine[0]:cutmapFine[1] + buffer4].astype(np.float64)
-                    buffer1, buffer3 = [1,0]
-                else:
-                    mapnp = nf1.variables[value][idx, cutmapFine[2] - buffer:cutmapFine[3] + buffer2,
-                            cutmapFine[0] - buffer:cutmapFine[1] + buffer4].astype(np.float64)
-                    buffer1, buffer3 = [1, 1]
-
+        rows = slice(cutmapFine[2], cutmapFine[3])
+        cols = slice(cutmapFine[0], cutmapFine[1])
+        # TODO: make buffering work if lattitude is turned
+        if buffering and not(turn_latitude):
+            buffer = 1
+            #          buffer1
+            #         ---------
+            # buffer3¦        ¦ buffer4
+            #        ¦        ¦
+            #         ---------
+            #          buffer2
+            buffer4, buffer2 = [1,1]
+            #if the input map should be used until the last column there is no buffer
+            if var.shape[2] == cutmapFine[1]:
+                buffer4 = 0
+            # if the input map should be used at the last row there is no buffer
+            if var.shape[1] == cutmapFine[3]:
+                buffer2 = 0
+            # if the input map should be used at the first row or column there is no buffer
+            if (cutmapFine[2] == 0) and (cutmapFine[0] == 0):
+                buffer1, buffer3 = [0,0]
+            # if the input map should be used at the first row there is no buffer
+            elif cutmapFine[2] == 0:
+                buffer1, buffer3 = [0, 1]
+            # if the input map should be used at the first column there is no buffer
+            elif cutmapFine[0] == 0:
+                buffer1, buffer3 = [1,0]
+            else:
+                buffer1, buffer3 = [1, 1]
+            rows = slice(cutmapFine[2] - buffer1 * buffer, cutmapFine[3] + buffer2)
+            cols = slice(cutmapFine[0] - buffer3 * buffer, cutmapFine[1] + buffer4)
+            buffer = [buffer1, buffer2, buffer3, buffer4]
+
+    # number of days read in one go (block) -> default 1 day
+    # meteoBlockSize: days per block, meteoBlockMemory: MB for the blocks of all meteo stacks together
+    blocksize = 1
+    if not(Flags['check']):
+        if 'meteoBlockSize' in binding:
+            blocksize = max(1, int(loadmap('meteoBlockSize')))
+        if 'meteoBlockMemory' in binding:
+            ny = len(range(*rows.indices(var.shape[1])))
+            nx = len(range(*cols.indices(var.shape[2])))
+            budget = loadmap('meteoBlockMemory') * 1024. * 1024. / max(1, len(meteofiles))
+            memsize = max(1, int(budget / (ny * nx * 8)))
+            if 'meteoBlockSize' in binding:
+                blocksize = min(blocksize, memsize)
             else:
-                mapnp = nf1.variables[value][idx, cutmapFine[2]:cutmapFine[3], cutmapFine[0]:cutmapFine[1]].astype(np.float64)
+                blocksize = memsize
+
+    meteohandles[key] = {'nf': nf1, 'var': var, 'value': value, 'turn': turn_latitude, 'cut': cutcheck,
+                         'rows': rows, 'cols': cols, 'buffer': buffer,
+                         'blocksize': blocksize, 'block': None, 'blockstart': 0, 'blockend': 0}
+    return meteohandles[key]
+
+
+def readmeteohyperslab(handle, start, end):
+    """
+    Read several days of a meteo map stack with one netcdf read, cut to the extent of the mask map
+
+    :param handle: open meteo handle from :meth:`management_modules.data_handling.meteohandle`
+    :param start: first time index
+    :param end: last time index + 1
+    :return: 3D array (time, rows, cols), missing values are NaN
+    """
+
+    if handle['turn']:
+        # rows of the cut window in the file before turning: only the window is read, then turned
+        nrows = handle['var'].shape[1]
+        row1, row2, step = handle['rows'].indices(nrows)
+        mapnp = handle['var'][start:end, nrows - row2:nrows - row1, handle['cols']].astype(np.float64)
+        mapnp = mapnp[:, ::-1]
     else:
-        if not(turn_latitude):
-            mapnp = nf1.variables[value][idx].astype(np.float64)
+        mapnp = handle['var'][start:end, handle['rows'], handle['cols']].astype(np.float64)
     try:
         mapnp.mask.all()
         mapnp = mapnp.data
         mapnp[mapnp>1e15] = np.nan
     except:
         ii =1
+    return mapnp
 
-    nf1.close()
+
+def readmeteoblock(handle, start, end, name, filename, addZeros, zeros, mapsscale):
+    """
+    Read a block of days of a meteo map stack with one netcdf read and compress it to the mask in one go
+    The block is stored in a ring buffer of the handle, which is reused for every new block of the same file
+
+    :param handle: open meteo handle from :meth:`management_modules.data_handling.meteohandle`
+    :param start: first time index of the block
+    :param end: last time index of the block + 1
+    :param name: name of the meteo binding
+    :param filename: file name of the stack
+    :param addZeros: if missing values are replaced by zeros
+    :param zeros: default value
+    :param mapsscale: if True the block is compressed to 1D (per day)
+    :return: -
+    """
+
+    mapnp = readmeteohyperslab(handle, start, end)
 
     # add zero values to maps in order to supress missing values
     if addZeros: mapnp[np.isnan(mapnp)] = zeros
 
-
-    if mapsscale:  # if meteo maps have the same extend as the other spatial static maps -> meteomapsscale = True
-        if maskinfo['shapeflat'][0]!= mapnp.size:
+    if mapsscale:
+        if maskinfo['shapeflat'][0] != mapnp[0].size:
             msg = "Error 109: " + name + " has less or more valid pixels than the mask map \n"
             msg += "if it is the ET maps, it might be from another run with different mask. Please look at the option: calc_evaporation"
             raise CWATMWarning(msg)
-
-        mapC = compressArray(mapnp, name=filename,zeros = zeros)
-        if Flags['check']:
-            checkmap(name, filename, mapnp, True, True, mapC)
-    else: # if static map extend not equal meteo maps -> downscaling in readmeteo
+        # same as compressArray but for all days of the block
+        if mapnp.shape[1:] != maskinfo['mask'].shape:
+            msg = "Error 105: " + filename + " has a different shape than area or ldd \n"
+            raise CWATMError(msg)
+        # missing values are checked for each day when it is taken out of the block
+        mapC = np.take(mapnp.reshape(mapnp.shape[0], -1), maskinfo['maskindex'], axis=1)
+        mapC[np.abs(mapC) > 1.E20] = zeros
+    else:
         mapC = mapnp
-        if Flags['check']:
-            checkmap(name, filename, mapnp, True, False, 0)
+
+    # ring buffer: allocated once for each file and refilled block by block
+    days = end - start
+    if (handle['block'] is None) or (handle['block'].shape[1:] != mapC.shape[1:]) or (handle['block'].shape[0] < days):
+        handle['block'] = np.empty((max(days, handle['blocksize']),) + mapC.shape[1:], dtype=np.float64)
+    handle['block'][:days] = mapC
+    handle['blockstart'] = start
+    handle['blockend'] = end
+
+
+def closemeteohandles(name = None):
+    """
+    Close the open netcdf handles of the meteo map stacks
+
+    :param name: (optional) name of the meteo binding, if None all handles are closed
+      and also the files opened by :meth:`management_modules.data_handling.readnetcdf2`
+    :return: -
+    """
+
+    for key in list(meteohandles.keys()):
+        if (name is None) or (key[0] == name):
+            meteohandles.pop(key)['nf'].close()
+    if name is None:
+        for meta in netcdfcache.values():
+            if meta['nf'] is not None:
+                meta['nf'].close()
+                meta['nf'] = None
+
+
+def forcingsources(name):
+    """
+    Modification time and size of the netcdf files of a meteo map stack used in this run
+    Stored in the manifest of the forcing store to find stacks which were changed after the conversion
+
+    :param name: name of the meteo binding e.g. PrecipitationMaps
+    :return: dictionary file name: [modification time, size]
+    """
+
+    sources = {}
+    for i in sorted(meteofiles[name].keys()):
+        filename = os.path.normpath(meteofiles[name][i][0])
+        stat = os.stat(filename)
+        sources[filename] = [stat.st_mtime, stat.st_size]
+    return sources
+
+
+def openforcingstore(meteomaps):
+    """
+    Check if the compressed forcing store (option meteoStore) fits to this run
+    The manifest has to have the same mask and must cover the period of the run.
+    Each meteo map which was converted from the same files (same modification time and size) is then read
+    from the store instead of the netcdf files
+
+    :param meteomaps: list of meteo map names e.g. PrecipitationMaps
+    :return: -
+    """
+
+    forcingstore.clear()
+    if not('meteoStore' in binding) or Flags['check']:
+        return
+    storedir = cbinding('meteoStore')
+    if storedir.lower() in ["", "none", "false"]:
+        return
+
+    manifestfile = os.path.join(storedir, "manifest.json")
+    try:
+        with open(manifestfile, "r") as f:
+            manifest = json.load(f)
+    except:
+        if not(Flags['quiet']) and not(Flags['veryquiet']):
+            print(CWATMWarning("Forcing store: cannot read " + manifestfile + " -> netcdf meteo maps are used"))
+        return
+
+    start = datetime.datetime.strptime(manifest['start'], "%Y-%m-%d")
+    first = (dateVar['dateBegin'] - start).days
+    last = first + dateVar['intEnd'] - dateVar['intStart']
+
+    reason = ""
+    if manifest['maskhash'] != maskinfo['maskhash']:
+        reason = "different mask map"
+    elif [manifest['x'], manifest['y'], manifest['cell']] != [float(maskmapAttr['x']), float(maskmapAttr['y']), float(maskmapAttr['cell'])]:
+        reason = "different coordinates of the mask map"
+    elif (first < 0) or (last >= manifest['steps']):
+        reason = "period of the run is not covered"
+    if reason != "":
+        if not(Flags['quiet']) and not(Flags['veryquiet']):
+            print(CWATMWarning("Forcing store: " + reason + " -> netcdf meteo maps are used"))
+        return
+
+    for maps in meteomaps:
+        if not(maps in manifest['variables']):
+            continue
+        var = manifest['variables'][maps]
+        if var['source'] != cbinding(maps):
+            continue
+        # netcdf files changed after the conversion
+        stored = var.get('files', {})
+        sources = forcingsources(maps)
+        if any(stored.get(f) != sources[f] for f in sources):
+            if not(Flags['quiet']) and not(Flags['veryquiet']):
+                print(CWATMWarning("Forcing store: netcdf files of " + maps + " changed after the conversion -> netcdf meteo maps are used"))
+            continue
+        # the store is sorted by days, with other calendars only the same start date fits
+        if (first != 0) and not(var['calendar'] in ['standard', 'gregorian', 'proleptic_gregorian']):
+            continue
+        forcingstore[maps] = {'dir': os.path.join(storedir, maps), 'start': start, 'chunk': manifest['chunk'],
+                              'compress': manifest['compress'], 'chunkno': -1, 'data': None}
+
+    if not(Flags['quiet']) and not(Flags['veryquiet']):
+        print("Forcing store: %i of %i meteo map stacks are read from %s" % (len(forcingstore), len(meteomaps), storedir))
+
+
+def readforcingstore(name, date, addZeros = False, zeros = 0.0):
+    """
+    Read the meteo map of one day from the compressed forcing store
+    Each chunk of days is a time x cells array (memory mapped .npy or zipped .npz)
+
+    :param name: name of the meteo binding
+    :param date: date
+    :param addZeros: if missing values are replaced by zeros
+    :param zeros: default value
+    :return: Compressed 1D array of meteo data
+    """
+
+    store = forcingstore[name]
+    chunkno, pos = divmod((date - store['start']).days, store['chunk'])
+    filename = os.path.join(store['dir'], name + "_%05i" % chunkno)
+    if store['chunkno'] != chunkno:
+        if store['compress']:
+            with np.load(filename + ".npz") as f:
+                store['data'] = f['data']
+        else:
+            store['data'] = np.load(filename + ".npy", mmap_mode='r')
+        store['chunkno'] = chunkno
+
+    mapC = store['data'][pos].astype(np.float64)
+    # add zero values to maps in order to supress missing values
+    if addZeros: mapC[np.isnan(mapC)] = zeros
+
+    # same checks as in compressArray
+    if np.isnan(mapC).any():
+        msg = "Error 106:" + filename + " has less valid pixels than area or ldd \n"
+        raise CWATMError(msg)
+    mapC[np.abs(mapC) > 1.E20] = zeros
+    return mapC
+
+
+def sharemeteo(meteo):
+    """
+    Put the meteo data of a calibration run (-k flag) into shared memory
+    Other processes can attach to it with :meth:`management_modules.data_handling.attachmeteo`
+    The block has to be kept by the calling process as long as the workers are running
+
+    :param meteo: array of meteo data (variable, time, cells) from the calibration run
+    :return: shared memory block and description (name, shape, dtype) to attach to it
+    """
+
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=meteo.nbytes)
+    data = np.ndarray(meteo.shape, dtype=meteo.dtype, buffer=shm.buf)
+    data[:] = meteo[:]
+    info = {'name': shm.name, 'shape': meteo.shape, 'dtype': meteo.dtype.str}
+    return shm, info
+
+
+def attachmeteo(info):
+    """
+    Attach to the meteo data in shared memory made by :meth:`management_modules.data_handling.sharemeteo`
+    Each process attaches only once, the array is read only
+
+    :param info: description of the shared memory block (name, shape, dtype)
+    :return: array of meteo data (variable, time, cells)
+    """
+
+    if not(info['name'] in sharedmeteo):
+        from multiprocessing import shared_memory
+
+        shm = shared_memory.SharedMemory(name=info['name'])
+        data = np.ndarray(info['shape'], dtype=np.dtype(info['dtype']), buffer=shm.buf)
+        data.flags.writeable = False
+        sharedmeteo[info['name']] = (shm, data)
+    return sharedmeteo[info['name']][1]
+
+
+@netcdflocked
+def readmeteodata(name, date, value='None', addZeros = False, zeros = 0.0,mapsscale = True, buffering=False, extendback = False):
+    """
+    load stack of maps 1 at each timestamp in netcdf format
+
+    :param name: file name
+    :param date:
+    :param value: if set the name of the parameter is defined
+    :param addZeros:
+    :param zeros: default value
+    :param mapsscale: if meteo maps have the same extend as the other spatial static m
+    :param buffering: if buffer should be applied before cutting the map to the mask extent
+    :return: Compressed 1D array of meteo data
+
+    :raises if data is wrong: :meth:`management_modules.messages.CWATMError`
+    :raises if meteo netcdf file cannot be opened: :meth:`management_modules.messages.CWATMFileError`
+    """
+
+    # compressed forcing store made by convert_forcing for this mask and period
+    if (name in forcingstore) and mapsscale and not(buffering):
+        return readforcingstore(name, date, addZeros, zeros), None
+
+    try:
+        meteoInfo = meteofiles[name][flagmeteo[name]]
+        idx = inputcounter[name]
+        filename =  os.path.normpath(meteoInfo[0])
+    except:
+        date1 = "%02d/%02d/%02d" % (date.day, date.month, date.year)
+        msg = "Error 210: Netcdf map error for: " + name + " -> " + cbinding(name) + " on: " + date1 + ": \n"
+        raise CWATMError(msg)
+
+    # for glaciermaps extend back into past if glaciermaps start later -> use day of the year of first year
+    if idx < 0:
+        if extendback:
+            idx = dateVar['doy'] - 1
+        else:
+            date1 = "%02d/%02d/%02d" % (date.day, date.month, date.year)
+            msg = "Error 211: Netcdf map: " + name + " -> " + cbinding(name) + " starts later than first date of simulation on: " + date1 + ": \n"
+            raise CWATMError(msg)
+
+    # file is opened only once and stays open until the next file of the stack is used
+    handle = meteohandle(name, filename, value, buffering)
+
+    warnings.filterwarnings("ignore")
+    if handle['blocksize'] > 1:
+        # read a block of days in one go and take the day out of the ring buffer
+        if not(handle['blockstart'] <= idx < handle['blockend']):
+            end = min(idx + handle['blocksize'], handle['var'].shape[0])
+            # block does not go beyond the last day used of this file
+            if idx <= meteoInfo[2]:
+                end = min(end, meteoInfo[2] + 1)
+            readmeteoblock(handle, idx, end, name, filename, addZeros, zeros, mapsscale)
+        mapC = handle['block'][idx - handle['blockstart']].copy()
+        # same check as in compressArray for the day which is used now
+        if mapsscale and np.isnan(mapC).any():
+            msg = "Error 106:" + filename + " has less valid pixels than area or ldd \n"
+            raise CWATMError(msg)
+
+    else:
+        if handle['turn']:
+            mapnp = handle['var'][idx].astype(np.float64)
+            mapnp = np.flipud(mapnp)
+            mapnp = mapnp[handle['rows'], handle['cols']]
+        else:
+            mapnp = handle['var'][idx, handle['rows'], handle['cols']].astype(np.float64)
+        try:
+            mapnp.mask.all()
+            mapnp = mapnp.data
+            mapnp[mapnp>1e15] = np.nan
+        except:
+            ii =1
+
+        # add zero values to maps in order to supress missing values
+        if addZeros: mapnp[np.isnan(mapnp)] = zeros
+
+
+        if mapsscale:  # if meteo maps have the same extend as the other spatial static maps -> meteomapsscale = True
+            if maskinfo['shapeflat'][0]!= mapnp.size:
+                msg = "Error 109: " + name + " has less or more valid pixels than the mask map \n"
+                msg += "if it is the ET maps, it might be from another run with different mask. Please look at the option: calc_evaporation"
+                raise CWATMWarning(msg)
+
+            mapC = compressArray(mapnp, name=filename,zeros = zeros)
+            if Flags['check']:
+                checkmap(name, filename, mapnp, True, True, mapC)
+        else: # if static map extend not equal meteo maps -> downscaling in readmeteo
+            mapC = mapnp
+            if Flags['check']:
+                checkmap(name, filename, mapnp, True, False, 0)
 
     # increase index and check if next file
     #if (dateVar['leapYear'] == 1) and calendar.isleap(date.year):
@@ -1072,16 +1573,36 @@ def readmeteodata(name, date, value='None', addZeros = False, zeros = 0.0,mapssc
     if inputcounter[name] > meteoInfo[2]:
         inputcounter[name] = 0
         flagmeteo[name] += 1
+        # the file is not needed anymore
+        closemeteohandles(name)
 
+    buffer = None
     if buffering:
-        buffer = [buffer1, buffer2, buffer3, buffer4]
-    else:
-        buffer = None
+        buffer = handle['buffer']
     return mapC, buffer
 
 
 
+class nctimeCache(object):
+    """
+    Time axis of a netcdf file kept in memory
+    Can be used instead of the netcdf time variable in :meth:`management_modules.timestep.date2indexNew`
+    """
+
+    def __init__(self, nctime):
+        self.units = nctime.units
+        self.calendar = nctime.calendar
+        self.values = nctime[:]
+        self.shape = self.values.shape
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, item):
+        return self.values[item]
 
+
+@netcdflocked
 def readnetcdf2(namebinding, date, useDaily='daily', value='None', addZeros = False,cut = True, zeros = 0.0,meteo = False, usefilename = False, compress = True):
     """
     load stack of maps 1 at each timestamp in netcdf format
@@ -1108,18 +1629,30 @@ def readnetcdf2(namebinding, date, useDaily='daily', value='None', addZeros = Fa
     else:
         name = cbinding(namebinding)
     filename =  os.path.normpath(name)
-    
+
+    # cut window, variable name, latitude order and time index are only looked up once for each file
+    # the file is opened only once and stays open until the end of the run
+    if not(filename in netcdfcache):
+        netcdfcache[filename] = {'nf': None, 'cut': None, 'value': None, 'turn': None, 'calendar': None, 'time': None, 'index': {}}
+    meta = netcdfcache[filename]
+
     if cut:
-        cut0, cut1, cut2, cut3 = mapattrNetCDF(filename, check = False)
+        if meta['cut'] is None:
+            meta['cut'] = mapattrNetCDF(filename, check = False)
+        cut0, cut1, cut2, cut3 = meta['cut']
 
-    try:
-       nf1 = Dataset(filename, 'r')
-    except:
-        msg = "Error 212: Netcdf map stacks: \n"
-        raise CWATMFileError(filename,msg, sname = namebinding)
+    if meta['nf'] is None:
+        try:
+           meta['nf'] = Dataset(filename, 'r')
+        except:
+            msg = "Error 212: Netcdf map stacks: \n"
+            raise CWATMFileError(filename,msg, sname = namebinding)
+    nf1 = meta['nf']
 
     if value == "None":
-        value = list(nf1.variables.items())[-1][0]  # get the last variable name
+        if meta['value'] is None:
+            meta['value'] = list(nf1.variables.items())[-1][0]  # get the last variable name
+        value = meta['value']
 
     # date if used daily, monthly or yearly or day of year
     idx = None  # will produce an error and indicates something is wrong with date
@@ -1142,30 +1675,38 @@ def readnetcdf2(namebinding, date, useDaily='daily', value='None', addZeros = Fa
             if useDaily == "monthly":
                 date = datetime.datetime(date.year, date.month, int(1))
 
-            # A netCDF time variable object  - time index (in the netCDF file)
-            nctime = nf1.variables['time']
-
-            if nctime.calendar in ['noleap', '365_day']:
-                dateVar['leapYear'] = 1
-                idx = date2indexNew(date, nctime, calendar=nctime.calendar, select='nearest', name = name)
-            elif nctime.calendar in ['360_day']:
-                dateVar['leapYear'] = 2
-                idx = date2indexNew(date, nctime, calendar=nctime.calendar, select='nearest', name = name)
+            if date in meta['index']:
+                idx = meta['index'][date]
             else:
+                # A netCDF time variable object  - time index (in the netCDF file)
+                # the time variable is read only once and the index is searched in memory
+                if meta['time'] is None:
+                    meta['time'] = nctimeCache(nf1.variables['time'])
+                    meta['calendar'] = meta['time'].calendar
+                nctime = meta['time']
                 #idx = date2index(date, nctime, calendar=nctime.calendar, select='exact')
                 idx = date2indexNew(date, nctime, calendar=nctime.calendar, select='nearest', name = name)
+                meta['index'][date] = idx
+
+            if meta['calendar'] in ['noleap', '365_day']:
+                dateVar['leapYear'] = 1
+            elif meta['calendar'] in ['360_day']:
+                dateVar['leapYear'] = 2
             if meteo: inputcounter[value] = idx
 
 
     #checkif latitude is reversed
-    turn_latitude = False
-    try:
-        if (nf1.variables['lat'][0] - nf1.variables['lat'][-1]) < 0:
-           turn_latitude = True
-           mapnp = nf1.variables[value][idx].astype(np.float64)
-           mapnp = np.flipud(mapnp)
-    except:
-       ii = 1
+    if meta['turn'] is None:
+        meta['turn'] = False
+        try:
+            if (nf1.variables['lat'][0] - nf1.variables['lat'][-1]) < 0:
+                meta['turn'] = True
+        except:
+            ii = 1
+    turn_latitude = meta['turn']
+    if turn_latitude:
+        mapnp = nf1.variables[value][idx].astype(np.float64)
+        mapnp = np.flipud(mapnp)
 
     if 'Glacier' in namebinding:
         cutcheckmask = maskinfo['shape'][0] * maskinfo['shape'][1]
@@ -1189,7 +1730,6 @@ def readnetcdf2(namebinding, date, useDaily='daily', value='None', addZeros = Fa
         mapnp = mapnp.data
     except:
         ii =1
-    nf1.close()
 
     # add zero values to maps in order to supress missing values
     if addZeros: mapnp[np.isnan(mapnp)] = zeros
@@ -1207,6 +1747,7 @@ def readnetcdf2(namebinding, date, useDaily='daily', value='None', addZeros = Fa
     return mapC
 
 
+@netcdflocked
 def readnetcdfWithoutTime(name, value="None"):
     """
     load maps in netcdf format (has no time format)
@@ -1242,6 +1783,7 @@ def readnetcdfWithoutTime(name, value="None"):
 
 
 
+@netcdflocked
 def readnetcdfInitial(name, value,default = 0.0):
     """
     load initial condition from netcdf format
@@ -1297,8 +1839,244 @@ def readnetcdfInitial(name, value,default = 0.0):
         print(CWATMWarning(msg))
         return default
 
+
+# first bytes of a binary init file
+INIMAGIC = b"CWATMINI"
+
+
+def isIniBinary(name):
+    """
+    check if an init file is a binary init file
+
+    :param name: file name
+    :return: True if the file starts with the binary init header
+    """
+
+    filename = os.path.abspath(os.path.normpath(name))
+    if filename in initstates:
+        return True
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(INIMAGIC)) == INIMAGIC
+    except OSError:
+        return False
+
+
+def writeIniBinary(netfile, varlist, inputlist):
+    """
+    write variables to a binary init file (option initBinary)
+    The file has a header with the mask and the name, dtype and shape of each variable
+    followed by the compressed 1D arrays as they are in the model, each starting at 64 bytes
+
+    :param netfile: file name
+    :param varlist: list of variable to be written in the file
+    :param inputlist: stack of 1D arrays
+    :return: -
+    """
+
+    arrays = []
+    variables = []
+    offset = 0
+    for varname, value in zip(varlist, inputlist):
+        data = np.ascontiguousarray(value)
+        if data.ndim == 0:
+            data = np.full(maskinfo['mapC'], data)
+        variables.append({'name': varname, 'dtype': data.dtype.str, 'shape': list(data.shape), 'offset': offset})
+        arrays.append(data)
+        offset += -(-data.nbytes // 64) * 64
+
+    date = str(dateVar['currDate']) if 'currDate' in dateVar else ""
+    header = {'version': 1, 'maskhash': maskinfo['maskhash'], 'shape': [int(i) for i in maskinfo['shape']],
+              'cells': int(maskinfo['mapC'][0]), 'date': date, 'settingsfile': os.path.realpath(settingsfile[0]) if settingsfile else "",
+              'variables': variables}
+    header = json.dumps(header).encode()
+    # data starts at a multiple of 64 bytes
+    header += b" " * (-(len(INIMAGIC) + 8 + len(header)) % 64)
+
+    # written to a temporary file first, a broken file never replaces an init file
+    tmpfile = netfile + ".tmp"
+    with open(tmpfile, 'wb') as f:
+        f.write(INIMAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for data in arrays:
+            f.write(data.data)
+            f.write(b"\0" * (-data.nbytes % 64))
+    os.replace(tmpfile, netfile)
+    initstates.pop(os.path.abspath(os.path.normpath(netfile)), None)
+
+
+def openIniBinary(name):
+    """
+    open a binary init file as memory map, the header is checked against the mask map
+    the file stays open in initstates
+
+    :param name: file name
+    :return: dictionary with header, memory map and start of the data
+    """
+
+    filename = os.path.abspath(os.path.normpath(name))
+    if filename in initstates:
+        return initstates[filename]
+
+    try:
+        with open(filename, 'rb') as f:
+            magic = f.read(len(INIMAGIC))
+            length = struct.unpack('<Q', f.read(8))[0]
+            header = json.loads(f.read(length).decode())
+    except (OSError, struct.error, ValueError):
+        msg = "Error 214: Binary Initial file: \n"
+        raise CWATMFileError(filename, msg)
+    if magic != INIMAGIC:
+        msg = "Error 126: Not a binary initial file: " + filename + "\n"
+        raise CWATMError(msg)
+    if header['maskhash'] != maskinfo['maskhash']:
+        msg = "Error 126: Binary initial file: " + filename + " is made for another mask map\n"
+        msg += "Mask of the file: " + str(header['shape']) + " with " + str(header['cells']) + " cells, mask map: "
+        msg += str(list(maskinfo['shape'])) + " with " + str(maskinfo['mapC'][0]) + " cells\n"
+        raise CWATMError(msg)
+
+    state = {'header': header, 'start': len(INIMAGIC) + 8 + length,
+             'variables': {v['name']: v for v in header['variables']},
+             'mm': np.memmap(filename, dtype=np.uint8, mode='r')}
+    initstates[filename] = state
+    return state
+
+
+def readIniBinary(name, value, default=0.0):
+    """
+    load initial condition from a binary init file
+
+    :param name: file name
+    :param value: variable name
+    :param default: (optional) if no variable is found a warning is given and value is set to default
+    :return: Compressed 1D array as stored
+    """
+
+    state = openIniBinary(name)
+    if not (value in state['variables']):
+        msg = "Warning: Initial value: " + value + " is not included in: " + name + " - using default: " + str(default)
+        print(CWATMWarning(msg))
+        return default
+
+    var = state['variables'][value]
+    data = np.ndarray(tuple(var['shape']), dtype=np.dtype(var['dtype']), buffer=state['mm'], offset=state['start'] + var['offset'])
+    # the model changes the arrays, so a copy is returned
+    return data.copy()
+
+
+def readInitial(name, value, default=0.0):
+    """
+    load initial condition from a binary init file or from netcdf
+
+    :param name: file name
+    :param value: variable name
+    :param default: (optional) if no variable is found a warning is given and value is set to default
+    :return: Compressed 1D array
+    """
+
+    if isIniBinary(name):
+        return readIniBinary(name, value, default)
+    return readnetcdfInitial(name, value, default)
+
 # --------------------------------------------------------------------------------------------
 
+# Presets for netcdf output maps, set with outputPreset:
+#   write:      one time step per chunk, fast writing (default)
+#   timeseries: one year of time steps in chunks of 8x8 cells, fast reading of time series at single cells
+#   archive:    highest compression, values rounded to 4 significant digits
+#   none:       no compression
+outputpresets = {
+    'write':      {'complevel': 4, 'shuffle': True, 'chunktime': 1, 'chunkspace': 0, 'significant': 0, 'leastsignificant': -1},
+    'timeseries': {'complevel': 4, 'shuffle': True, 'chunktime': 365, 'chunkspace': 8, 'significant': 0, 'leastsignificant': -1},
+    'archive':    {'complevel': 9, 'shuffle': True, 'chunktime': 30, 'chunkspace': 0, 'significant': 4, 'leastsignificant': -1},
+    'none':       {'complevel': 0, 'shuffle': False, 'chunktime': 1, 'chunkspace': 0, 'significant': 0, 'leastsignificant': -1},
+}
+
+
+def outputsetting(name, varname):
+    """
+    Setting for one netcdf output variable
+    name_varname e.g. outputChunkTime_discharge_monthavg comes before name e.g. outputChunkTime
+
+    :param name: name of the setting
+    :param varname: variable name in the netcdf file e.g. discharge, discharge_monthavg
+    :return: string from the settingsfile or None if not set
+    """
+
+    for key in [name + "_" + varname, name]:
+        if key in binding:
+            return cbinding(key)
+    return None
+
+
+def outputencoding(varname, dims, nf1):
+    """
+    Compression, chunk shape and precision of a netcdf output variable
+
+    Settings (each can be set for one variable only with _varname added):
+    outputPreset (write, timeseries, archive, none), outputComplevel (0 = no compression), outputShuffle,
+    outputChunkTime (time steps per chunk), outputChunkSpace (cells per chunk in y and x, 0 = whole map),
+    outputSignificantDigits, outputLeastSignificantDigit (lossy quantization)
+
+    :param varname: variable name in the netcdf file
+    :param dims: dimensions of the variable
+    :param nf1: netcdf file with the dimensions already set up
+    :return: keywords for createVariable
+    """
+
+    preset = outputsetting('outputPreset', varname)
+    if preset is None:
+        preset = 'write'
+    if not(preset.lower() in outputpresets):
+        msg = "Error 223: outputPreset: " + preset + " for " + varname + " is not one of: " + ", ".join(outputpresets.keys()) + "\n"
+        raise CWATMError(msg)
+    enc = outputpresets[preset.lower()].copy()
+
+    for key, name in [('complevel', 'outputComplevel'), ('chunktime', 'outputChunkTime'), ('chunkspace', 'outputChunkSpace'),
+                      ('significant', 'outputSignificantDigits'), ('leastsignificant', 'outputLeastSignificantDigit')]:
+        value = outputsetting(name, varname)
+        if value is not None:
+            try:
+                enc[key] = int(float(value))
+            except ValueError:
+                msg = "Error 223: " + name + " for " + varname + " has to be a number: " + value + "\n"
+                raise CWATMError(msg)
+    value = outputsetting('outputShuffle', varname)
+    if value is not None:
+        enc['shuffle'] = value.lower() in ['true', '1', 'yes', 'y']
+
+    encoding = {'zlib': enc['complevel'] > 0}
+    if encoding['zlib']:
+        encoding['complevel'] = min(9, enc['complevel'])
+        encoding['shuffle'] = enc['shuffle']
+
+    if dims[0] == 'time':
+        chunks = []
+        for dim in dims:
+            size = max(1, len(nf1.dimensions[dim]))
+            if dim == 'time':
+                chunks.append(min(max(1, enc['chunktime']), size))
+            elif (enc['chunkspace'] > 0) and (dim == 'cell'):
+                chunks.append(min(enc['chunkspace'] * enc['chunkspace'], size))
+            elif enc['chunkspace'] > 0:
+                chunks.append(min(enc['chunkspace'], size))
+            else:
+                chunks.append(size)
+        encoding['chunksizes'] = tuple(chunks)
+
+    if enc['significant'] > 0:
+        if netCDF4.__has_quantization_support__:
+            encoding['significant_digits'] = enc['significant']
+        else:
+            msg = "outputSignificantDigits needs netCDF4 >= 1.6 with quantization, " + varname + " is stored without rounding"
+            print(CWATMWarning(msg))
+    elif enc['leastsignificant'] >= 0:
+        encoding['least_significant_digit'] = enc['leastsignificant']
+    return encoding
+
+
+@netcdflocked
 def writenetcdf(netfile,prename,addname,varunits,inputmap, timeStamp, posCnt, flag,flagTime, nrdays=None, dateunit="days"):
     """
     write a netcdf stack
@@ -1339,6 +2117,8 @@ def writenetcdf(netfile,prename,addname,varunits,inputmap, timeStamp, posCnt, fl
     varname = prename + addname
 
     if not flag:
+        # file is written new, an old handle of the same file is closed first
+        closeoutputhandles(netfile)
         nf1 = Dataset(netfile, 'w', format='NETCDF4')
 
         # general Attributes
@@ -1446,6 +2226,18 @@ def writenetcdf(netfile,prename,addname,varunits,inputmap, timeStamp, posCnt, fl
             latitude[:] = lats - cell / 2.0
             longitude[:] = lons + cell /2.0
 
+        # compression by gathering (CF): only the cells of the mask map are stored
+        # the list variable cell is the index of the cells in the flattened 2D map
+        gathered = False
+        if 'outputGathered' in binding:
+            gathered = returnBool('outputGathered') and not(modflow)
+        if gathered:
+            nf1.createDimension('cell', maskinfo['mapC'][0])
+            cells = nf1.createVariable('cell', 'i4', ('cell',))
+            cells.compress = latitude.dimensions[0] + " " + longitude.dimensions[0]
+            cells.long_name = 'index of the mask cells in the flattened map'
+            cells[:] = maskinfo['maskindex']
+
         if flagTime:
 
             year = dateVar['dateStart'].year
@@ -1464,37 +2256,40 @@ def writenetcdf(netfile,prename,addname,varunits,inputmap, timeStamp, posCnt, fl
             time.calendar = dateVar['calendar']
 
             if modflow:
-                value = nf1.createVariable(varname, 'f4', ('time', 'y', 'x'), zlib=True, fill_value=1e20,
-                                           chunksizes=(1, row, col))
+                dims = ('time', 'y', 'x')
+            elif gathered:
+                dims = ('time', 'cell')
             else:
                 latlon = True
                 if 'x' in list(metadataNCDF.keys()):
                     latlon = False
-                    value = nf1.createVariable(varname, 'f4', ('time', 'y', 'x'), zlib=True, fill_value=1e20,
-                                               chunksizes=(1, row, col))
+                    dims = ('time', 'y', 'x')
                 if 'X' in list(metadataNCDF.keys()):
                     latlon = False
-                    value = nf1.createVariable(varname, 'f4', ('time', 'y', 'x'), zlib=True, fill_value=1e20,
-                                               chunksizes=(1, row, col))
+                    dims = ('time', 'y', 'x')
                 if latlon:
                     if 'lon' in list(metadataNCDF.keys()):
-                        #value = nf1.createVariable(varname, 'f4', ('time', 'lat', 'lon'), zlib=True, fill_value=1e20)
-                        value = nf1.createVariable(varname, 'f4', ('time', 'lat', 'lon'), zlib=True, fill_value=1e20,chunksizes=(1,row,col))
+                        dims = ('time', 'lat', 'lon')
         else:
           if modflow:
-              value = nf1.createVariable(varname, 'f4', ('y', 'x'), zlib=True, fill_value=1e20)
+              dims = ('y', 'x')
+          elif gathered:
+              dims = ('cell',)
           else:
               latlon = True
               if 'x' in list(metadataNCDF.keys()):
                   latlon = False
-                  value = nf1.createVariable(varname, 'f4', ('y', 'x'), zlib=True,fill_value=1e20)
+                  dims = ('y', 'x')
               if 'X' in list(metadataNCDF.keys()):
                   latlon = False
-                  value = nf1.createVariable(varname, 'f4', ('y', 'x'), zlib=True,fill_value=1e20)
+                  dims = ('y', 'x')
               if latlon:
                   if 'lon' in list(metadataNCDF.keys()):
                      # for world lat/lon coordinates
-                     value = nf1.createVariable(varname, 'f4', ('lat', 'lon'), zlib=True, fill_value=1e20)
+                     dims = ('lat', 'lon')
+        # compression, chunks and precision from the settingsfile (outputPreset ...)
+        encoding = outputencoding(varname, dims, nf1)
+        value = nf1.createVariable(varname, 'f4', dims, fill_value=1e20, **encoding)
         value.standard_name = getmeta("standard_name",prename,varname)
         p1 = getmeta("long_name",prename,prename)
         p2 = getmeta("time", addname, addname)
@@ -1507,30 +2302,46 @@ def writenetcdf(netfile,prename,addname,varunits,inputmap, timeStamp, posCnt, fl
 
 
 
+    elif netfile in outputhandles:
+        # file stays open for the whole run
+        nf1 = outputhandles[netfile]['nf']
     else:
         nf1 = Dataset(netfile, 'a')
 
     if flagTime:
         date_time = nf1.variables['time']
-        if dateunit == "days": nf1.variables['time'][posCnt-1] = date2num(timeStamp, date_time.units, date_time.calendar)
-        if dateunit == "months": nf1.variables['time'][posCnt - 1] = (timeStamp.year - 1901) * 12 + timeStamp.month - 1
-        if dateunit == "years":  nf1.variables['time'][posCnt - 1] = timeStamp.year - 1901
+        if dateunit == "days": timevalue = date2num(timeStamp, date_time.units, date_time.calendar)
+        if dateunit == "months": timevalue = (timeStamp.year - 1901) * 12 + timeStamp.month - 1
+        if dateunit == "years":  timevalue = timeStamp.year - 1901
 
         #nf1.variables['time'][posCnt - 1] = 60 + posCnt
 
 
+    # gathered output has the mask cells as last dimension
+    gathered = nf1.variables[varname].dimensions[-1] == 'cell'
+
     mapnp = maskinfo['maskall'].copy()
 
     # if inputmap is not an array give out errormessage
     if not(hasattr(inputmap, '__len__')):
         date1 = "%02d/%02d/%02d" % (timeStamp.day, timeStamp.month, timeStamp.year)
         msg = "No values in: " + varname + " on date: " + date1 +"\nCould not write: " + netfile
-        nf1.close()
+        if flagTime:
+            nf1.variables['time'][posCnt - 1] = timevalue
+        closeoutputhandles(netfile)
+        if nf1.isopen():
+            nf1.close()
         print(CWATMWarning(msg))
         return False
 
     if modflow:
-        mapnp = inputmap
+        # the time slice is kept until written, so it must not change with the model variable
+        mapnp = np.array(inputmap)
+    elif gathered:
+        # 1D array of the mask cells is written as it is, no decompressing
+        mapnp = np.array(inputmap)
+        if coverresult[0]:
+            mapnp = np.where(np.ma.getdata(coverresult[1]).ravel()[maskinfo['maskindex']], mapnp, np.nan)
     else:
         mapnp[~maskinfo['maskflat']] = inputmap[:]
         #mapnp = mapnp.reshape(maskinfo['shape']).data
@@ -1543,20 +2354,406 @@ def writenetcdf(netfile,prename,addname,varunits,inputmap, timeStamp, posCnt, fl
             mapnp = mapnp.reshape(maskinfo['shape'])
 
     if flagTime:
-        nf1.variables[varname][posCnt -1, :, :] = mapnp
+        # time slices are collected and written together, the file is kept open until the end of the run
+        if not(netfile in outputhandles):
+            flush = 10
+            if 'outputFlushInterval' in binding:
+                flush = max(1, int(loadmap('outputFlushInterval')))
+            # with more time steps in one chunk, whole chunks are written at once
+            chunking = nf1.variables[varname].chunking()
+            if isinstance(chunking, list) and (chunking[0] > 1):
+                flush = int(math.ceil(flush / chunking[0])) * chunking[0]
+            outputhandles[netfile] = {'nf': nf1, 'varname': varname, 'flush': flush, 'batch': []}
+        handle = outputhandles[netfile]
+        handle['batch'].append((posCnt - 1, timevalue, mapnp))
+        if (len(handle['batch']) >= handle['flush']) or dateVar['laststep']:
+            flushoutputhandle(handle)
     else:
         # without timeflag
-        nf1.variables[varname][:, :] = mapnp
+        nf1.variables[varname][:] = mapnp
+        nf1.close()
 
-    nf1.close()
     flag = True
 
     return flag
 
 
+def flushoutputhandle(handle):
+    """
+    Write the collected time slices of one output netcdf file and sync the file to disk
+    Consecutive time slices are written with one call
+
+    :param handle: open output file from :meth:`management_modules.data_handling.writenetcdf`
+    :return: -
+    """
+
+    batch = handle['batch']
+    i = 0
+    while i < len(batch):
+        j = i + 1
+        while (j < len(batch)) and (batch[j][0] == batch[j - 1][0] + 1):
+            j += 1
+        pos = batch[i][0]
+        handle['nf'].variables['time'][pos:pos + j - i] = [b[1] for b in batch[i:j]]
+        if j - i == 1:
+            handle['nf'].variables[handle['varname']][pos] = batch[i][2]
+        else:
+            handle['nf'].variables[handle['varname']][pos:pos + j - i] = np.ma.stack([b[2] for b in batch[i:j]])
+        i = j
+    handle['batch'] = []
+    handle['nf'].sync()
+
+
+def writeoutput(netfile,prename,addname,varunits,inputmap, timeStamp, posCnt, flag,flagTime, nrdays=None, dateunit="days"):
+    """
+    Write an output map with :meth:`management_modules.data_handling.writenetcdf`
+    If option outputAsync is set, only a copy of the 1D array is put into a queue and a background thread
+    does the decompression, masking and netcdf writing. If the queue is full (outputQueueSize) the model waits
+    If option outputWorkers is set, the map is sent to the worker process which writes this file
+
+    :param: same as in :meth:`management_modules.data_handling.writenetcdf`
+    :return: flag: to indicate if the file is set up
+    """
+
+    if not(outputwriter):
+        startoutputwriter()
+    if outputwriter['pool'] is not None:
+        args = (netfile, prename, addname, varunits, inputmap, timeStamp, posCnt, flag, flagTime, nrdays, dateunit)
+        return submitoutput(args)
+    if outputwriter['queue'] is None:
+        return writenetcdf(netfile, prename, addname, varunits, inputmap, timeStamp, posCnt, flag, flagTime, nrdays, dateunit)
+
+    if outputwriter['error'] is not None:
+        drainoutput()
+    # if inputmap is not an array writenetcdf gives out a warning, this is done after the queue is written
+    if not(hasattr(inputmap, '__len__')):
+        drainoutput(stop=False)
+        return writenetcdf(netfile, prename, addname, varunits, inputmap, timeStamp, posCnt, flag, flagTime, nrdays, dateunit)
+
+    outputwriter['queue'].put((netfile, prename, addname, varunits, np.array(inputmap), timeStamp, posCnt, flag, flagTime, nrdays, dateunit))
+    return True
+
+
+def startoutputwriter():
+    """
+    Start the background thread for writing output maps (option outputAsync)
+
+    :return: -
+    """
+
+    outputwriter['queue'] = None
+    outputwriter['error'] = None
+    outputwriter['pool'] = None
+
+    workers = 0
+    if 'outputWorkers' in binding:
+        workers = int(loadmap('outputWorkers'))
+    if (workers > 1) and not(Flags['check']):
+        if 'fork' in multiprocessing.get_all_start_methods():
+            startoutputpool(workers)
+            return
+        msg = "outputWorkers needs processes started with fork, output maps are written without workers"
+        print(CWATMWarning(msg))
+
+    asyncwrite = False
+    if 'outputAsync' in binding:
+        asyncwrite = returnBool('outputAsync')
+    if not(asyncwrite) or Flags['check']:
+        return
+
+    size = 64
+    if 'outputQueueSize' in binding:
+        size = max(1, int(loadmap('outputQueueSize')))
+    outputwriter['queue'] = queue.Queue(maxsize=size)
+    outputwriter['thread'] = threading.Thread(target=outputworker, args=(outputwriter['queue'],), daemon=True)
+    outputwriter['thread'].start()
+
+
+def outputworker(q):
+    """
+    Background thread: writes the output maps from the queue until None is received
+    After an error the rest of the queue is skipped, the error is raised in the model thread
+
+    :param q: queue of arguments for :meth:`management_modules.data_handling.writenetcdf`
+    :return: -
+    """
+
+    while True:
+        args = q.get()
+        try:
+            if args is None:
+                return
+            if outputwriter['error'] is None:
+                writenetcdf(*args)
+        except BaseException as e:
+            # CWATMError ends with SystemExit, which would stop the thread without task_done
+            outputwriter['error'] = e
+        finally:
+            q.task_done()
+
+
+def drainoutput(stop = True):
+    """
+    Wait until all output maps in the queue are written
+
+    :param stop: if True the background thread is stopped
+    :return: -
+    :raises the error of the background thread
+    """
+
+    if outputwriter and (outputwriter['pool'] is not None):
+        if stop:
+            closeoutputpool()
+        else:
+            syncoutput()
+    if outputwriter and (outputwriter['queue'] is not None):
+        outputwriter['queue'].join()
+        if stop:
+            outputwriter['queue'].put(None)
+            outputwriter['thread'].join()
+    error = outputwriter.get('error')
+    if stop:
+        outputwriter.clear()
+    if error is not None:
+        outputwriter.clear()
+        raise error
+
+
+def startoutputpool(workers):
+    """
+    Start the worker processes for writing output maps (option outputWorkers)
+    Each output file is written by one worker only, so the workers do not share hdf5 files
+    The workers are forked and have the same settings and mask as the model. They are started at the end of the
+    initial part of the output module (:meth:`management_modules.output.outputTssMap.initial`), before any meteo
+    file is opened
+
+    :param workers: number of worker processes
+    :return: -
+    """
+
+    size = 64
+    if 'outputQueueSize' in binding:
+        size = max(1, int(loadmap('outputQueueSize')))
+    context = multiprocessing.get_context('fork')
+    pool = {'tasks': [], 'processes': [], 'results': context.Queue(), 'files': {}, 'count': [0] * workers, 'latency': {}}
+    # no other thread is inside the netcdf library while forking
+    with netcdfLock:
+        for wid in range(workers):
+            tasks = context.Queue(maxsize=size)
+            process = context.Process(target=outputpoolworker, args=(wid, tasks, pool['results']), daemon=True)
+            process.start()
+            pool['tasks'].append(tasks)
+            pool['processes'].append(process)
+    outputwriter['pool'] = pool
+
+
+def outputpoolworker(wid, tasks, results):
+    """
+    Worker process: writes the output maps of its files until close is received
+    The time for each write is collected per file. After an error the rest is skipped,
+    the error is sent back with the next sync
+
+    :param wid: number of the worker
+    :param tasks: queue of write, sync and close tasks
+    :param results: queue for the answers to sync and close
+    :return: -
+    """
+
+    global netcdfLock
+    # the lock may have been held by another thread of the model while forking
+    netcdfLock = threading.RLock()
+    # netcdf files opened by the model before forking belong to the model: they are not used here and
+    # not closed, closing would write to the files. The handles are kept until the worker ends
+    inherited = [list(outputhandles.values()), list(meteohandles.values()), list(netcdfcache.values())]
+    outputwriter.clear()
+    outputwriter.update({'queue': None, 'error': None, 'pool': None, 'inherited': inherited})
+    outputhandles.clear()
+    meteohandles.clear()
+    netcdfcache.clear()
+
+    latency = {}
+    error = None
+
+    def timed(netfile, func, *args):
+        start = xtime.perf_counter()
+        func(*args)
+        t = xtime.perf_counter() - start
+        lat = latency.setdefault(netfile, [0, 0., 0.])
+        lat[0] += 1
+        lat[1] += t
+        lat[2] = max(lat[2], t)
+
+    while True:
+        task = tasks.get()
+        if task[0] == 'write':
+            if error is None:
+                dateVar['laststep'] = task[2]
+                try:
+                    timed(task[1][0], writenetcdf, *task[1])
+                except BaseException:
+                    # also SystemExit of CWATMError: the worker has to stay alive to answer the next sync
+                    error = traceback.format_exc()
+        elif task[0] == 'sync':
+            results.put(('sync', wid, latency, error))
+        else:
+            # rest of the time slices are written when closing
+            for netfile in list(outputhandles.keys()):
+                try:
+                    timed(netfile, closeoutputhandles, netfile)
+                except BaseException:
+                    if error is None:
+                        error = traceback.format_exc()
+            results.put(('close', wid, latency, error))
+            return
+
+
+def puttask(wid, task):
+    """
+    Send a task to a worker process, waits while the queue of the worker is full
+
+    :param wid: number of the worker
+    :param task: task for :meth:`management_modules.data_handling.outputpoolworker`
+    :return: -
+    :raises if the worker stopped: the full queue would never be emptied
+    """
+
+    pool = outputwriter['pool']
+    while True:
+        try:
+            pool['tasks'][wid].put(task, timeout=1.)
+            return
+        except queue.Full:
+            if not(pool['processes'][wid].is_alive()):
+                for process in pool['processes']:
+                    if process.is_alive():
+                        process.terminate()
+                outputwriter['pool'] = None
+                msg = "Error 224: Writing output maps in worker process\nWorker " + str(wid) + " stopped"
+                raise CWATMError(msg)
+
+
+def submitoutput(args):
+    """
+    Send an output map to the worker process of this file
+    A new file goes to the worker with the fewest files
+
+    :param args: arguments of :meth:`management_modules.data_handling.writenetcdf`
+    :return: flag: to indicate if the file is set up
+    """
+
+    pool = outputwriter['pool']
+    netfile = args[0]
+    if not(netfile in pool['files']):
+        wid = pool['count'].index(min(pool['count']))
+        pool['files'][netfile] = wid
+        pool['count'][wid] += 1
+    inputmap = args[4]
+    valid = hasattr(inputmap, '__len__')
+    if valid:
+        args = args[:4] + (np.array(inputmap),) + args[5:]
+    puttask(pool['files'][netfile], ('write', args, dateVar['laststep']))
+    # if inputmap is not an array writenetcdf gives out a warning and the file is set up new next time
+    return valid
+
+
+def collectoutput(kind):
+    """
+    Wait for the answer of all workers, the latency of each file is updated
+
+    :param kind: sync or close
+    :return: -
+    :raises if a worker had an error or stopped
+    """
+
+    pool = outputwriter['pool']
+    waiting = set(range(len(pool['processes'])))
+    errors = []
+    while waiting:
+        try:
+            answer, wid, latency, error = pool['results'].get(timeout=1.)
+        except queue.Empty:
+            for wid in waiting:
+                if not(pool['processes'][wid].is_alive()):
+                    errors.append("Worker " + str(wid) + " stopped")
+                    waiting = set()
+            continue
+        if answer == kind:
+            waiting.discard(wid)
+            pool['latency'].update(latency)
+            if error is not None:
+                errors.append(error)
+    if errors:
+        for process in pool['processes']:
+            if process.is_alive():
+                process.terminate()
+        outputwriter['pool'] = None
+        msg = "Error 224: Writing output maps in worker process\n" + "\n".join(errors)
+        raise CWATMError(msg)
+
+
+def syncoutput():
+    """
+    Wait until all output maps sent to the workers are written (option outputWorkers)
+    Called at the end of each month and year before the next maps are sent, and at the end of the run
+
+    :return: -
+    """
+
+    if not(outputwriter) or (outputwriter['pool'] is None):
+        return
+    for wid in range(len(outputwriter['pool']['tasks'])):
+        puttask(wid, ('sync',))
+    collectoutput('sync')
+
+
+def closeoutputpool():
+    """
+    Write the rest of the output maps, close the files in the workers and stop the workers
+    With option outputLatency the write time of each file is printed
+
+    :return: -
+    """
+
+    pool = outputwriter['pool']
+    for wid in range(len(pool['tasks'])):
+        puttask(wid, ('close',))
+    collectoutput('close')
+    for process in pool['processes']:
+        process.join()
+
+    report = False
+    if 'outputLatency' in binding:
+        report = returnBool('outputLatency')
+    if report:
+        print("\n%-60s %6s %8s %10s %10s %10s" % ("Output file", "worker", "writes", "total[s]", "mean[ms]", "max[ms]"))
+        for netfile, lat in sorted(pool['latency'].items(), key=lambda x: -x[1][1]):
+            print("%-60s %6i %8i %10.3f %10.2f %10.2f" % (netfile[-60:], pool['files'].get(netfile, -1), lat[0], lat[1],
+                                                        lat[1] / max(1, lat[0]) * 1000., lat[2] * 1000.))
+    outputwriter['latency'] = pool['latency']
+    outputwriter['pool'] = None
+
+
+@netcdflocked
+def closeoutputhandles(netfile = None):
+    """
+    Write the rest of the collected time slices and close the output netcdf files
+
+    :param netfile: (optional) file name, if None all output files are closed
+    :return: -
+    """
+
+    for key in list(outputhandles.keys()):
+        if (netfile is None) or (key == netfile):
+            handle = outputhandles.pop(key)
+            if handle['nf'].isopen():
+                flushoutputhandle(handle)
+                handle['nf'].close()
+
+
 # --------------------------------------------------------------------------------------------
 
 
+@netcdflocked
 def writeIniNetcdf(netfile,varlist, inputlist):
     """
     write variables to netcdf init file
@@ -43,6 +43,10 @@ class ModelFrame:
         self.initialize_run()
         while self.currentStep <= self._model.lastStep:
             self.step()
+        # write the rest of the output maps and close the files
+        from cwatm.management_modules.data_handling import drainoutput, closeoutputhandles
+        drainoutput()
+        closeoutputhandles()
 
 
 
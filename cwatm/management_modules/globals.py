@@ -41,6 +41,21 @@ def globalclear():
     inputcounter.clear()
     flagmeteo.clear()
     meteofiles.clear()
+    for handle in meteohandles.values():
+        handle['nf'].close()
+    meteohandles.clear()
+    for meta in netcdfcache.values():
+        if meta['nf'] is not None:
+            meta['nf'].close()
+    netcdfcache.clear()
+    forcingstore.clear()
+    for handle in outputhandles.values():
+        if handle['nf'].isopen():
+            handle['nf'].close()
+    outputhandles.clear()
+    outputwriter.clear()
+    staticcache.update({'hits': 0, 'misses': 0, 'saved': 0.})
+    initstates.clear()
 
     initCondVarValue.clear()
     initCondVar.clear()
@@ -90,6 +105,21 @@ def calibclear():
     inputcounter.clear()
     flagmeteo.clear()
     meteofiles.clear()
+    for handle in meteohandles.values():
+        handle['nf'].close()
+    meteohandles.clear()
+    for meta in netcdfcache.values():
+        if meta['nf'] is not None:
+            meta['nf'].close()
+    netcdfcache.clear()
+    forcingstore.clear()
+    for handle in outputhandles.values():
+        if handle['nf'].isopen():
+            handle['nf'].close()
+    outputhandles.clear()
+    outputwriter.clear()
+    staticcache.update({'hits': 0, 'misses': 0, 'saved': 0.})
+    initstates.clear()
 
     initCondVarValue.clear()
     initCondVar.clear()
@@ -145,7 +175,8 @@ global timestepInit
 global metaNetcdfVar
 global inputcounter
 global versioning
-global meteofiles, flagmeteo
+global meteofiles, flagmeteo, meteohandles, netcdfcache, staticcache, forcingstore, sharedmeteo
+global outputhandles, outputwriter, initstates
 
 versioning = {}
 timestepInit =[]
@@ -156,6 +187,22 @@ metaNetcdfVar = {}
 inputcounter = {}
 flagmeteo ={}
 meteofiles = {}
+# open netcdf handles of the meteo map stacks
+meteohandles = {}
+# cut window, variable name and time index of the netcdf files read with readnetcdf2
+netcdfcache = {}
+# binary cache of the compressed static maps (option staticMapCache): hits, misses, time saved
+staticcache = {'hits': 0, 'misses': 0, 'saved': 0.}
+# meteo map stacks which are read from the compressed forcing store (option meteoStore)
+forcingstore = {}
+# meteo data of calibration runs in shared memory, attached once per process and kept between runs
+sharedmeteo = {}
+# output netcdf files which are kept open during the run, with time slices not yet written
+outputhandles = {}
+# background thread and queue for writing output maps (option outputAsync) or worker processes (option outputWorkers)
+outputwriter = {}
+# binary init files (option initBinary): header and memory map of each file
+initstates = {}
 
 # Initial conditions
 global initCondVar,initCondVarValue
@@ -171,13 +218,16 @@ dateVar = {}
 # Output variables
 global outDir, outsection, outputTyp
 global outMap, outTss
-global outputTypMap,outputTypTss, outputTypTss2
+global outputTypMap,outputTypTss, outputTypTss2, outputTypStat
 
 outDir = {}
 outMap = {}
 outTss = {}
 outsection = []
-outputTypMap = ['daily', 'monthtot','monthavg', 'monthend', 'monthmid','annualtot','annualavg','annualend','totaltot','totalavg','totalend','once','12month']
+outputTypMap = ['daily', 'monthtot','monthavg', 'monthend', 'monthmid','annualtot','annualavg','annualend','totaltot','totalavg','totalend','once','12month',
+                'monthmax', 'monthmin', 'monthstd', 'monthcountabove', 'annualmax', 'annualmin', 'annualstd', 'annualcountabove']
+# statistics updated every day, percentiles are set as annualpXX or monthpXX e.g. annualp90
+outputTypStat = ['max', 'min', 'std', 'countabove']
 outputTypTss = ['daily', 'monthtot','monthavg', 'monthend','annualtot','annualavg','annualend','totaltot','totalavg']
 outputTypTss2 = ['tss', 'areasum','areaavg']
 
@@ -207,10 +257,11 @@ global domain, indexes
 domain = {}
 indexes = {}
 
-global timeMes,timeMesString, timeMesSum
+global timeMes,timeMesString, timeMesSum, timeMesPrefetch
 timeMes=[]
 timeMesString = []  # name of the time measure - filled in dynamic
 timeMesSum = []    # time measure of hydrological modules
+timeMesPrefetch = [0., 0.]   # time of meteo prefetch in the background, time waiting for the prefetch
 
 
 global coverresult
@@ -236,24 +287,19 @@ if python_bit  < 64:
    raise CWATMError(msg)
 
 path_global = os.path.dirname(__file__)
+path_routing = os.path.join(os.path.split(path_global)[0],"hydrological_modules","routing_reservoirs")
 
 if platform1 == "Windows":
-    dll_routing = os.path.join(os.path.split(path_global)[0],"hydrological_modules","routing_reservoirs","t5.dll")
+    dll_routing = ["t5.dll"]
 elif platform1 == "CYGWIN_NT-6.1":
     # CYGWIN_NT-6.1 - compiled with cygwin
-    dll_routing = os.path.join(os.path.split(path_global)[0],"hydrological_modules","routing_reservoirs","t5cyg.so")
+    dll_routing = ["t5cyg.so"]
 elif platform1 == "Darwin":
-    # Apple
-    
-    dll_routing = os.path.join(os.path.split(path_global)[0],"hydrological_modules","routing_reservoirs","t5_mac.so")
-
+    # Apple: Intel and Apple silicon
+    dll_routing = ["t5_mac.so", "t5.so"]
 else:
-    print("Linux\n")
-    dll_routing = os.path.join(os.path.split(path_global)[0],"hydrological_modules","routing_reservoirs","t5_mac.dylib")
-#dll_routing = "/Users/sorger/Library/CloudStorage/OneDrive-IIASA/GitHub/wq_dev/cwatm/hydrological_modules/routing_reservoirs"
-
+    dll_routing = ["t5_linux.so"]
 #dll_routing = "C:/work2/test1/t4.dll"
-lib2 = ctypes.cdll.LoadLibrary(dll_routing)
 
 # setup the return typs and argument types
 # input type for the cos_doubles function
@@ -266,26 +312,84 @@ array_1d_int = npct.ndpointer(dtype=np.int64, ndim=1)
 array_2d_double = npct.ndpointer(dtype=np.double, ndim=2, flags='CONTIGUOUS')
 
 
-lib2.ups.restype = None
-lib2.ups.argtypes = [array_1d_int, array_1d_int, array_1d_double, ctypes.c_int]
+def loadroutinglibrary(names):
+    """
+    Loads the compiled routing library (t5.cpp) and sets the argument types
+
+    :param names: file names of the library for this platform, the first one which can be loaded is used
+    :return: library or None if there is none for this platform
+    """
+
+    for name in names:
+        try:
+            lib = ctypes.cdll.LoadLibrary(os.path.join(path_routing, name))
+        except OSError:
+            continue
+
+        lib.ups.restype = None
+        lib.ups.argtypes = [array_1d_int, array_1d_int, array_1d_double, ctypes.c_int]
 
-lib2.dirID.restype = None
-lib2.dirID.argtypes = [array_2d_int, array_2d_int, array_2d_int, ctypes.c_int,ctypes.c_int]
+        lib.dirID.restype = None
+        lib.dirID.argtypes = [array_2d_int, array_2d_int, array_2d_int, ctypes.c_int,ctypes.c_int]
 
-#lib2.repairLdd1.argtypes = [ array_2d_int, ctypes.c_int,ctypes.c_int]
-lib2.repairLdd1.argtypes = [ array_2d_int, ctypes.c_int,ctypes.c_int]
+        lib.repairLdd1.argtypes = [ array_2d_int, ctypes.c_int,ctypes.c_int]
 
-lib2.repairLdd2.restype = None
-lib2.repairLdd2.argtypes = [ array_1d_int, array_1d_int, array_1d_int, ctypes.c_int]
+        lib.repairLdd2.restype = None
+        lib.repairLdd2.argtypes = [ array_1d_int, array_1d_int, array_1d_int, ctypes.c_int]
 
-lib2.kinematic.restype = None
-#lib2.kinematic.argtypes = [array_1d_double,array_1d_double, array_1d_int, array_1d_int, array_1d_int,  array_1d_double,  ctypes.c_double, ctypes.c_double,ctypes.c_double, ctypes.c_double, ctypes.c_int]
-#                             qold            q               dirdown        diruplen     dirupid         Qnew              alpha             beta            deltaT          deltaX           size
-lib2.kinematic.argtypes = [array_1d_double,array_1d_double, array_1d_int, array_1d_int, array_1d_int,  array_1d_double,  array_1d_double, ctypes.c_double,ctypes.c_double, array_1d_double, ctypes.c_int]
+        lib.kinematic.restype = None
+        #                             qold            q               dirdown        diruplen     dirupid         Qnew              alpha             beta            deltaT          deltaX           size
+        lib.kinematic.argtypes = [array_1d_double,array_1d_double, array_1d_int, array_1d_int, array_1d_int,  array_1d_double,  array_1d_double, ctypes.c_double,ctypes.c_double, array_1d_double, ctypes.c_int]
 
+        # kinematic wave by levels of the river network, in parallel (option routingThreads). Older libraries do not have it
+        if hasattr(lib, 'kinematicLevel'):
+            lib.kinematicLevel.restype = None
+            # same as kinematic + levelStart, number of levels, number of threads
+            lib.kinematicLevel.argtypes = [array_1d_double,array_1d_double, array_1d_int, array_1d_int, array_1d_int,  array_1d_double,  array_1d_double, ctypes.c_double,ctypes.c_double, array_1d_double, array_1d_int, ctypes.c_int, ctypes.c_int]
+
+        lib.runoffConc.restype = None
+        lib.runoffConc.argtypes = [array_2d_double,array_1d_double,array_1d_double,array_1d_double,ctypes.c_int, ctypes.c_int]
+        return lib
+    return None
+
+
+class routingKernels(object):
+    """
+    Routing kernels ups, dirID, repairLdd1, repairLdd2, kinematic, kinematicLevel, runoffConc
+    of the selected backend. The backend can be changed after import (option routingBackend)
+
+    * native: compiled library t5.cpp, if there is one for this platform
+    * numpy: vectorized numpy version, level by level of the river network
+    """
 
-lib2.runoffConc.restype = None
-lib2.runoffConc.argtypes = [array_2d_double,array_1d_double,array_1d_double,array_1d_double,ctypes.c_int, ctypes.c_int]
+    def __init__(self):
+        self.backends = {}
+        self.name = None
+        self.lib = None
+
+    def register(self, name, lib):
+        self.backends[name] = lib
+        if self.lib is None:
+            self.select(name)
+
+    def select(self, name = 'auto'):
+        if name == 'auto':
+            name = 'native' if 'native' in self.backends else 'numpy'
+        self.lib = self.backends[name]
+        self.name = name
+
+    def __getattr__(self, name):
+        if name == 'lib' or self.lib is None:
+            raise AttributeError(name)
+        return getattr(self.lib, name)
+
+
+lib2 = routingKernels()
+native = loadroutinglibrary(dll_routing)
+if native is not None:
+    lib2.register('native', native)
+from cwatm.hydrological_modules.routing_reservoirs import routing_numpy
+lib2.register('numpy', routing_numpy)
 
 
 
@@ -15,6 +15,7 @@ import sys
 import os
 import string
 import math
+import functools
 import difflib  # to check the closest word in settingsfile, if an error occurs
 
 from cwatm.hydrological_modules.routing_reservoirs.routing_sub import *
@@ -26,7 +27,6 @@ from cwatm.management_modules.data_handling import *
 from .messages import *
 from netCDF4 import Dataset,num2date,date2num,date2index
 
-from decimal import Decimal
 
 class outputTssMap(object):
 
@@ -43,8 +43,8 @@ class outputTssMap(object):
     cellArea                               Area of cell                                                            m2   
     sampleAdresses                                                                                                 --   
     noOutpoints                                                                                                    --   
-    evalCatch                                                                                                      --   
-    catcharea                                                                                                      --   
+    catchmentOp                            sparse operator of the catchments of the output points                  --   
+    catcharea                              area of the catchment of each output point                              m2   
     firstout                                                                                                       --   
     discharge                              Channel discharge                                                       m3/s 
     =====================================  ======================================================================  =====
@@ -56,6 +56,10 @@ class outputTssMap(object):
         self.var = model.var
         self.model = model
 
+        # output plan, compiled at the first timestep with output
+        self.mapplan = None
+        self.tssplan = None
+
     def initial(self):
         """
         Initial part of the output module
@@ -160,18 +164,10 @@ class outputTssMap(object):
         for s in filter(lambda x: "areasum" in x, outTss.keys()): calcCatch = True
 
         if calcCatch:
-           self.var.evalCatch ={}
-           self.var.catcharea = {}
-
-
-           for key in sorted(self.var.sampleAdresses):
-              outp  = globals.inZero.copy()
-              outp[self.var.sampleAdresses[key]] = key
-
-
-
-              self.var.evalCatch[key] = catchment1(self.var.dirUp, outp)
-              self.var.catcharea[key] =np.bincount(self.var.evalCatch[key], weights=self.var.cellArea)[key]
+           # one row for each output point (sorted by number), all points are calculated with one product
+           cells = [self.var.sampleAdresses[key] for key in sorted(self.var.sampleAdresses)]
+           self.var.catchmentOp = catchmentoperator(self.var.dirUp, cells, self.var.cellArea)
+           self.var.catcharea = np.asarray(self.var.catchmentOp.sum(axis=1)).ravel()
 
         # ------------------------------------------------------------------------------
         if checkOption('reportTss'):
@@ -190,13 +186,24 @@ class outputTssMap(object):
             # load netcdf metadata from precipitation
             metaNetCDF()
 
+            # percentiles can be any number e.g. OUT_MAP_AnnualP90, OUT_MAP_MonthP10
+            typMap = outputTypMap[:]
+            for out in outMap.keys():
+                type = out.split('_')[-1]
+                if (outputStatistic.statistic(type) is not None) and not(type in typMap):
+                    typMap.append(type)
+
             # loop through all the section with output variables
             for sec in outsection:
                 # daily output, monthly total monthly average,
-                for type in outputTypMap:
+                for type in typMap:
                     # map or tss, section, type = daily, monthly ....
                     appendinfo(outMap,sec, "_out_map_",type, True)
 
+            # output workers (option outputWorkers) are forked now, before the meteo files are opened
+            if not(outputwriter):
+                startoutputwriter()
+
 
         # check if timing of output is in outputTypTss  (globals.py)
         for out in list(outTss.keys()):
@@ -212,324 +219,304 @@ class outputTssMap(object):
 
 
 
-    def dynamic(self, ef = False):
+    def getter(self, name, varname):
         """
-        Dynamic part of the output module
-        Output of maps and timeseries
+        Returns a function which gives back the actual value of an output variable
+        The variable is checked once, also variables with index from soil e.g. actualET[2] can be used
 
-        :param ef: done with environmental flow
+        :param name: name of the output in the settings file
+        :param varname: variable name
+        :return: function without arguments
         """
 
-        def firstout(map):
-            """
-            returns the first cell as output value
-
-            :param map: 1D array of data
-            :return: value of the first output point
-            """
-
-            first = sorted(list(self.var.sampleAdresses))[0]
-            value = map[self.var.sampleAdresses[first]]
-            return value
-
-        def checkifvariableexists(name, vari, space):
-            """
-            Test if variable exists
-
-            :param name: variable name
-            :param vari: variable to check if it exists in the variable space
-            :param space: variable space of self.var
-            """
-            if not (vari in space):
-                closest = difflib.get_close_matches(vari, space)
-                if not closest: closest = ["- no match -"]
-                msg = "Error 132: Variable \"" + vari + "\" is not defined in \""+ name+"\"\n"
-                msg += "Closest variable to this name is: \"" + closest[0] + "\""
+        index = None
+        if '[' in varname:
+            checkname = varname[0:varname.index("[")]
+            index = varname[varname.index("[") + 1:varname.rindex("]")]
+            try:
+                if ':' in index:
+                    index = slice(*[int(i) if i.strip() else None for i in index.split(':')])
+                else:
+                    index = int(index)
+            except ValueError:
+                msg = "Error 132: Index of variable \"" + varname + "\" in \"" + name + "\" is not a number\n"
                 raise CWATMError(msg)
+        else:
+            checkname = varname
 
+        space = vars(self.var)
+        if not (checkname in space):
+            closest = difflib.get_close_matches(checkname, list(space.keys()))
+            if not closest: closest = ["- no match -"]
+            msg = "Error 132: Variable \"" + checkname + "\" is not defined in \""+ name+"\"\n"
+            msg += "Closest variable to this name is: \"" + closest[0] + "\""
+            raise CWATMError(msg)
 
+        if index is None:
+            return functools.partial(space.__getitem__, checkname)
+        return lambda: space[checkname][index]
 
-        def sample3(expression, map, daymonthyear):
-            """
-            Collects outputpoint value to write it into a time series file
-            calls function :meth:`management_modules.writeTssFile`
-
-            :param expression: array of outputpoint information
-            :param map: 1D array of data
-            :param daymonthyear: day =0 , month =1 , year =2
-            :return: expression
-            """
-
-            #if dateVar['checked'][dateVar['currwrite'] - 1] >= daymonthyear:
-            # using a list with is 1 for monthend and 2 for year end to check for execution
-            value = []
-            #tss.split('_')[-2]
-
-            # if inputmap is not an array give out error message
-            if not (hasattr(map, '__len__')):
-                msg = "No values in: " + expression[1] + "\nCould not write: " + expression[0]
-                print(CWATMWarning(msg))
-                return expression
 
-            for key in sorted(self.var.sampleAdresses):
-                if expression[0].split('_')[-2] in ['areaavg','areasum']:
-                    # value from catchment
-                    v = np.bincount(self.var.evalCatch[key], weights = map * self.var.cellArea)[key]
+    def compilemaps(self):
+        """
+        Output plan for maps, done once at the first output timestep
+        Each variable and kind of aggregation e.g. discharge monthavg is one :class:`outputAggregate`,
+        sorted by the time when it is written
+        """
 
-                    if expression[0].split('_')[-2] == 'areaavg':
-                        if self.var.catcharea[key] == 0:
-                            v = 0.
-                        else:
-                            v = v / self.var.catcharea[key]
-                else: # from single cell
-                   v = map[self.var.sampleAdresses[key]]
-                value.append(v)
-            expression[3].append(value)
+        plan = {}
+        for kind in outputTypMap:
+            plan[kind] = {}
+        stat = {}
+        for map in list(outMap.keys()):
+            for entry in outMap[map]:
+                if entry == "None":
+                    continue
+                varname = entry[1]
+                kind = entry[4]
+                if outputStatistic.statistic(kind) is not None:
+                    # statistics e.g. monthmax, annualp90
+                    if not ((varname, kind) in stat):
+                        stat[(varname, kind)] = outputStatistic(self.getter(map, varname), kind, varname)
+                    stat[(varname, kind)].targets.append(entry)
+                    continue
+                if not (varname in plan[kind]):
+                    plan[kind][varname] = outputAggregate(self.getter(map, varname), kind)
+                plan[kind][varname].targets.append(entry)
+        for kind in plan:
+            plan[kind] = list(plan[kind].values())
+        plan['stat'] = list(stat.values())
+
+        # maps which are summed up every day
+        plan['sum'] = plan['monthtot'] + plan['monthavg'] + plan['annualtot'] + plan['annualavg'] + plan['totaltot'] + plan['totalavg']
+        # either load already calculated discharge or at the end of the simulation
+        plan['efafter'] = False
+        if plan['once'] or plan['12month']:
+            plan['efafter'] = returnBool('calc_ef_afterRun')
+        self.mapplan = plan
+
+
+    def compiletss(self):
+        """
+        Output plan for time series, done once at the first timestep
+        Each output file is one :class:`outputSample`, the sums are shared by variable and kind of aggregation
+        """
 
-            if dateVar['laststep']:
-                writeTssFile(expression, daymonthyear)
+        aggregates = {}
+        plan = []
+        for tss in list(outTss.keys()):
+            kind = tss.split('_')[-1]
+            area = tss.split('_')[-2]
+            for i in range(outTss[tss].__len__()):
+                # loop for each variable in a section
+                if outTss[tss][i] == "None":
+                    continue
+                varname = outTss[tss][i][1]
+                if not ((varname, kind) in aggregates):
+                    aggregates[(varname, kind)] = outputAggregate(self.getter(tss, varname), kind)
+                sample = outputSample(outTss[tss], i, aggregates[(varname, kind)], area)
+                # values are written to the file while the model runs
+                entry = outTss[tss][i]
+                entry[3] = outputTssFile(entry[0], entry[2], sorted(self.var.sampleAdresses), sample.daymonthyear)
+                plan.append(sample)
+
+        self.tssplan = {'sample': plan, 'sum': [a for a in aggregates.values() if a.kind != 'daily' and a.kind[-3:] != 'end']}
+
+
+    def writemap(self, entry, addname, inputmap, timeStamp, posCnt, flagTime, nrdays=None, dateunit="days"):
+        """
+        Writes one output map and keeps the flag if the netcdf file is set up
 
-            return expression
+        :param entry: output information from outMap
+        :param: other parameter see :meth:`management_modules.data_handling.writenetcdf`
+        """
 
+        entry[2] = writeoutput(entry[0], entry[1], addname, "undefined", inputmap, timeStamp, posCnt, entry[2], flagTime, nrdays, dateunit)
 
-        def writeTssFile(expression, daymonthyear):
-            """
-            writing timeseries
-            calls function :meth:`management_modules.writeFileHeader`
 
-            :param expression:  array of outputpoint information
-            :param daymonthyear: day =0 , month =1 , year =2
-            :return: -
-            """
+    def firstout(self, map):
+        """
+        returns the first cell as output value
 
-            outputFilename = expression[0]
+        :param map: 1D array of data
+        :return: value of the first output point
+        """
 
-            if expression[2]:
-                writeFileHeader(outputFilename,expression)
-                outputFile = open(outputFilename, "a")
-            else:
-                outputFile = open(outputFilename, "w")
-
-            assert outputFile
-            if len(expression[3]):
-                numbervalues = len(expression[3][0])
-
-                for timestep in range(dateVar['intSpin'], dateVar['intEnd'] + 1):
-                    if dateVar['checked'][timestep - dateVar['intSpin']] >= daymonthyear:
-                    #if dateVar['checked'][timestep - 1] >= daymonthyear:
-                        row = ""
-                        row += " %8g" % timestep
-                        for i in range(numbervalues):
-                            value = expression[3][timestep-1][i]
-                            if isinstance(value, Decimal):
-                                row += "           1e31"
-                            else:
-                                row += " %14g" % value
-                        row += "\n"
-                        outputFile.write(row)
+        # a group of basins (cwatm-basins) can be without output points
+        if not(self.var.sampleAdresses):
+            return 0.
+        first = sorted(list(self.var.sampleAdresses))[0]
+        value = map[self.var.sampleAdresses[first]]
+        return value
 
-            outputFile.close()
 
-        def writeFileHeader(outputFilename,expression):
-            """
-            writes header part of tss file
+    def sample3(self, expression, map, daymonthyear, area):
+        """
+        Collects outputpoint value to write it into a time series file
+        calls function :meth:`management_modules.output.outputTssFile.append`
+
+        :param expression: array of outputpoint information
+        :param map: 1D array of data
+        :param daymonthyear: day =0 , month =1 , year =2
+        :param area: tss for point value, areasum for sum of area, areaavg for average of area
+        :return: expression
+        """
 
-            :param outputfilename: name of the outputfile
-            :param expression:  array of outputpoint information
-            :return: -
-            """
+        #if dateVar['checked'][dateVar['currwrite'] - 1] >= daymonthyear:
+        # using a list with is 1 for monthend and 2 for year end to check for execution
+        value = []
 
-            outputFile = open(outputFilename, "w")
-            # header
-            # outputFile.write("timeseries " + self._spatialDatatype.lower() + "\n")
-            header = "timeseries " + " settingsfile: " + os.path.realpath(settingsfile[0]) + " date: " + xtime.ctime(xtime.time())
-            header += " CWATM: " + versioning['exe']  + ", " +versioning['lastdate'] + "\n"
-            if 'save_git' in option:
-                if checkOption("save_git"):
-                    import git
-                    header += "git commit " + git.Repo(search_parent_directories=True).head.object.hexsha
-           
-            outputFile.write(header)
-            if len(expression[3]):
-                numbervalues = len(expression[3][0]) + 1
-            else: numbervalues = 0
+        # if inputmap is not an array give out error message
+        if not (hasattr(map, '__len__')):
+            msg = "No values in: " + expression[1] + "\nCould not write: " + expression[0]
+            print(CWATMWarning(msg))
+            return expression
 
-            outputFile.write(str(numbervalues) + "\n")
-            outputFile.write("timestep\n")
+        if area in ['areaavg','areasum']:
+            # value from catchment
+            value = self.var.catchmentOp.dot(map)
+            if area == 'areaavg':
+                catcharea = self.var.catcharea
+                value = np.divide(value, catcharea, out=np.zeros_like(value), where=catcharea != 0)
+            value = list(value)
+        else: # from single cell
             for key in sorted(self.var.sampleAdresses):
-                outputFile.write(str(key) + "\n")
-            outputFile.close()
-
-        # ************************************************************
-        # ***** WRITING RESULTS: TIME SERIES *************************
-        # ************************************************************
-
-        # xxx=catchmenttotal(self.var.SurfaceRunForest * self.var.PixelArea, self.var.Ldd) * self.var.InvUpArea
-        # self.var.Tss['DisTS'].sample(xxx)
-        # self.report(self.Precipitation,cbinding('TaMaps'))
-
-
-        def sample_maptotxt(expression, map):
-            """
-            Write map information to textfile
+                value.append(map[self.var.sampleAdresses[key]])
+        expression[3].append(value)
 
-            :param expression:
-            :param map:
-            :return:
-            """
-            size = map.shape[0]
-
-            outputFilename = os.path.splitext(expression[0])[0] + ".txt"
-            outputFile = open(outputFilename, "w")
-            outputFile.write("Map_dump " + " settingsfile: " + os.path.realpath(settingsfile[0]) + " date: " + xtime.ctime(xtime.time()) + "\n")
-            outputFile.write("Parameter: " + expression[1] + "\n")
-            outputFile.write("Number of cells: " + str(size) + "\n")
+        return expression
 
-            for i in range(size):
-                v = "%.3f\n" % round(1000. * map[i],3)
-                outputFile.write(v)
-            outputFile.close()
 
+    def sample_maptotxt(self, expression, map):
+        """
+        Write map information to textfile
 
+        :param expression:
+        :param map:
+        :return:
+        """
+        size = map.shape[0]
 
+        outputFilename = os.path.splitext(expression[0])[0] + ".txt"
+        outputFile = open(outputFilename, "w")
+        outputFile.write("Map_dump " + " settingsfile: " + os.path.realpath(settingsfile[0]) + " date: " + xtime.ctime(xtime.time()) + "\n")
+        outputFile.write("Parameter: " + expression[1] + "\n")
+        outputFile.write("Number of cells: " + str(size) + "\n")
 
+        for i in range(size):
+            v = "%.3f\n" % round(1000. * map[i],3)
+            outputFile.write(v)
+        outputFile.close()
 
 
+    def dynamic(self, ef = False):
+        """
+        Dynamic part of the output module
+        Output of maps and timeseries
 
+        :param ef: done with environmental flow
+        """
 
+        # using a list with is 1 for monthend and 2 for year end to check for execution
+        checked = dateVar['checked'][dateVar['currwrite'] - 1]
+        endofrun = dateVar['currDate'] == dateVar['dateEnd']
 
         # ************************************************************
-
         # ***** WRITING RESULTS: MAPS   ******************************
         # ************************************************************
 
-        # print '----------------#'
-        varname = None
-        varnameCollect =[]
         if checkOption('reportMap') and dateVar['curr'] >= dateVar['intSpin'] or ef:
-            for map in list(outMap.keys()):
-                for i in range(outMap[map].__len__()):
-                    if outMap[map][i] != "None":
-
-                        netfile = outMap[map][i][0]
-                        flag = outMap[map][i][2]
-                        # flag to create netcdf or to write
-                        varname = outMap[map][i][1]
-                        type = outMap[map][i][4]
-
-                        # to use also variables with index from soil e.g. actualET[2]
-                        if '[' in varname:
-                            checkname = varname[0:varname.index("[")]
-                        else:
-                            checkname = varname
-                        checkifvariableexists(map,checkname, list(vars(self.var).keys()))
-
-                        varnameCollect.append(varname)
-                        inputmap = 'self.var.' + varname
-
-                        # create variable after it is checked on the first timestep
-                        # creates a var to sum/ average the results e.g. self.var.Precipitation_monthtot
-                        if dateVar['curr'] == dateVar['intSpin']:
-                            vars(self.var)[varname+"_"+type] = 0
-
-                        if map[-5:] == "daily":
-                            outMap[map][i][2] = writenetcdf(netfile, varname,"", "undefined", eval(inputmap),  dateVar['currDate'],dateVar['currwrite'], flag, True, dateVar['diffdays'])
-                        if map[-8:] == "monthend":
-                            if dateVar['checked'][dateVar['currwrite'] - 1]>0:
-                                outMap[map][i][2] = writenetcdf(netfile, varname, "_monthend", "undefined", eval(inputmap),  dateVar['currDate'], dateVar['currMonth'], flag,True,dateVar['diffMonth'])
-                        if map[-8:] == "monthtot":
-                            # sum up daily value to monthly values
-                            vars(self.var)[varname + "_monthtot"] = vars(self.var)[varname + "_monthtot"] +  eval(inputmap)
-                        if map[-8:] == "monthavg":
-                            #vars(self.var)[varname + "_monthavg"] = vars(self.var)[varname + "_monthavg"] + vars(self.var)[varname]
-                            vars(self.var)[varname + "_monthavg"] = vars(self.var)[varname + "_monthavg"] +  eval(inputmap)
-
-                        if map[-4:] == "once":
-                            if (returnBool('calc_ef_afterRun') == False) or (dateVar['currDate'] == dateVar['dateEnd']):
-                                # either load already calculated discharge or at the end of the simulation
-                                outMap[map][i][2] = writenetcdf(netfile, varname,"", "undefined", eval(inputmap),
-                                                            dateVar['currDate'], dateVar['currwrite'], flag, False)
-                        if map[-7:] == "12month":
-                            if (returnBool('calc_ef_afterRun') == False) or (dateVar['currDate'] == dateVar['dateEnd']):
-                                # either load already calculated discharge or at the end of the simulation
-                                flag1 = False # create new netcdf file
-                                for j in range(12):
-                                    in1 = inputmap  + '[' +str(j) + ']'
-                                    date1 = datetime.datetime(dateVar['dateEnd'].year, j+1, 1, 0, 0)
-                                    outMap[map][i][2] = writenetcdf(netfile, varname,"", "undefined", eval(in1), date1, j+1, flag1, True,12)
-                                    flag1 = True # now append to netcdf file
-
-
-                        # if end of month is reached
-                        if dateVar['checked'][dateVar['currwrite'] - 1]>0:
-                            #if (map[-8:] == "monthend"):
-                            #    outMap[map][i][2] = writenetcdf(netfile, varname,"_monthend", "undefined", eval(inputmap+ "_monthend"), #dateVar['currDate'], dateVar['currMonth'], flag, True,
-                            #                                    dateVar['diffMonth'],dateunit="months")
-                            if map[-8:] == "monthtot":
-                                outMap[map][i][2] = writenetcdf(netfile, varname,"_monthtot", "undefined", eval(inputmap+ "_monthtot"), dateVar['currDate'], dateVar['currMonth'], flag, True,
-                                                                dateVar['diffMonth'],dateunit="months")
-                                #vars(self.var)[varname + "monthtot"] = 0
-                            if map[-8:] == "monthavg":
-                                #days = calendar.monthrange(dateVar['currDate'].year, dateVar['currDate'].month)[1]
-                                avgmap = vars(self.var)[varname + "_monthavg"] / dateVar['daysInMonth']
-                                outMap[map][i][2] = writenetcdf(netfile, varname,"_monthavg", "undefined", avgmap,dateVar['currDate'], dateVar['currMonth'], flag, True,dateVar['diffMonth'],dateunit="months")
-                                #vars(self.var)[varname+"monthavg"] = 0
-
-
-
-                        if map[-9:] == "annualend":
-                            if dateVar['checked'][dateVar['currwrite'] - 1]==2:
-                                outMap[map][i][2] = writenetcdf(netfile, varname,"_annualend", "undefined", eval(inputmap),  dateVar['currDate'], dateVar['currYear'], flag,True,dateVar['diffYear'],
-                                                                dateunit="years")
-                        if map[-9:] == "annualtot":
-                            vars(self.var)[varname + "_annualtot"] = vars(self.var)[varname + "_annualtot"] + vars(self.var)[varname]
-                        if map[-9:] == "annualavg":
-                            vars(self.var)[varname + "_annualavg"] = vars(self.var)[varname + "_annualavg"] + vars(self.var)[varname]
-
-                        if dateVar['checked'][dateVar['currwrite'] - 1]==2:
-                            if map[-9:] == "annualtot":
-                                    outMap[map][i][2] = writenetcdf(netfile, varname,"_annualtot", "undefined", eval(inputmap+ "_annualtot"), dateVar['currDate'], dateVar['currYear'], flag, True,
-                                                                    dateVar['diffYear'], dateunit="years")
-                            if map[-9:] == "annualavg":
-                                        days = 366 if calendar.isleap(dateVar['currDate'].year) else 365
-                                        avgmap = vars(self.var)[varname + "_annualavg"] / days
-                                        outMap[map][i][2] = writenetcdf(netfile, varname,"_annualavg", "undefined", avgmap, dateVar['currDate'], dateVar['currYear'], flag, True,
-                                                                        dateVar['diffYear'],dateunit="years")
-                                    #vars(self.var)[varname+"annualtot"] = 0
-
-
-                        if map[-8:] == "totaltot":
-                            if dateVar['curr'] >= dateVar['intSpin']:
-                                vars(self.var)[varname + "_totaltot"] = vars(self.var)[varname + "_totaltot"] + vars(self.var)[varname]
-                                if dateVar['currDate'] == dateVar['dateEnd']:
-                                    # at the end of simulation write this map
-                                    outMap[map][i][2] = writenetcdf(netfile, varname,"_totaltot", "undefined", eval(inputmap +  "_totaltot"),
-                                                                dateVar['currDate'], dateVar['currwrite'], flag, False)
-
-                        if map[-8:] == "totalavg":
-                            if dateVar['curr'] >= dateVar['intSpin']:
-                                vars(self.var)[varname + "_totalavg"] = vars(self.var)[varname + "_totalavg"] + vars(self.var)[varname]/ float(dateVar['diffdays'])
-                                if dateVar['currDate'] == dateVar['dateEnd']:
-                                    # at the end of simulation write this map
-                                    outMap[map][i][2] = writenetcdf(netfile, varname,"_totalavg", "undefined",
-                                                                    eval(inputmap + "_totalavg"),
-                                                                    dateVar['currDate'], dateVar['currwrite'],
-                                                                    flag, False)
-
-                        if map[-8:] == "totalend":
-                            if dateVar['currDate'] == dateVar['dateEnd']:
-                                # at the end of simulation write this map
-                                vars(self.var)[varname + "_totalend"] = vars(self.var)[varname]
-                                outMap[map][i][2] = writenetcdf(netfile, varname,"_totalend","undefined", vars(self.var)[varname],
-                                                                dateVar['currDate'],
-                                                                dateVar['currwrite'],
-                                                                flag, False)
-
-
-                                # ************************************************************
+            if self.mapplan is None:
+                self.compilemaps()
+            plan = self.mapplan
+
+            # creates a var to sum/ average the results e.g. Precipitation monthtot
+            if dateVar['curr'] == dateVar['intSpin']:
+                for agg in plan['sum']:
+                    agg.sum = 0
+                for stat in plan['stat']:
+                    stat.reset()
+
+            for agg in plan['daily']:
+                for entry in agg.targets:
+                    self.writemap(entry, "", agg.getter(), dateVar['currDate'], dateVar['currwrite'], True, dateVar['diffdays'])
+            for agg in plan['sum']:
+                agg.add()
+            for stat in plan['stat']:
+                stat.add()
+
+            if plan['once'] or plan['12month']:
+                if (plan['efafter'] == False) or endofrun:
+                    for agg in plan['once']:
+                        for entry in agg.targets:
+                            self.writemap(entry, "", agg.getter(), dateVar['currDate'], dateVar['currwrite'], False)
+                    for agg in plan['12month']:
+                        for entry in agg.targets:
+                            entry[2] = False  # create new netcdf file
+                            for j in range(12):
+                                date1 = datetime.datetime(dateVar['dateEnd'].year, j+1, 1, 0, 0)
+                                self.writemap(entry, "", agg.getter()[j], date1, j+1, True, 12)
+
+            # if end of month is reached
+            if checked > 0:
+                # maps of the last month are written by the output workers before the next ones are sent
+                syncoutput()
+                for agg in plan['monthend']:
+                    for entry in agg.targets:
+                        self.writemap(entry, "_monthend", agg.getter(), dateVar['currDate'], dateVar['currMonth'], True, dateVar['diffMonth'])
+                for agg in plan['monthtot']:
+                    for entry in agg.targets:
+                        self.writemap(entry, "_monthtot", agg.sum, dateVar['currDate'], dateVar['currMonth'], True, dateVar['diffMonth'], dateunit="months")
+                    agg.sum = 0
+                for agg in plan['monthavg']:
+                    avgmap = agg.sum / dateVar['daysInMonth']
+                    for entry in agg.targets:
+                        self.writemap(entry, "_monthavg", avgmap, dateVar['currDate'], dateVar['currMonth'], True, dateVar['diffMonth'], dateunit="months")
+                    agg.sum = 0
+                for stat in plan['stat']:
+                    if stat.kind[0:5] == 'month':
+                        for entry in stat.targets:
+                            self.writemap(entry, "_" + stat.kind, stat.value(), dateVar['currDate'], dateVar['currMonth'], True, dateVar['diffMonth'], dateunit="months")
+                        stat.reset()
+
+            # if end of year is reached
+            if checked == 2:
+                for agg in plan['annualend']:
+                    for entry in agg.targets:
+                        self.writemap(entry, "_annualend", agg.getter(), dateVar['currDate'], dateVar['currYear'], True, dateVar['diffYear'], dateunit="years")
+                for agg in plan['annualtot']:
+                    for entry in agg.targets:
+                        self.writemap(entry, "_annualtot", agg.sum, dateVar['currDate'], dateVar['currYear'], True, dateVar['diffYear'], dateunit="years")
+                    agg.sum = 0
+                days = 366 if calendar.isleap(dateVar['currDate'].year) else 365
+                for agg in plan['annualavg']:
+                    avgmap = agg.sum / days
+                    for entry in agg.targets:
+                        self.writemap(entry, "_annualavg", avgmap, dateVar['currDate'], dateVar['currYear'], True, dateVar['diffYear'], dateunit="years")
+                    agg.sum = 0
+                for stat in plan['stat']:
+                    if stat.kind[0:6] == 'annual':
+                        for entry in stat.targets:
+                            self.writemap(entry, "_" + stat.kind, stat.value(), dateVar['currDate'], dateVar['currYear'], True, dateVar['diffYear'], dateunit="years")
+                        stat.reset()
+
+            # at the end of simulation write this map
+            if endofrun:
+                for agg in plan['totaltot']:
+                    for entry in agg.targets:
+                        self.writemap(entry, "_totaltot", agg.sum, dateVar['currDate'], dateVar['currwrite'], False)
+                for agg in plan['totalavg']:
+                    for entry in agg.targets:
+                        self.writemap(entry, "_totalavg", agg.sum, dateVar['currDate'], dateVar['currwrite'], False)
+                for agg in plan['totalend']:
+                    for entry in agg.targets:
+                        self.writemap(entry, "_totalend", agg.getter(), dateVar['currDate'], dateVar['currwrite'], False)
+
+
+        # ************************************************************
         # ***** WRITING RESULTS: TIME SERIES *************************
         # ************************************************************
-        self.var.firstout = firstout(self.var.discharge)
+        self.var.firstout = self.firstout(self.var.discharge)
 
         if Flags['loud']:
             print("\r%-6i %10s %10.2f     " %(dateVar['currStart'],dateVar['currDatestr'],self.var.firstout), end='')
@@ -543,127 +530,368 @@ class outputTssMap(object):
                     print("\r%d   " % dateVar['currStart'],end ='')
                     sys.stdout.flush()
 
-        #if Flags['loud'] and checkOption('reportTss'):
-            #print(" %10.2f" % self.var.firstout)
-
         if checkOption('reportTss'):
-            for tss in list(outTss.keys()):
-                for i in range(outTss[tss].__len__()):
-                    # loop for each variable in a section
-                    if outTss[tss][i] != "None":
-                        varname = outTss[tss][i][1]
-                        varnameCollect.append(varname)
-                        what = 'self.var.' + outTss[tss][i][1]
-
-                        # to use also variables with index from soil e.g. actualET[2]
-                        if '[' in varname:
-                            checkname = varname[0:varname.index("[")]
-                        else:
-                            checkname = varname
-                        checkifvariableexists(tss, checkname, list(vars(self.var).keys()))
-
-                        if tss[-5:] == "daily":
-                            # what = 'self.var.' + reportTimeSerieAct[tss]['outputVar'][0]
-                            # how = reportTimeSerieAct[outTss[tss][0][0]]['operation'][0]
-                            # if how == 'mapmaximum':
-                            # changed = compressArray(mapmaximum(decompress(eval(what))))
-                            # what = 'changed'
-                            # if how == 'total':
-                            # changed = compressArray(catchmenttotal(decompress(eval(what)) * self.var.PixelAreaPcr,self.var.Ldd) * self.var.InvUpArea)
-                            # what = 'changed'
-                            # print i, outTss[tss][i][1], what
-                            #outTss[tss][i][0].sample2(decompress(eval(what)), 0 )
-                            outTss[tss][i] = sample3(outTss[tss][i],eval(what),0)
-
-                        if tss[-8:] == "monthend":
-                            # reporting at the end of the month:
-                            outTss[tss][i] = sample3(outTss[tss][i], eval(what), 1)
-
-                        if tss[-8:] == "monthtot":
-                            # if  monthtot is not calculated it is done here
-                            if (varname + "_monthtotTss") in vars(self.var):
-                                vars(self.var)[varname + "_monthtotTss"] = vars(self.var)[varname + "_monthtotTss"] + vars(self.var)[varname]
-                            else:
-                                vars(self.var)[varname + "_monthtotTss"] = vars(self.var)[varname]
-                            outTss[tss][i] = sample3(outTss[tss][i], eval(what + "_monthtotTss"), 1)
+            if self.tssplan is None:
+                self.compiletss()
+            plan = self.tssplan
+
+            for agg in plan['sum']:
+                if agg.kind[0:5] == 'total':
+                    if dateVar['curr'] >= dateVar['intSpin']:
+                        agg.add()
+                else:
+                    agg.add()
+
+            for sample in plan['sample']:
+                agg = sample.aggregate
+                if agg.kind in ['daily', 'monthend', 'annualend']:
+                    map = agg.getter()
+                elif agg.kind == 'monthavg':
+                    map = agg.sum / dateVar['daysInMonth']
+                elif agg.kind == 'annualavg':
+                    map = agg.sum / dateVar['daysInYear']
+                elif agg.kind[0:5] == 'total':
+                    # at the end of the simulation the map is written into a text file
+                    if (dateVar['curr'] >= dateVar['intSpin']) and endofrun:
+                        self.sample_maptotxt(sample.entry, agg.sum)
+                    continue
+                else:
+                    map = agg.sum
+                sample.out[sample.i] = self.sample3(sample.entry, map, sample.daymonthyear, sample.area)
 
-                        if tss[-8:] == "monthavg":
-                            if (varname + "_monthavgTss") in vars(self.var):
-                                vars(self.var)[varname + "_monthavgTss"] =  vars(self.var)[varname + "_monthavgTss"] + vars(self.var)[varname]
-                            else:
-                                vars(self.var)[varname + "_monthavgTss"] = 0
-                                vars(self.var)[varname + "_monthavgTss"] = vars(self.var)[varname + "_monthavgTss"] + vars(self.var)[varname]
-                            avgmap = vars(self.var)[varname + "_monthavgTss"] /  dateVar['daysInMonth']
-                            outTss[tss][i] = sample3(outTss[tss][i], avgmap, 1)
+            # if end of month is reached all monthly storage is set to 0
+            for agg in plan['sum']:
+                if (checked > 0) and (agg.kind[0:5] == 'month'):
+                    agg.sum = 0
+                if (checked == 2) and (agg.kind[0:6] == 'annual'):
+                    agg.sum = 0
+
+
+class outputAggregate(object):
+    """
+    One variable of the output plan with one kind of aggregation e.g. discharge monthavg
+    The sum is shared by all output files of this variable and kind
+
+    :param getter: function which gives back the actual value of the variable
+    :param kind: kind of aggregation e.g. daily, monthtot
+    """
 
+    def __init__(self, getter, kind):
+        self.getter = getter
+        self.kind = kind
+        self.targets = []
+        self.sum = 0
 
+    def add(self):
+        """
+        add the actual value of the variable to the sum
+        """
+
+        if self.kind == 'totalavg':
+            self.sum = self.sum + self.getter() / float(dateVar['diffdays'])
+        else:
+            self.sum = self.sum + self.getter()
 
 
-                        if tss[-9:] == "annualend":
-                            # reporting at the end of the month:
-                            #outTss[tss][i][0].sample2(decompress(eval(what)), 2)
-                            outTss[tss][i] = sample3(outTss[tss][i], eval(what), 2)
+class outputStatistic(object):
+    """
+    One variable of the output plan with a statistic over a month or year e.g. discharge monthmax, discharge annualp90
+    The statistic is updated every day with the actual value (streaming), no daily maps are stored
 
-                        if tss[-9:] == "annualtot":
+    * max, min: running maximum or minimum
+    * std: standard deviation with Welford's algorithm
+    * pXX: percentile XX with the P-square algorithm for each cell (Jain & Chlamtac 1985)
+    * countabove: number of days above countaboveThreshold (or countaboveThreshold_varname), value or map
 
-                            if (varname + "_annualtotTss") in vars(self.var):
-                                vars(self.var)[varname + "_annualtotTss"] = vars(self.var)[varname + "_annualtotTss"] + vars(self.var)[varname]
-                            else:
-                                vars(self.var)[varname + "_annualtotTss"] = vars(self.var)[varname]
-                            outTss[tss][i] = sample3(outTss[tss][i], eval(what + "_annualtotTss"), 2)
+    :param getter: function which gives back the actual value of the variable
+    :param kind: kind of statistic e.g. monthmax, annualstd, annualp90
+    :param varname: variable name
+    """
 
-                        if tss[-9:] == "annualavg":
-                            if (varname + "_annualavgTss") in vars(self.var):
-                                vars(self.var)[varname + "_annualavgTss"] = vars(self.var)[varname + "_annualavgTss"] + vars(self.var)[varname]
-                            else:
-                                vars(self.var)[varname + "_annualavgTss"] = vars(self.var)[varname]
-                            avgmap = vars(self.var)[varname + "_annualavgTss"] /dateVar['daysInYear']
-                            #outTss[tss][i][0].sample2(decompress(avgmap), 2)
-                            outTss[tss][i] = sample3(outTss[tss][i], avgmap, 2)
-
-                        if tss[-8:] == "totaltot":
-                            if dateVar['curr'] >= dateVar['intSpin']:
-                                if (varname + "_totaltotTss") in vars(self.var):
-                                    vars(self.var)[varname + "_totaltotTss"] =  vars(self.var)[varname + "_totaltotTss"] + vars(self.var)[varname]
-                                else:
-                                    vars(self.var)[varname + "_totaltotTss"] = vars(self.var)[varname]
-                                if dateVar['currDate'] == dateVar['dateEnd']:
-                                    #outTss[tss][i] = sample_maptotxt(outTss[tss][i],  eval(what + "_totaltotTss"))
-                                    sample_maptotxt(outTss[tss][i], eval(what + "_totaltotTss"))
-
-                        if tss[-8:] == "totalavg":
-                            if dateVar['curr'] >= dateVar['intSpin']:
-                                if (varname + "_totalavgTss") in vars(self.var):
-                                    vars(self.var)[varname + "_totalavgTss"] = vars(self.var)[varname + "_totalavgTss"] + vars(self.var)[varname] / float(dateVar['diffdays'])
-                                else:
-                                    vars(self.var)[varname + "_totalavgTss"] = vars(self.var)[varname] / float(dateVar['diffdays'])
-                                if dateVar['currDate'] == dateVar['dateEnd']:
-                                    #outTss[tss][i] = sample_maptotxt(outTss[tss][i], eval(what + "_totalavgTss"))
-                                    sample_maptotxt(outTss[tss][i], eval(what + "_totalavgTss"))
-
-        # if end of month is reached all monthly storage is set to 0
-        #if not(varname is None):
-        for varname in varnameCollect:
-            if dateVar['checked'][dateVar['currwrite'] - 1] > 0:
-                if (varname + "_monthtot") in vars(self.var):
-                    vars(self.var)[varname + "_monthtot"] = 0
-                if (varname + "_monthavg") in vars(self.var):
-                    vars(self.var)[varname + "_monthavg"] = 0
-                if (varname + "_monthtotTss") in vars(self.var):
-                    vars(self.var)[varname + "_monthtotTss"] = 0
-                if (varname + "_monthavgTss") in vars(self.var):
-                    vars(self.var)[varname + "_monthavgTss"] = 0
-
-            if dateVar['checked'][dateVar['currwrite'] - 1] == 2:
-                if (varname + "_annualtot") in vars(self.var):
-                    vars(self.var)[varname + "_annualtot"] = 0
-                if (varname + "_annualavg") in vars(self.var):
-                    vars(self.var)[varname + "_annualavg"] = 0
-                if (varname + "_annualtotTss") in vars(self.var):
-                    vars(self.var)[varname + "_annualtotTss"] = 0
-                for ii in range(self.var.noOutpoints):
-                    if (varname + "_annualtotTss"+str(ii)) in vars(self.var):
-                        vars(self.var)[varname + "_annualtotTss"+str(ii)] = 0
-                if (varname + "_annualavgTss") in vars(self.var):
-                    vars(self.var)[varname + "_annualavgTss"] = 0
+    # number of values kept for percentiles before the P-square algorithm starts
+    nexact = 31
+
+    def __init__(self, getter, kind, varname):
+        self.getter = getter
+        self.kind = kind
+        self.targets = []
+        self.stat = outputStatistic.statistic(kind)
+        self.threshold = None
+        if self.stat == 'countabove':
+            name = 'countaboveThreshold'
+            if name + '_' + varname in binding:
+                name = name + '_' + varname
+            if not (name in binding):
+                msg = "Error 133: Output " + varname + " " + kind + " needs a threshold: countaboveThreshold\n"
+                raise CWATMError(msg)
+            self.threshold = loadmap(name)
+        if self.stat[0] == 'p':
+            self.p = int(self.stat[1:]) / 100.
+            if not (0. < self.p < 1.):
+                msg = "Error 133: Percentile of output " + varname + " " + kind + " has to be between 1 and 99\n"
+                raise CWATMError(msg)
+            # P-square: increments of the desired marker positions, same for each cell
+            self.dn = np.array([0., self.p / 2., self.p, (1. + self.p) / 2., 1.])
+        self.state = None
+        self.n = None
+        self.reset()
+
+    @staticmethod
+    def statistic(kind):
+        """
+        Statistic of an output type
+
+        :param kind: output type e.g. monthmax, annualp90
+        :return: statistic e.g. max, p90 or None if kind is not a statistic
+        """
+
+        if kind[0:5] == 'month':
+            stat = kind[5:]
+        elif kind[0:6] == 'annual':
+            stat = kind[6:]
+        else:
+            return None
+        if (stat in outputTypStat) or ((stat[0:1] == 'p') and stat[1:].isdigit()):
+            return stat
+        return None
+
+    def reset(self):
+        """
+        starts a new month or year, the arrays are kept and overwritten
+        """
+
+        self.count = 0
+
+    def add(self):
+        """
+        adds the actual value of the variable
+        """
+
+        x = np.asarray(self.getter(), dtype=np.float64)
+        if x.ndim == 0:
+            x = np.full(maskinfo['mapC'], x)
+        self.count += 1
+        if self.state is None or self.state.shape[1:] != x.shape:
+            # buffers for the whole run: first values and markers for percentiles, mean and squared differences for std
+            self.state = np.empty((outputStatistic.nexact if self.stat[0] == 'p' else 2,) + x.shape)
+        state = self.state
+
+        if self.count == 1:
+            if self.stat == 'countabove':
+                state[0] = x > self.threshold
+            elif self.stat == 'std':
+                state[0] = x
+                state[1] = 0.
+            else:
+                state[0] = x
+        elif self.stat == 'max':
+            np.maximum(state[0], x, out=state[0])
+        elif self.stat == 'min':
+            np.minimum(state[0], x, out=state[0])
+        elif self.stat == 'countabove':
+            state[0] += x > self.threshold
+        elif self.stat == 'std':
+            # Welford: running mean and sum of squared differences
+            delta = x - state[0]
+            state[0] += delta / self.count
+            state[1] += delta * (x - state[0])
+        else:
+            self.addquantile(x)
+
+    def addquantile(self, x):
+        """
+        P-square algorithm: 5 markers for each cell, the middle one is the percentile
+        The first 31 values are kept, so percentiles of a month are exact, the markers start from these values
+
+        :param x: actual value
+        """
+
+        if self.count <= outputStatistic.nexact:
+            self.state[self.count - 1] = x
+            return
+        if self.count == outputStatistic.nexact + 1:
+            # markers and their positions from the sorted first values
+            nx = outputStatistic.nexact
+            self.state.sort(axis=0)
+            frac = np.array([0., self.p / 2., self.p, (1. + self.p) / 2., 1.])
+            self.nd = 1. + (nx - 1.) * frac
+            pos = np.rint(self.nd).astype(int)
+            for k in range(1, 4):
+                pos[k] = max(pos[k], pos[k - 1] + 1)
+            for k in range(3, 0, -1):
+                pos[k] = min(pos[k], pos[k + 1] - 1)
+            self.state[0:5] = self.state[pos - 1]
+            if self.n is None or self.n.shape != self.state[0:5].shape:
+                self.n = np.empty(self.state[0:5].shape)
+            self.n[:] = pos.astype(np.float64).reshape((5,) + (1,) * x.ndim)
+
+        q, n = self.state, self.n
+        np.minimum(q[0], x, out=q[0])
+        np.maximum(q[4], x, out=q[4])
+        # markers above the new value are moved one position
+        for i in range(1, 4):
+            n[i] += x < q[i]
+        n[4] += 1.
+        self.nd += self.dn
+
+        for i in range(1, 4):
+            d = self.nd[i] - n[i]
+            adjust = ((d >= 1.) & (n[i + 1] - n[i] > 1.)) | ((d <= -1.) & (n[i - 1] - n[i] < -1.))
+            if not adjust.any():
+                continue
+            ds = np.sign(d)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # parabolic prediction
+                qp = q[i] + ds / (n[i + 1] - n[i - 1]) * ((n[i] - n[i - 1] + ds) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                                                         + (n[i + 1] - n[i] - ds) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                # linear prediction if the parabolic one is not between the neighbours
+                up = ds > 0
+                qn = np.where(up, q[i + 1], q[i - 1])
+                nn = np.where(up, n[i + 1], n[i - 1])
+                ql = q[i] + ds * (qn - q[i]) / (nn - n[i])
+            qp = np.where((q[i - 1] < qp) & (qp < q[i + 1]), qp, ql)
+            q[i] = np.where(adjust, qp, q[i])
+            n[i] += np.where(adjust, ds, 0.)
+
+    def value(self):
+        """
+        statistic of the month or year
+
+        :return: map of the statistic
+        """
+
+        if self.stat == 'std':
+            return np.sqrt(self.state[1] / self.count)
+        if self.stat[0] == 'p':
+            if self.count <= outputStatistic.nexact:
+                return np.percentile(self.state[:self.count], self.p * 100., axis=0)
+            return self.state[2].copy()
+        return self.state[0].copy()
+
+
+class outputSample(object):
+    """
+    One time series output file of the output plan
+
+    :param out: list of outputs in outTss
+    :param i: number of the output in the list
+    :param aggregate: :class:`outputAggregate` of the variable
+    :param area: tss for point value, areasum for sum of area, areaavg for average of area
+    """
+
+    def __init__(self, out, i, aggregate, area):
+        self.out = out
+        self.i = i
+        self.aggregate = aggregate
+        self.area = area
+        # day =0 , month =1 , year =2
+        self.daymonthyear = 0
+        if aggregate.kind[0:5] == 'month':
+            self.daymonthyear = 1
+        if aggregate.kind[0:6] == 'annual':
+            self.daymonthyear = 2
+
+    @property
+    def entry(self):
+        return self.out[self.i]
+
+
+class outputTssFile(object):
+    """
+    Time series file which is written while the model runs
+    The rows are collected and written every outputFlushInterval timesteps and at the last timestep.
+    With option tssBinary the same table is written as .npy file (column order, first column is the timestep)
+
+    :param filename: name of the .tss file
+    :param header: if True the file gets a header
+    :param points: numbers of the output points
+    :param daymonthyear: day =0 , month =1 , year =2
+    """
+
+    def __init__(self, filename, header, points, daymonthyear):
+        self.filename = filename
+        self.header = header
+        self.points = points
+        self.daymonthyear = daymonthyear
+        # number of values so far = timestep of the row
+        self.count = 0
+        self.steps = []
+        self.rows = []
+        self.written = -1
+
+        self.flush = 10
+        if 'outputFlushInterval' in binding:
+            self.flush = max(1, int(loadmap('outputFlushInterval')))
+        self.binary = False
+        if 'tssBinary' in binding:
+            self.binary = returnBool('tssBinary')
+        self.format = " %8g" + " %14g" * len(points) + "\n"
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        """
+        Adds the values of the output points of one timestep
+
+        :param value: list of values, one for each output point
+        """
+
+        self.count += 1
+        timestep = self.count
+        if (dateVar['intSpin'] <= timestep <= dateVar['intEnd']):
+            if dateVar['checked'][timestep - dateVar['intSpin']] >= self.daymonthyear:
+                self.steps.append(timestep)
+                self.rows.append(value)
+        if (len(self.rows) >= self.flush) or dateVar['laststep']:
+            self.write()
+
+    def writeheader(self):
+        """
+        writes header part of tss file, creates the binary table
+        """
+
+        outputFile = open(self.filename, "w")
+        if self.header:
+            header = "timeseries " + " settingsfile: " + os.path.realpath(settingsfile[0]) + " date: " + xtime.ctime(xtime.time())
+            header += " CWATM: " + versioning['exe']  + ", " +versioning['lastdate'] + "\n"
+            if 'save_git' in option:
+                if checkOption("save_git"):
+                    import git
+                    header += "git commit " + git.Repo(search_parent_directories=True).head.object.hexsha
+
+            outputFile.write(header)
+            outputFile.write(str(len(self.points) + 1) + "\n")
+            outputFile.write("timestep\n")
+            for key in self.points:
+                outputFile.write(str(key) + "\n")
+        outputFile.close()
+
+        if self.binary:
+            checked = dateVar['checked'][:dateVar['intEnd'] - dateVar['intSpin'] + 1]
+            nrows = sum(1 for c in checked if c >= self.daymonthyear)
+            self.table = np.lib.format.open_memmap(os.path.splitext(self.filename)[0] + ".npy", mode='w+',
+                                                   dtype=np.float64, shape=(nrows, len(self.points) + 1), fortran_order=True)
+        self.written = 0
+
+    def write(self):
+        """
+        writes the collected rows with one formatting call
+        """
 
+        if self.written < 0:
+            self.writeheader()
+        if not(self.rows):
+            return
+
+        table = np.column_stack((np.array(self.steps, dtype=np.float64), np.array(self.rows, dtype=np.float64)))
+        outputFile = open(self.filename, "a")
+        outputFile.write((self.format * table.shape[0]) % tuple(table.ravel()))
+        outputFile.close()
+
+        if self.binary:
+            self.table[self.written:self.written + table.shape[0]] = table
+            self.table.flush()
+        self.written += table.shape[0]
+        self.steps = []
+        self.rows = []
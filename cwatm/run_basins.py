@@ -0,0 +1,524 @@
+#!/usr/bin/env python3.8
+
+"""
+::
+
+ -------------------------------------------------
+ ######## ##          ##  ####  ######  ##    ##
+ ##       ##          ## ##  ##   ##   ####  ####
+ ##        ##        ##  ##  ##   ##   ## #### ##
+ ##        ##   ##   ## ########  ##  ##   ##   ##
+ ##         ## #### ##  ##    ##  ##  ##        ##
+ ##         ####  #### ##      ## ## ##          ##
+ ##########  ##    ##  ##      ## ## ##          ##
+
+ Community WATer Model
+
+Runs the model domain of a settings file as groups of independent river basins, each group in its own process.
+Basins which drain to different pits only exchange water through water bodies, command areas, lift areas,
+allocation segments, zonal abstraction and reservoir transfers. Basins linked by one of these stay in the same group.
+The groups have about the same number of cells. The outputs of the groups (netcdf maps and .tss time series)
+are merged into the output folder of the settings file at the end.
+
+    cwatm-basins settings.ini groups [workers] [flags]
+
+# --------------------------------------------------
+"""
+
+import os
+import sys
+import heapq
+import traceback
+import multiprocessing
+import numpy as np
+import scipy.sparse
+from scipy.sparse.csgraph import connected_components
+from netCDF4 import Dataset
+
+from cwatm.management_modules.configuration import globalFlags, settingsfile, parse_configuration, ExtParser
+from cwatm.management_modules.data_handling import *
+from cwatm.cwatm_initial import Variables
+from cwatm.hydrological_modules.routing_reservoirs.routing_sub import defLdd2
+from cwatm.hydrological_modules.initcondition import initcondition
+
+
+class basinModel(object):
+    """
+    Minimal model with mask map and netcdf metadata, only used to split the domain into basin groups
+    """
+
+    def __init__(self):
+        self.var = Variables()
+        self.MaskMap = loadsetclone(self, 'MaskMap')
+        metaNetCDF()
+
+
+def usage():
+    """
+    Prints how to use the basin runner
+    """
+
+    print("""
+    Runs the model domain as groups of independent river basins in parallel processes
+
+    cwatm-basins settings.ini groups [workers] [flags]
+
+    groups    number of basin groups (about the same number of cells in each group)
+    workers   number of processes running at the same time, default: groups
+    flags     flags of each model run e.g. -q
+    """)
+
+
+def basinedges(catchment):
+    """
+    Links between basins: cells of the same water body, command area, lift area, allocation segment
+    or zone of the zonal abstraction and reservoirs with a transfer between them
+
+    :param catchment: number of the basin (pit) of each cell
+    :return: two arrays of basin numbers, each pair has to be in the same group
+    """
+
+    zones = []
+    if checkOption('includeWaterBodies'):
+        waterBodyID = loadmap('waterBodyID').astype(np.int64)
+        zones.append(waterBodyID)
+        if 'reservoir_command_areas' in binding:
+            zones.append(loadmap('reservoir_command_areas').astype(np.int64))
+    if 'using_lift_areas' in option:
+        if checkOption('using_lift_areas'):
+            zones.append(loadmap('lift_areas').astype(np.int64))
+    if 'usingAllocSegments' in option:
+        if checkOption('usingAllocSegments') and 'allocSegments' in binding:
+            zones.append(loadmap('allocSegments').astype(np.int64))
+    if 'zonal_abstraction' in option:
+        if checkOption('zonal_abstraction'):
+            inner = 1
+            if "allocation_area" in binding:
+                inner = int(loadmap('allocation_area'))
+            zones.append(allocationzone(inner) + 1)
+
+    frombasin = []
+    tobasin = []
+    for zone in zones:
+        cells = np.nonzero(zone > 0)[0]
+        # each cell of a zone is linked to the first cell of the zone
+        ids, first, inverse = np.unique(zone[cells], return_index=True, return_inverse=True)
+        frombasin.append(catchment[cells])
+        tobasin.append(catchment[cells[first]][inverse])
+
+    if 'reservoir_transfers' in option:
+        if checkOption('reservoir_transfers') and ('Excel_settings_file' in binding):
+            waterBodyID = loadmap('waterBodyID').astype(np.int64)
+            for transfer in initcondition.reservoir_transfers(None, cbinding('Excel_settings_file')):
+                # 0 is a reservoir outside of the model domain
+                giver = np.nonzero(waterBodyID == transfer[0])[0]
+                receiver = np.nonzero(waterBodyID == transfer[1])[0]
+                if (transfer[0] > 0) and (transfer[1] > 0) and len(giver) and len(receiver):
+                    frombasin.append(catchment[giver[:1]])
+                    tobasin.append(catchment[receiver[:1]])
+
+    if not(frombasin):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(frombasin), np.concatenate(tobasin)
+
+
+def basingroups(catchment, groups):
+    """
+    Splits the basins into groups with about the same number of cells
+    Linked basins (see :meth:`basinedges`) are put into the same group
+
+    :param catchment: number of the basin (pit) of each cell
+    :param groups: number of groups
+    :return: group of each cell (0 .. number of groups - 1, groups without cells are left out)
+    """
+
+    ids, basin = np.unique(catchment, return_inverse=True)
+    frombasin, tobasin = basinedges(catchment)
+    frombasin = np.searchsorted(ids, frombasin)
+    tobasin = np.searchsorted(ids, tobasin)
+    links = scipy.sparse.coo_matrix((np.ones(len(frombasin)), (frombasin, tobasin)), shape=(len(ids), len(ids)))
+    ncomp, comp = connected_components(links, directed=False)
+    size = np.bincount(comp[basin], minlength=ncomp)
+
+    # largest linked basins first, each into the group with the smallest number of cells so far
+    heap = [(0, g) for g in range(groups)]
+    group = np.zeros(ncomp, dtype=np.int64)
+    for c in np.argsort(-size, kind='stable'):
+        cells, g = heapq.heappop(heap)
+        group[c] = g
+        heapq.heappush(heap, (cells + size[c], g))
+
+    cellgroup = group[comp[basin]]
+    used, cellgroup = np.unique(cellgroup, return_inverse=True)
+    return cellgroup
+
+
+def basingauges():
+    """
+    Output points of the settings file, as in :meth:`management_modules.output.outputTssMap.initial`
+
+    :return: number of each output point, cell of each output point
+    """
+
+    coord = cbinding('Gauges').split()
+    if len(coord) % 2 == 0:
+        arange = decompress(np.arange(maskinfo['mapC'][0]))
+        col, row = valuecell(coord, cbinding('Gauges'), returnmap=False)
+        numbers = []
+        cells = []
+        for i in range(len(col)):
+            # cells outside of the mask map are -9999
+            if arange[row[i], col[i]] < 0:
+                msg = "Output point " + str(i + 1) + " is outside of the mask map and is not used"
+                print(CWATMWarning(msg))
+            else:
+                numbers.append(i + 1)
+                cells.append(int(arange[row[i], col[i]]))
+        return np.array(numbers, dtype=np.int64), np.array(cells, dtype=np.int64)
+
+    outpoints = loadmap('Gauges', local=returnBool('GaugesLocal')).astype(np.int64)
+    cells = np.nonzero(outpoints > 0)[0]
+    return outpoints[cells], cells
+
+
+def writegroupmap(filename, name, values):
+    """
+    Writes a map of a group (mask or output points) on the grid of the mask map
+
+    :param filename: netcdf file
+    :param name: name of the variable
+    :param values: compressed map
+    """
+
+    writeIniNetcdf(filename, [name], [values.astype(np.float64)])
+    # cells outside of the mask map get 0 instead of missing value: the map is also used as mask map
+    with Dataset(filename, 'a') as nf1:
+        nf1.variables[name][:] = np.ma.filled(nf1.variables[name][:], 0.)
+
+
+def groupsettings(settings, groupfile, changes, outdirs):
+    """
+    Writes a copy of the settings file with some bindings and output folders changed
+
+    :param settings: settings file
+    :param groupfile: new settings file
+    :param changes: dictionary binding: new value
+    :param outdirs: dictionary section: new output folder (OUT_Dir)
+    """
+
+    config = ExtParser()
+    config.optionxform = str
+    config.read(settings)
+    for sec in config.sections():
+        for opt in changes:
+            if config.has_option(sec, opt):
+                config.set(sec, opt, changes[opt])
+        # OUT_Dir can be a path without PathOut: each group needs its own folder
+        if sec in outdirs:
+            for opt in config.options(sec):
+                if opt.lower() == "out_dir":
+                    config.set(sec, opt, outdirs[sec])
+    with open(groupfile, 'w') as f:
+        config.write(f)
+
+
+def rungroup(job):
+    """
+    Runs the model for one group of basins, in a new process
+
+    :param job: settings file of the group, flags
+    :return: settings file, True for a successfull run, error message
+    """
+
+    from cwatm.run_cwatm import main
+    settings, args = job
+    # CWATMError ends with SystemExit: without an answer the pool would wait forever for this group
+    try:
+        success, last_dis = main(settings, args)
+    except BaseException:
+        return settings, False, traceback.format_exc()
+    return settings, success, None
+
+
+def readtss(filename, npoints):
+    """
+    Reads a time series file with or without header
+
+    :param filename: .tss file
+    :param npoints: number of output points in the file
+    :return: first line of the header (or None), table: timestep and one column for each output point
+    """
+
+    with open(filename) as f:
+        lines = f.readlines()
+    first = None
+    start = 0
+    if lines and lines[0].startswith("timeseries"):
+        first = lines[0]
+        start = lines.index("timestep\n") + 1 + npoints
+    if start >= len(lines):
+        return first, np.zeros((0, npoints + 1))
+    return first, np.loadtxt(lines[start:], ndmin=2)
+
+
+def mergetss(files, points, outfile, settings):
+    """
+    Merges the time series files of the groups, the output points are sorted by number
+
+    :param files: .tss file of each group
+    :param points: numbers of the output points of each group
+    :param outfile: merged .tss file
+    :param settings: settings file of each group, replaced by the settings file in the header
+    """
+
+    numbers = np.concatenate(points)
+    order = np.argsort(numbers, kind='stable')
+    tables = []
+    for i in range(len(files)):
+        first, table = readtss(files[i], len(points[i]))
+        if i == 0:
+            header = first
+            steps = table[:, 0]
+        tables.append(table[:, 1:])
+    table = np.column_stack([steps] + [np.concatenate(tables, axis=1)[:, order]])
+
+    outputFile = open(outfile, "w")
+    if header is not None:
+        outputFile.write(header.replace(os.path.realpath(settings[0]), os.path.realpath(settingsfile[0])))
+        outputFile.write(str(len(numbers) + 1) + "\n")
+        outputFile.write("timestep\n")
+        for key in numbers[order]:
+            outputFile.write(str(key) + "\n")
+    format = " %8g" + " %14g" * len(numbers) + "\n"
+    outputFile.write((format * table.shape[0]) % tuple(table.ravel()))
+    outputFile.close()
+
+    # binary time series of option tssBinary
+    binfiles = [os.path.splitext(f)[0] + ".npy" for f in files]
+    if all(os.path.isfile(f) for f in binfiles):
+        tables = [np.load(f)[:, 1:] for f in binfiles]
+        table = np.column_stack([np.load(binfiles[0])[:, 0]] + [np.concatenate(tables, axis=1)[:, order]])
+        np.save(os.path.splitext(outfile)[0] + ".npy", np.asfortranarray(table))
+
+
+def mergenetcdf(files, inside, outfile, steps=100):
+    """
+    Merges the netcdf files of the groups: maps are put together with the cells of each group,
+    gathered variables (option outputGathered) are put together along the cell dimension
+
+    :param files: netcdf file of each group
+    :param inside: 2D boolean map of the cells of each group
+    :param outfile: merged netcdf file
+    :param steps: number of time slices merged at once
+    """
+
+    srcs = [Dataset(f) for f in files]
+    src = srcs[0]
+    shape = inside[0].shape
+    gathered = 'cell' in src.variables
+    if gathered:
+        cells = np.concatenate([s.variables['cell'][:] for s in srcs])
+        order = np.argsort(cells, kind='stable')
+
+    with Dataset(outfile, 'w', format='NETCDF4') as dst:
+        dst.setncatts({k: src.getncattr(k) for k in src.ncattrs()})
+        for name, dim in src.dimensions.items():
+            size = len(cells) if (gathered and name == 'cell') else len(dim)
+            dst.createDimension(name, None if dim.isunlimited() else size)
+
+        for name, var in src.variables.items():
+            attrs = {k: var.getncattr(k) for k in var.ncattrs() if k != '_FillValue'}
+            fill = var.getncattr('_FillValue') if '_FillValue' in var.ncattrs() else None
+            filters = var.filters() or {}
+            chunks = var.chunking()
+            if chunks == 'contiguous' or not(var.dimensions):
+                chunks = None
+            else:
+                chunks = [min(c, len(dst.dimensions[d])) if not(dst.dimensions[d].isunlimited()) else c
+                          for c, d in zip(chunks, var.dimensions)]
+            value = dst.createVariable(name, var.dtype, var.dimensions, fill_value=fill, chunksizes=chunks,
+                                       zlib=filters.get('zlib', False), complevel=filters.get('complevel', 4),
+                                       shuffle=filters.get('shuffle', True))
+            value.setncatts(attrs)
+
+            if not(var.dimensions):
+                value.assignValue(var.getValue())
+            elif gathered and name == 'cell':
+                value[:] = cells[order]
+            elif gathered and var.dimensions[-1] == 'cell':
+                if len(var.dimensions) == 1:
+                    value[:] = np.ma.concatenate([s.variables[name][:] for s in srcs])[order]
+                else:
+                    for i in range(0, var.shape[0], steps):
+                        # end of the block: a slice beyond the end would extend an unlimited time dimension
+                        j = min(i + steps, var.shape[0])
+                        block = np.ma.concatenate([s.variables[name][i:j] for s in srcs], axis=-1)
+                        value[i:j] = block[..., order]
+            elif (len(var.dimensions) >= 2) and (var.shape[-2:] == shape):
+                if len(var.dimensions) == 2:
+                    data = np.ma.array(var[:])
+                    for g in range(1, len(srcs)):
+                        data = np.ma.where(inside[g], srcs[g].variables[name][:], data)
+                    value[:] = data
+                else:
+                    for i in range(0, var.shape[0], steps):
+                        j = min(i + steps, var.shape[0])
+                        data = np.ma.array(var[i:j])
+                        for g in range(1, len(srcs)):
+                            data = np.ma.where(inside[g], srcs[g].variables[name][i:j], data)
+                        value[i:j] = data
+            else:
+                value[:] = var[:]
+
+    for s in srcs:
+        s.close()
+
+
+def mergebasins(groupdirs, targets, inside, points, settings):
+    """
+    Merges the outputs of the groups: netcdf files and time series, other files stay in the folders of the groups
+
+    :param groupdirs: output folder of each group
+    :param targets: list of (folder inside the group folder, folder of the merged files)
+    :param inside: 2D boolean map of the cells of each group
+    :param points: numbers of the output points of each group
+    :param settings: settings file of each group
+    """
+
+    for sub, target in targets:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(groupdirs[0], sub)):
+            rel = os.path.relpath(dirpath, groupdirs[0])
+            # the init folder has its own target
+            if (sub == ".") and (rel.split(os.sep)[0] == "init"):
+                continue
+            for filename in sorted(filenames):
+                if os.path.join(rel, filename) in [os.path.join(".", "mask.nc"), os.path.join(".", "gauges.nc")]:
+                    continue
+                files = [os.path.join(groupdir, rel, filename) for groupdir in groupdirs]
+                outfile = os.path.join(target, os.path.relpath(os.path.join(rel, filename), sub))
+                if not(all(os.path.isfile(f) for f in files)):
+                    print(CWATMWarning(filename + " is not there for all groups and is not merged"))
+                    continue
+                os.makedirs(os.path.dirname(outfile), exist_ok=True)
+                if filename.endswith(".nc"):
+                    mergenetcdf(files, inside, outfile)
+                elif filename.endswith(".tss"):
+                    mergetss(files, points, outfile, settings)
+                elif not(filename.endswith(".npy") or filename.endswith(".ini")):
+                    print(CWATMWarning(filename + " is not merged, the files of the groups are in " + os.path.dirname(files[0])))
+
+
+def runbasins(settings, groups, workers=None, args=[]):
+    """
+    Splits the model domain into groups of basins, runs each group in its own process and merges the outputs
+
+    :param settings: settings file
+    :param groups: number of groups
+    :param workers: number of processes at the same time, default: number of groups
+    :param args: flags of the model runs
+    :return: list of settings files of the groups
+    """
+
+    globalFlags(settings, args, settingsfile, Flags)
+    parse_configuration(settingsfile[0])
+
+    if len(cbinding('MaskMap').split()) == 2:
+        msg = "Error 134: MaskMap is a point, the model domain is one basin and cannot be split into groups\n"
+        raise CWATMError(msg)
+    if 'modflow_coupling' in option:
+        if checkOption('modflow_coupling'):
+            msg = "Error 135: groups of basins are not possible with modflow_coupling, groundwater flows between basins\n"
+            raise CWATMError(msg)
+
+    pathout = os.path.realpath(cbinding('PathOut'))
+    for sec in outDir:
+        if os.path.relpath(os.path.realpath(outDir[sec]), pathout).startswith(os.pardir):
+            msg = "Error 136: output folder " + outDir[sec] + " of [" + sec + "] is not inside of PathOut: " + pathout + "\n"
+            msg += "The groups of basins write their outputs into subfolders of PathOut"
+            raise CWATMError(msg)
+
+    basinModel()
+    ldd = loadmap('Ldd')
+    catchment = defLdd2(ldd)[6]
+    group = basingroups(catchment, groups)
+    ngroups = group.max() + 1
+    numbers, cells = basingauges()
+
+    groupdirs = []
+    inside = []
+    points = []
+    jobs = []
+    for g in range(ngroups):
+        groupdir = os.path.join(pathout, "basins", "group_%02i" % (g + 1))
+        os.makedirs(groupdir, exist_ok=True)
+        outdirs = {}
+        for sec in outDir:
+            outdirs[sec] = os.path.join(groupdir, os.path.relpath(os.path.realpath(outDir[sec]), pathout))
+            os.makedirs(outdirs[sec], exist_ok=True)
+
+        maskfile = os.path.join(groupdir, "mask.nc")
+        writegroupmap(maskfile, "mask", group == g)
+        gauge = np.zeros(maskinfo['mapC'][0])
+        ingroup = group[cells] == g
+        gauge[cells[ingroup]] = numbers[ingroup]
+        gaugefile = os.path.join(groupdir, "gauges.nc")
+        writegroupmap(gaugefile, "gauges", gauge)
+        points.append(np.sort(numbers[ingroup]))
+
+        changes = {'MaskMap': maskfile, 'PathOut': groupdir, 'Gauges': gaugefile}
+        if 'initSave' in binding:
+            os.makedirs(os.path.join(groupdir, "init"), exist_ok=True)
+            changes['initSave'] = os.path.join(groupdir, "init", os.path.basename(cbinding('initSave')))
+        groupfile = os.path.join(groupdir, "settings_group_%02i.ini" % (g + 1))
+        groupsettings(settingsfile[0], groupfile, changes, outdirs)
+
+        groupdirs.append(groupdir)
+        cellmap = np.zeros(maskinfo['shapeflat'], dtype=bool)
+        cellmap[~maskinfo['maskflat']] = group == g
+        inside.append(cellmap.reshape(maskinfo['shape']))
+        jobs.append((groupfile, args))
+
+    if not(Flags['veryquiet']):
+        print("Basin groups: %i  cells: %s" % (ngroups, " ".join(str(n) for n in np.bincount(group))))
+
+    if workers is None:
+        workers = ngroups
+    settings = [job[0] for job in jobs]
+    # new process for each group: each model run starts with empty globals
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(min(workers, ngroups), maxtasksperchild=1) as pool:
+        failed = []
+        for groupfile, success, error in pool.imap_unordered(rungroup, jobs):
+            if not(success):
+                failed.append(groupfile)
+                print(CWATMWarning("Group failed: " + groupfile + "\n" + str(error)))
+            elif not(Flags['veryquiet']):
+                print("\nGroup finished: " + groupfile)
+
+    # the outputs in PathOut are only replaced if all groups are complete
+    if failed:
+        msg = "Error 137: model run failed for the groups of basins:\n" + "\n".join(sorted(failed)) + "\n"
+        msg += "The outputs are not merged"
+        raise CWATMError(msg)
+
+    targets = [(".", pathout)]
+    if 'initSave' in binding:
+        targets.append(("init", os.path.dirname(os.path.realpath(cbinding('initSave')))))
+    mergebasins(groupdirs, targets, inside, points, settings)
+    return settings
+
+
+def run_from_command_line():
+    if len(sys.argv) < 3:
+        usage()
+        sys.exit(0)
+    workers = None
+    args = sys.argv[3:]
+    if args and args[0].isdigit():
+        workers = int(args[0])
+        args = args[1:]
+    runbasins(sys.argv[1], int(sys.argv[2]), workers, args)
+
+
+if __name__ == "__main__":
+    run_from_command_line()
@@ -51,8 +51,8 @@ from osgeo import osr
 
 
 
-from cwatm.management_modules.configuration import globalFlags, settingsfile, versioning, platform1, parse_configuration, read_metanetcdf, dateVar, CWATMRunInfo, outputDir, timeMesSum, timeMesString, globalclear, calibclear
-from cwatm.management_modules.data_handling import Flags, cbinding
+from cwatm.management_modules.configuration import globalFlags, settingsfile, versioning, platform1, parse_configuration, read_metanetcdf, dateVar, CWATMRunInfo, outputDir, timeMesSum, timeMesString, timeMesPrefetch, globalclear, calibclear
+from cwatm.management_modules.data_handling import Flags, cbinding, closemeteohandles
 from cwatm.management_modules.timestep import checkifDate
 from cwatm.management_modules.dynamicModel import ModelFrame
 from cwatm.cwatm_model import CWATModel
@@ -134,6 +134,8 @@ def CWATMexe(settings):
 
     CWATM = CWATModel()
     stCWATM = ModelFrame(CWATM, firstTimestep=dateVar["intStart"], lastTimeStep=dateVar["intEnd"])
+    if (staticcache['hits'] + staticcache['misses'] > 0) and not(Flags['veryquiet']):
+        print("Static map cache: %i hits, %i misses, %.2f s saved" % (staticcache['hits'], staticcache['misses'], staticcache['saved']))
 
     """
     ----------------------------------------------
@@ -147,6 +149,8 @@ def CWATMexe(settings):
         print("%-6s %10s %11s\n" % ("Step", "Date", "Discharge"), end=' ')
 
     stCWATM.run()
+    # close the netcdf files of the meteo map stacks which are still open
+    closemeteohandles()
 
     # cProfile.run('stLisflood.run()')
     # python -m cProfile -o  l1.pstats cwatm.py settings1.ini
@@ -161,6 +165,11 @@ def CWATMexe(settings):
         timePrint = timeSum
         for i in range(len(timePrint)):
             print("%2i %-17s %10.2f %8.1f" % (i, timeMesString[i], timePrint[i], 100 * timePrint[i] / timePrint[-1]))
+        if timeMesPrefetch[0] > 0:
+            # meteo maps read in the background: total time and time which was overlapping the calculation
+            overlap = max(0., timeMesPrefetch[0] - timeMesPrefetch[1])
+            print("%2s %-17s %10.2f" % ("", "Meteo prefetch", timeMesPrefetch[0]))
+            print("%2s %-17s %10.2f %8.1f" % ("", " - overlapped", overlap, 100 * overlap / timeMesPrefetch[0]))
 
     if Flags['loud']:
         current_time = datetime.datetime.now().time()
@@ -200,6 +209,8 @@ def CWATMexe2(settings,meteo):
     CWATM = CWATModel()
     CWATM.var.meteo = meteo
     stCWATM = ModelFrame(CWATM, firstTimestep=dateVar["intStart"], lastTimeStep=dateVar["intEnd"])
+    if (staticcache['hits'] + staticcache['misses'] > 0) and not(Flags['veryquiet']):
+        print("Static map cache: %i hits, %i misses, %.2f s saved" % (staticcache['hits'], staticcache['misses'], staticcache['saved']))
 
     start_time = datetime.datetime.now().time()
     if Flags['loud']:
@@ -215,6 +226,11 @@ def CWATMexe2(settings,meteo):
         timePrint = timeSum
         for i in range(len(timePrint)):
             print("%2i %-17s %10.2f %8.1f" % (i, timeMesString[i], timePrint[i], 100 * timePrint[i] / timePrint[-1]))
+        if timeMesPrefetch[0] > 0:
+            # meteo maps read in the background: total time and time which was overlapping the calculation
+            overlap = max(0., timeMesPrefetch[0] - timeMesPrefetch[1])
+            print("%2s %-17s %10.2f" % ("", "Meteo prefetch", timeMesPrefetch[0]))
+            print("%2s %-17s %10.2f %8.1f" % ("", " - overlapped", overlap, 100 * overlap / timeMesPrefetch[0]))
 
 
     # return with last value and true for successfull run for pytest
@@ -305,7 +321,7 @@ def mainwarm(settings, args, meteo):
     Flags['warm'] = True
 
     headerinfo()
-    if meteo == []:
+    if len(meteo) == 0:
         Flags['warm'] = False
         success, last_dis = CWATMexe(settingsfile[0])
     else:
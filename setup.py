@@ -47,6 +47,10 @@ setup(
             'pytest-html'
       ],
       entry_points={
-            'console_scripts': ['cwatm=cwatm.run_cwatm:run_from_command_line']
+            'console_scripts': ['cwatm=cwatm.run_cwatm:run_from_command_line',
+                                'cwatm-forcing=cwatm.convert_forcing:run_from_command_line',
+                                'cwatm-expand=cwatm.expand_output:run_from_command_line',
+                                'cwatm-init=cwatm.convert_init:run_from_command_line',
+                                'cwatm-basins=cwatm.run_basins:run_from_command_line']
       }
 )
\ No newline at end of file